@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Request, HTTPException, Query, Path
+from fastapi import APIRouter, Request, HTTPException, Query, Path, Response, Depends, Body
 from datetime import datetime, timedelta
-from connection import get_db_connection
+from db_pool import get_db, get_pool
 from typing import Optional, List, Dict, Any
 from mariadb import IntegrityError
+import itertools
 import json
 import math
+import re
 
-from routes.__utils__ import insert_data, insert_bulk_data,fetch_data_with_dates, fetch_data_with_single_filter_and_datetime
+from routes.__utils__ import insert_data
+from ingest_utils import validate_rows, rows_from_models, bulk_write
+from query_utils import fetch_page, set_next_cursor, stream_export
 from models.cambium_data_models import CambiumData
 
 
@@ -112,63 +116,281 @@ def add_cambium(cambium_data: CambiumData):
     return insert_data("cambium_data", cambium_data)
 
 @router.post("/add_list")
-def add_cambium_list( list_model: List[CambiumData] ):
-    return insert_bulk_data("cambium_data", list_model, CambiumData.model_fields.keys())
+def add_cambium_list( list_model: List[CambiumData], conn = Depends(get_db) ):
+    columns = list(CambiumData.model_fields.keys())
+    return bulk_write(conn, "cambium_data", columns, rows_from_models(list_model, columns),
+                      load_data=get_pool().local_infile)
+
+@router.post("/add_bulk", summary="Ingesta masiva de equipos Cambium: validación por columnas e INSERT IGNORE / LOAD DATA")
+def add_cambium_bulk(
+    rows: List[Dict[str, Any]] = Body(..., description="Filas con los campos de CambiumData"),
+    on_duplicate: str = Query("ignore", description="ignore | update | error ante un (ip, fecha) ya existente"),
+    conn = Depends(get_db)
+):
+    columns, values = validate_rows("cambium_data", rows, CambiumData)
+    return bulk_write(conn, "cambium_data", columns, values, on_duplicate, load_data=get_pool().local_infile)
 
 
 @router.get("/get", summary="Obtener datos de equipos Cambium por rango de fechas y con paginación")
 def get_cambium(
+    response: Response,
     start_date: Optional[str] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="Fecha de fin en formato YYYY-MM-DD"),
     limit: int = Query(1000, description="Número máximo de registros por página"),
-    offset: int = Query(0, description="Desplazamiento para paginación")
+    offset: int = Query(0, description="Desplazamiento para paginación (se ignora si se envía cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    conn = Depends(get_db)
 ):
-    return fetch_data_with_dates("cambium_data", start_date, end_date, limit, offset)
+    try:
+        db_cursor = conn.cursor()
+        rows, next_cursor = fetch_page(db_cursor, "cambium_data", start_date=start_date, end_date=end_date,
+                                       limit=limit, offset=offset, cursor=cursor)
+        set_next_cursor(response, next_cursor)
+        return rows
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener los datos de cambium_data: {str(e)}")
 
 @router.get("/get_ip/{ip}", summary="Obtener datos de equipos Cambium por IP, rango de fechas y con paginación")
 def get_cambium_by_ip(
+    response: Response,
     ip: str = Path(..., description="Dirección IP del dispositivo"),
     start_date: Optional[str] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="Fecha de fin en formato YYYY-MM-DD"),
     limit: int = Query(1000, description="Número máximo de registros por página"),
-    offset: int = Query(0, description="Desplazamiento para paginación")
+    offset: int = Query(0, description="Desplazamiento para paginación (se ignora si se envía cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    conn = Depends(get_db)
 ):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        query = "SELECT * FROM cambium_data WHERE ip = %s"
-        params = [ip]
-
-        if start_date:
-            query += " AND fecha >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND fecha <= %s"
-            params.append(end_date)
-        
-        query += " ORDER BY fecha DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        columnas = [desc[0] for desc in cursor.description]
-        cambium_data = [dict(zip(columnas, row)) for row in cursor.fetchall()]
+        db_cursor = conn.cursor()
+        cambium_data, next_cursor = fetch_page(db_cursor, "cambium_data", where=["ip = %s"], params=[ip],
+                                               start_date=start_date, end_date=end_date,
+                                               limit=limit, offset=offset, cursor=cursor)
+        set_next_cursor(response, next_cursor)
         return cambium_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener los datos de resultados de cambium_data por IP: {str(e)}")
-    finally:
-        conn.close()
+
+# Operadores admitidos en /get/{column}/{filter_operator}/{filter_value}
+_FILTER_OPERATORS = {"=", "!=", "<>", "<", "<=", ">", ">=", "LIKE"}
 
 @router.get("/get/{column}/{filter_operator}/{filter_value}", summary="Obtener datos de equipos Cambium por columna y valor de filtro. Tiene rango de fechas opcional y paginación.")
 def get_cambium_by_column(
+    response: Response,
     column: str = Path(..., description="Nombre de la columna a filtrar"),
     filter_operator: str = Path(..., description="Operador de comparación para el filtro"),
     filter_value: str = Path(..., description="Valor a filtrar"),
     start_date: Optional[str] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="Fecha de fin en formato YYYY-MM-DD"),
     limit: int = Query(1000, description="Número máximo de registros por página"),
-    offset: int = Query(0, description="Desplazamiento para paginación")
+    offset: int = Query(0, description="Desplazamiento para paginación (se ignora si se envía cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    conn = Depends(get_db)
 ):
-    return fetch_data_with_single_filter_and_datetime("cambium_data", column, filter_operator, filter_value, start_date, end_date, limit, offset)
+    operator = filter_operator.upper()
+    if operator not in _FILTER_OPERATORS:
+        raise HTTPException(status_code=400, detail=f"Operador no permitido: {filter_operator}")
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", column):
+        raise HTTPException(status_code=400, detail=f"Columna no válida: {column}")
+    try:
+        db_cursor = conn.cursor()
+        rows, next_cursor = fetch_page(db_cursor, "cambium_data", where=[f"{column} {operator} %s"], params=[filter_value],
+                                       start_date=start_date, end_date=end_date,
+                                       limit=limit, offset=offset, cursor=cursor)
+        set_next_cursor(response, next_cursor)
+        return rows
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener los datos de cambium_data por columna: {str(e)}")
+
+
+@router.get("/get_low_snr", summary="Obtener mediciones Cambium con SNR H o V bajo el umbral, con rango de fechas y paginación")
+def get_low_snr(
+    response: Response,
+    start_date: Optional[datetime] = Query(None, description="Fecha de inicio de la consulta"),
+    end_date: Optional[datetime] = Query(None, description="Fecha de fin de la consulta"),
+    umbral: float = Query(20, description="Se devuelven filas con snr_h o snr_v menor o igual a este valor"),
+    offset: int = Query(0, description="Número de registros a omitir (se ignora si se envía cursor)"),
+    limit: int = Query(1000, description="Número de registros a mostrar"),
+    cursor: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    conn = Depends(get_db)
+):
+    """
+    Filtra sobre las columnas numéricas snr_h / snr_v (generadas desde el JSON 'snr'),
+    por lo que no se decodifica JSON al leer. Las formas de 'snr' que esas
+    columnas no leen están listadas en migrations/001 (no hay respaldo en Python).
+    """
+    try:
+        db_cursor = conn.cursor()
+        rows, next_cursor = fetch_page(db_cursor, "cambium_data", select="id, ip, fecha, snr_h, snr_v",
+                                       where=["(snr_h <= %s OR snr_v <= %s)"], params=[umbral, umbral],
+                                       start_date=start_date, end_date=end_date,
+                                       limit=limit, offset=offset, cursor=cursor)
+        set_next_cursor(response, next_cursor)
+        return rows
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener los datos de SNR bajo: {str(e)}")
+
+
+@router.get("/export", summary="Exportar el histórico de equipos Cambium en streaming (NDJSON o Arrow IPC), con rango de fechas y filtro por IP opcional")
+def export_cambium(
+    start_date: Optional[datetime] = Query(None, description="Fecha de inicio de la consulta"),
+    end_date: Optional[datetime] = Query(None, description="Fecha de fin de la consulta"),
+    ip: Optional[str] = Query(None, description="Filtrar por dirección IP"),
+    formato: str = Query("ndjson", description="Formato de salida: ndjson o arrow"),
+    batch_size: int = Query(5000, ge=1, le=100000, description="Filas por bloque leído de la base de datos")
+):
+    """Las columnas JSON (snr, link_radio, ...) se exportan como texto."""
+    where, params = ([], []) if ip is None else (["ip = %s"], [ip])
+    return stream_export("cambium_data", where, params, start_date, end_date, formato, batch_size)
+
+
+# --------------------- Agregación en MariaDB ---------------------
+# Columnas numéricas generadas (STORED) a partir de los JSON, ver migrations/001
+_METRIC_COLUMNS = {
+    ("snr", "h")        : "snr_h",
+    ("snr", "v")        : "snr_v",
+    ("link_radio", "rx"): "rx",
+}
+
+# Valor escalar numérico tal como lo acepta _to_float_fixed (sin NaN/inf)
+_NUM_REGEXP = "^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$"
+
+def _json_metric_sql(column: str, metric: str) -> str:
+    """
+    Expresión SQL equivalente a _extract_metric_fixed para filas con JSON válido,
+    con las mismas reglas que las columnas generadas de la migración 001: la
+    llave exacta y luego todas sus capitalizaciones, o el documento si es un
+    escalar ('$'); listas y dicts anidados devuelven NULL y solo se castean
+    valores numéricos (sin espacios alrededor).
+    Solo se usa para combinaciones sin columna materializada.
+    """
+    raw = "TRIM(COALESCE(" + _json_keys_sql(column, metric) + f", JSON_VALUE(c.{column}, '$')))"
+    return f"CASE WHEN {raw} REGEXP '{_NUM_REGEXP}' THEN CAST({raw} AS DOUBLE) END"
+
+def _json_keys_sql(column: str, metric: str) -> str:
+    """JSON_VALUE de la llave exacta y de todas sus capitalizaciones, separados por coma."""
+    cases = [(ch, ch.swapcase()) if ch.isalpha() else (ch,) for ch in metric]
+    keys = dict.fromkeys([metric] + ["".join(k) for k in itertools.product(*cases)])
+    return ", ".join(f"JSON_VALUE(c.{column}, '$.{k}')" for k in keys)
+
+def _fallback_sql(column: str, metric: str) -> str:
+    """
+    Filas sin valor en SQL de las que _extract_metric_fixed todavía puede sacar
+    un número: JSON malformado, escalares string / booleano ('$' no numérico
+    para MariaDB) y objetos con alguna capitalización de la llave con valor
+    escalar. Arrays (PMP-AP), números ya leídos, null y objetos sin la llave
+    nunca aportan y no se traen a Python.
+    """
+    return (f"(NOT JSON_VALID(c.{column}) "
+            f"OR JSON_TYPE(c.{column}) IN ('STRING', 'BOOLEAN') "
+            f"OR (JSON_TYPE(c.{column}) = 'OBJECT' AND COALESCE({_json_keys_sql(column, metric)}) IS NOT NULL))")
+
+def _metric_sql(column: str, metric: str) -> str:
+    """Columna numérica indexada si existe; si no, extracción JSON en MariaDB."""
+    generated = _METRIC_COLUMNS.get((column, metric.lower()))
+    return f"c.{generated}" if generated else _json_metric_sql(column, metric)
+
+def _classify_sql(metric: str, expr: str) -> str:
+    """Misma clasificación que _classify, como expresión CASE sobre 'expr'."""
+    if metric.lower() in ("h", "v"):
+        return (f"CASE WHEN {expr} > 20 THEN 'optimo' "
+                f"WHEN {expr} >= 16 AND {expr} < 20 THEN 'alerta' ELSE 'alarma' END")
+    return (f"CASE WHEN {expr} >= -70 AND {expr} <= 0 THEN 'optimo' "
+            f"WHEN {expr} >= -80 AND {expr} < -70 THEN 'alerta' ELSE 'alarma' END")
+
+def _accumulate(s: Dict[str, Any], metric: str, v: float) -> None:
+    """Suma una medición válida al acumulador de una IP."""
+    cat = _classify(metric, v)
+    s["total_mediciones"] += 1
+    s["sum"] += v
+    s["min"] = v if s["min"] is None else min(s["min"], v)
+    s["max"] = v if s["max"] is None else max(s["max"], v)
+    if cat == "alerta":
+        s["alertas"] += 1
+    elif cat == "alarma":
+        s["alarmas"] += 1
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"total_mediciones": 0, "sum": 0.0, "min": None, "max": None, "alertas": 0, "alarmas": 0}
+
+def _collect_metric_stats(cursor, column: str, metric: str, where: str, params: List[Any]):
+    """
+    Agrega la métrica por IP en MariaDB y completa con el respaldo en Python
+    para las filas en que la extracción SQL quedó en NULL pero que
+    _extract_metric_fixed aún puede leer (ver _fallback_sql), igual que antes
+    de materializar las métricas.
+
+    Returns:
+        (stats, inv, processed): acumuladores por IP, datos de inventario por IP
+        y total de filas leídas en el rango.
+    """
+    val_expr = _metric_sql(column, metric)
+    cat_expr = _classify_sql(metric, "t.val")
+    cursor.execute(f"""
+        SELECT t.ip,
+               COUNT(*) AS filas,
+               COUNT(t.val) AS total_mediciones,
+               SUM(t.val) AS suma,
+               MIN(t.val) AS minimo,
+               MAX(t.val) AS maximo,
+               COUNT(CASE WHEN t.val IS NOT NULL AND {cat_expr} = 'alerta' THEN 1 END) AS alertas,
+               COUNT(CASE WHEN t.val IS NOT NULL AND {cat_expr} = 'alarma' THEN 1 END) AS alarmas,
+               MAX(t.tag) AS tag, MAX(t.marca) AS marca, MAX(t.rol) AS rol, MAX(t.tipo) AS tipo
+        FROM (
+            SELECT c.ip, {val_expr} AS val, i.tag, i.marca, i.rol, i.tipo
+            FROM cambium_data c
+            LEFT JOIN inventario i ON c.ip = i.ip
+            {where}
+        ) t
+        GROUP BY t.ip
+    """, params)
+
+    stats: Dict[str, Dict[str, Any]] = {}
+    inv: Dict[str, Dict[str, Any]] = {}
+    processed = 0
+    for ip, filas, total, suma, vmin, vmax, alertas, alarmas, tag, marca, rol, tipo in cursor.fetchall():
+        inv[ip] = {"tag": tag, "marca": marca, "rol": rol, "tipo": tipo}
+        processed += int(filas)
+        if not total:
+            continue
+        stats[ip] = {
+            "total_mediciones": int(total), "sum": float(suma),
+            "min": float(vmin), "max": float(vmax),
+            "alertas": int(alertas), "alarmas": int(alarmas)
+        }
+
+    # Respaldo en Python: solo filas sin valor en SQL que el extractor aún puede leer
+    cursor.execute(f"""
+        SELECT c.ip, c.{column}
+        FROM cambium_data c
+        LEFT JOIN inventario i ON c.ip = i.ip
+        {where} AND {val_expr} IS NULL AND c.{column} IS NOT NULL
+          AND {_fallback_sql(column, metric)}
+    """, params)
+    for ip, raw in cursor.fetchall():
+        val = _extract_metric_fixed(raw, metric)
+        if val is None:
+            continue
+        _accumulate(stats.setdefault(ip, _empty_stats()), metric, float(val))
+
+    return stats, inv, processed
+
+def _validate_metric(column: str, metric: str):
+    column = column.strip().lower()
+    metric = metric.strip()
+    if column not in ("snr", "link_radio"):
+        raise HTTPException(status_code=400, detail="column debe ser 'snr' o 'link_radio'")
+    if metric.lower() not in ("h", "v", "rx"):
+        raise HTTPException(status_code=400, detail="metric debe ser 'H', 'V' o 'rx'")
+    return column, metric
 
 
 # --------------------- 1) Stats por IP ---------------------
@@ -178,67 +400,33 @@ def get_metric_stats_by_ip(
     metric: str = Query(..., description="Métrica: 'H', 'V' o 'rx'"),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    limit_rows: int = Query(200000, ge=1, le=1000000, description="Filas a leer"),
-    ip_filter: Optional[str] = Query(None, description="Filtrar por IP exacta (opcional)")
+    limit_rows: int = Query(200000, ge=1, le=1000000, description="Obsoleto: la agregación se hace en MariaDB sobre todo el rango"),
+    ip_filter: Optional[str] = Query(None, description="Filtrar por IP exacta (opcional)"),
+    conn = Depends(get_db)
 ):
-    column = column.strip().lower()
-    metric = metric.strip()
-    if column not in ("snr", "link_radio"):
-        raise HTTPException(status_code=400, detail="column debe ser 'snr' o 'link_radio'")
-    if metric.lower() not in ("h", "v", "rx"):
-        raise HTTPException(status_code=400, detail="metric debe ser 'H', 'V' o 'rx'")
+    """
+    Las estadísticas se calculan en MariaDB sobre las columnas numéricas
+    snr_h / snr_v / rx (GROUP BY ip), sin traer las filas a Python. Solo las
+    filas que SQL no lee y _extract_metric_fixed sí (JSON malformado, escalares
+    string, ver _fallback_sql) se procesan en Python.
+    """
+    column, metric = _validate_metric(column, metric)
 
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
 
-        q = f"""
-            SELECT c.ip, c.fecha, c.{column}, i.tag, i.marca, i.rol, i.tipo
-            FROM cambium_data c
-            LEFT JOIN inventario i ON c.ip = i.ip
-            WHERE i.tipo = 'PMP-SM'
-        """
+        where = "WHERE i.tipo = 'PMP-SM'"
         params: List[Any] = []
         if ip_filter:
-            q += " AND c.ip = %s"; params.append(ip_filter)
+            where += " AND c.ip = %s"; params.append(ip_filter)
         if start_date:
-            q += " AND c.fecha >= %s"; params.append(start_date)
+            where += " AND c.fecha >= %s"; params.append(start_date)
         if end_date:
-            q += " AND c.fecha <= %s"; params.append(end_date)
-        q += " ORDER BY c.fecha DESC LIMIT %s"; params.append(limit_rows)
-
-        cursor.execute(q, params)
+            where += " AND c.fecha <= %s"; params.append(end_date)
 
-        stats: Dict[str, Dict[str, Any]] = {}
-        inv: Dict[str, Dict[str, Any]] = {}
-        processed = 0
+        stats, inv, processed = _collect_metric_stats(cursor, column, metric, where, params)
         mkey_l = metric.lower()
 
-        for ip, fecha, raw, tag, marca, rol, tipo in cursor.fetchall():
-            inv.setdefault(ip, {"tag": tag, "marca": marca, "rol": rol, "tipo": tipo})
-            val = _extract_metric_fixed(raw, metric)
-            if val is None:
-                processed += 1
-                continue
-
-            v = float(val)
-            cat = _classify(metric, v)
-            s = stats.setdefault(ip, {
-                "total_mediciones": 0, "sum": 0.0, "min": None, "max": None,
-                "alertas": 0, "alarmas": 0
-            })
-
-            s["total_mediciones"] += 1
-            s["sum"] += v
-            s["min"] = v if s["min"] is None else min(s["min"], v)
-            s["max"] = v if s["max"] is None else max(s["max"], v)
-            if cat == "alerta":
-                s["alertas"] += 1
-            elif cat == "alarma":
-                s["alarmas"] += 1
-
-            processed += 1
-
         # armar salida
         out: List[Dict[str, Any]] = []
         for ip, s in stats.items():
@@ -277,8 +465,6 @@ def get_metric_stats_by_ip(
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en metric stats by IP: {str(e)}")
-    finally:
-        conn.close()
 
 # --------------------- 2) Summary global ---------------------
 @router.get("/get_metric_stats_summary", summary="Resumen global (SNR_H / SNR_V / RX) filtrando PMP-SM")
@@ -287,58 +473,29 @@ def get_metric_stats_summary(
     metric: str = Query(..., description="Métrica: 'H', 'V' o 'rx'"),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    limit_rows: int = Query(200000, ge=1, le=1000000)
+    limit_rows: int = Query(200000, ge=1, le=1000000, description="Obsoleto: la agregación se hace en MariaDB sobre todo el rango"),
+    conn = Depends(get_db)
 ):
-    column = column.strip().lower()
-    metric = metric.strip()
-    if column not in ("snr", "link_radio"):
-        raise HTTPException(status_code=400, detail="column debe ser 'snr' o 'link_radio'")
-    if metric.lower() not in ("h", "v", "rx"):
-        raise HTTPException(status_code=400, detail="metric debe ser 'H', 'V' o 'rx'")
+    column, metric = _validate_metric(column, metric)
 
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
 
-        q = f"""
-            SELECT c.ip, c.fecha, c.{column}
-            FROM cambium_data c
-            LEFT JOIN inventario i ON c.ip = i.ip
-            WHERE i.tipo = 'PMP-SM'
-        """
+        where = "WHERE i.tipo = 'PMP-SM'"
         params: List[Any] = []
         if start_date:
-            q += " AND c.fecha >= %s"; params.append(start_date)
+            where += " AND c.fecha >= %s"; params.append(start_date)
         if end_date:
-            q += " AND c.fecha <= %s"; params.append(end_date)
-        q += " ORDER BY c.fecha DESC LIMIT %s"; params.append(limit_rows)
-
-        cursor.execute(q, params)
-
-        ips_set = set()
-        cnt = 0
-        ssum = 0.0
-        smin = None
-        smax = None
-        alertas = 0
-        alarmas = 0
-
-        for ip, fecha, raw in cursor.fetchall():
-            val = _extract_metric_fixed(raw, metric)
-            if val is None:
-                continue
-            v = float(val)
-            cat = _classify(metric, v)
-
-            cnt += 1
-            ips_set.add(ip)
-            ssum += v
-            smin = v if smin is None else min(smin, v)
-            smax = v if smax is None else max(smax, v)
-            if cat == "alerta":
-                alertas += 1
-            elif cat == "alarma":
-                alarmas += 1
+            where += " AND c.fecha <= %s"; params.append(end_date)
+
+        stats, _, _ = _collect_metric_stats(cursor, column, metric, where, params)
+
+        cnt = sum(s["total_mediciones"] for s in stats.values())
+        ssum = sum(s["sum"] for s in stats.values())
+        smin = min((s["min"] for s in stats.values()), default=None)
+        smax = max((s["max"] for s in stats.values()), default=None)
+        alertas = sum(s["alertas"] for s in stats.values())
+        alarmas = sum(s["alarmas"] for s in stats.values())
 
         avg = (ssum / cnt) if cnt > 0 else None
         malos = alertas + alarmas
@@ -347,7 +504,7 @@ def get_metric_stats_summary(
         return {
             "column": column,
             "metric": metric,
-            "total_ips": len(ips_set),
+            "total_ips": len(stats),
             "total_mediciones": cnt,
             f"promedio_{mkey_l}": None if avg is None else round(avg, 3),
             f"max_{mkey_l}": None if smax is None else round(smax, 3),
@@ -358,5 +515,3 @@ def get_metric_stats_summary(
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en metric summary: {str(e)}")
-    finally:
-        conn.close()
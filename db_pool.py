@@ -0,0 +1,191 @@
+from fastapi import APIRouter, HTTPException
+from contextlib import contextmanager
+from collections import deque
+import threading
+import mariadb
+import time
+import os
+import yaml
+
+
+router = APIRouter()
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+config_path = os.path.join(script_dir, "configAPI.yml")
+
+# Valores por defecto de las claves opcionales de cada base en configAPI.yml (sección 'databases')
+DEFAULTS = {
+    "pool_size": 10,                 # conexiones abiertas como máximo (mariadb admite hasta 64)
+    "pool_timeout": 10,              # segundos que un request espera una conexión libre antes de responder 503
+    "pool_pre_ping": 30,             # segundos de inactividad tras los que se valida la conexión con ping()
+    "pool_reset_connection": True,
+    "local_infile": False,           # habilita LOAD DATA LOCAL INFILE en /add_bulk (ingest_utils.py)
+}
+MAX_POOL_SIZE = 64
+LATENCY_SAMPLES = 1000              # checkouts recientes usados para los percentiles de espera
+
+
+class DBPool:
+    """
+    Pool de conexiones MariaDB compartido por los routers.
+
+    mariadb.ConnectionPool falla de inmediato si no hay conexiones libres; aquí
+    un semáforo del mismo tamaño hace esperar al request hasta 'pool_timeout'.
+    Al entregar una conexión que estuvo inactiva más de 'pool_pre_ping' segundos
+    se valida con ping() y, si el servidor la cerró, se reconecta.
+    """
+
+    def __init__(self, name: str, config: dict):
+        settings = {**DEFAULTS, **config}
+        self.name = name
+        self.size = max(1, min(int(settings["pool_size"]), MAX_POOL_SIZE))
+        self.timeout = float(settings["pool_timeout"])
+        self.pre_ping = float(settings["pool_pre_ping"])
+        self.local_infile = bool(settings["local_infile"])
+        self._pool = mariadb.ConnectionPool(
+            pool_name=settings.get("pool_name", name),
+            pool_size=self.size,
+            user=settings["user"],
+            password=settings["password"],
+            host=settings["host"],
+            port=settings["port"],
+            database=settings["database"],
+            pool_reset_connection=settings["pool_reset_connection"],
+            local_infile=self.local_infile
+        )
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.in_use = 0
+        self.waiters = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.ping_failures = 0
+        self.errors = 0
+
+    def _validate(self, conn):
+        if time.monotonic() - self._last_used.get(id(conn), 0) < self.pre_ping:
+            return
+        try:
+            conn.ping()
+        except mariadb.Error:
+            with self._lock:
+                self.ping_failures += 1
+            conn.reconnect()
+
+    def acquire(self):
+        started = time.perf_counter()
+        with self._lock:
+            self.waiters += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.waiters -= 1
+        if not acquired:
+            with self._lock:
+                self.timeouts += 1
+            raise HTTPException(status_code=503, detail=f"Sin conexiones libres a la base de datos tras {self.timeout:g} s")
+
+        conn = None
+        try:
+            conn = self._pool.get_connection()
+            self._validate(conn)
+        except Exception as e:
+            if conn is not None:
+                conn.close()
+            self._slots.release()
+            with self._lock:
+                self.errors += 1
+            raise HTTPException(status_code=503, detail=f"Error al obtener conexión a la base de datos: {str(e)}")
+
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self._latencies.append(time.perf_counter() - started)
+        return conn
+
+    def release(self, conn):
+        try:
+            # Sin commit pendiente: se descarta la transacción (y el snapshot de lectura) antes de devolverla
+            conn.rollback()
+        except mariadb.Error:
+            pass
+        finally:
+            self._last_used[id(conn)] = time.monotonic()
+            conn.close()
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            result = {
+                "pool": self.name,
+                "pool_size": self.size,
+                "in_use": self.in_use,
+                "idle": self.size - self.in_use,
+                "waiters": self.waiters,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "ping_failures": self.ping_failures,
+                "errors": self.errors,
+                "pool_timeout_s": self.timeout,
+            }
+        if latencies:
+            result["checkout_ms"] = {
+                "avg": round(sum(latencies) / len(latencies) * 1e3, 3),
+                "p50": round(latencies[len(latencies) // 2] * 1e3, 3),
+                "p95": round(latencies[int(len(latencies) * 0.95)] * 1e3, 3),
+                "max": round(latencies[-1] * 1e3, 3),
+                "samples": len(latencies),
+            }
+        return result
+
+
+# --------------------- Pools por base de datos ---------------------
+POOLS = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_key: str = "smartlink") -> DBPool:
+    """Crea el pool en el primer uso (el import del router no abre conexiones)."""
+    pool = POOLS.get(db_key)
+    if pool is None:
+        with _pools_lock:
+            pool = POOLS.get(db_key)
+            if pool is None:
+                with open(config_path, "r") as ymlfile:
+                    config = yaml.safe_load(ymlfile)["databases"][db_key]
+                pool = POOLS[db_key] = DBPool(db_key, config)
+    return pool
+
+@contextmanager
+def pooled_connection(db_key: str = "smartlink"):
+    """Conexión del pool para código fuera de un request (helpers, streams)."""
+    pool = get_pool(db_key)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+def get_db():
+    """
+    Dependencia de FastAPI: una conexión por request, devuelta al pool al terminar.
+        def handler(conn = Depends(get_db)): ...
+    """
+    with pooled_connection() as conn:
+        yield conn
+
+
+# --------------------- Endpoints ---------------------
+@router.get("/stats", summary="Métricas del pool de conexiones a la base de datos")
+def get_pool_stats():
+    try:
+        return [pool.stats() for pool in POOLS.values()] or [get_pool().stats()]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener las métricas del pool: {str(e)}")
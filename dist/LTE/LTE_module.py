@@ -1,3 +1,4 @@
+from smartlink.error_utils  import KEYNAME_ERROR_DICT
 import re
 import subprocess
 import json
@@ -12,6 +13,45 @@ SSH_COMMAND_LIST = [
     '/interface/lte/at-chat [find] input="AT\$GPSACP"'
 ]
 
+## Modo "script": los cuatro comandos en un solo exec. Cada valor se imprime como
+## "<sección>|<clave>=<valor>" (m = monitor, i = interface, l = lte, g = GPS, e = error)
+## y la última línea es "fin|ok=1"; si falta, la salida llegó cortada
+SSH_SCRIPT_LTE = (
+    ':do {:foreach k,v in=[/interface/lte/monitor lte1 once as-value] do={:put ("m|" . $k . "=" . [:tostr $v])}} on-error={:put "e|monitor=error"};'
+    ':do {:foreach k,v in=[/interface/get [find name=lte1]] do={:put ("i|" . $k . "=" . [:tostr $v])}} on-error={:put "e|interface=error"};'
+    ':do {:foreach k,v in=[/interface/lte/get [find name=lte1]] do={:put ("l|" . $k . "=" . [:tostr $v])}} on-error={:put "e|lte=error"};'
+    ':do {:put ("g|output=" . ([/interface/lte/at-chat lte1 input="AT\\$GPSACP" as-value]->"output"))} on-error={:put "e|gps=error"};'
+    ':put "fin|ok=1"'
+)
+SSH_MODO_COMANDOS   = "comandos"
+SSH_MODO_SCRIPT     = "script"
+
+## Campos LTE (clave de salida -> clave de RouterOS) usados por el muestreo heatmap
+LTE_BASE_DICTIONARY = {
+    "name"              : "name",
+    "type"              : "type",
+    "APN"               : "apn-profiles",
+    "manufacturer"      : "manufacturer",
+    "model"             : "model",
+    "IMEI"              : "IMEI",
+    "IMSI"              : "IMSI",
+    "status"            : "status",
+    "networkmode"       : "network-mode",
+    "rssi"              : "rssi",
+    "rsrp"              : "rsrp",
+    "rsrq"              : "rsrq",
+    "snr"               : "sinr",
+    "currentoperator"   : "current-operator",
+    "lac"               : "lac",
+    "currentcellid"     : "currentcell-id",
+    "enbid"             : "enb-id",
+    "sectorid"          : "sectorid",
+    "linkdowns"         : "link-downs",
+    "gpsLat"            : "latitud",
+    "gpsLong"           : "longitud",
+    "gpsAlt"            : "altura",
+}
+
 # Funcion para deestructurar el output del commando: "/interface/lte/monitor lte1 once"
 def parse_interface_lte_monitor_once(message: str) -> dict:
     #print(f"\nparse_interface_lte_monitor_once\n{message}")
@@ -171,8 +211,8 @@ def parse_LTE_Mikrotik_dictionary(data_ssh_list : dict = {}) -> dict:
             # last-link-down-time / last-link-up-time / link-downs
             data_dict.update( parse_interface_detail(result_command) )
         elif "/interface/lte/ print" in key_command:
-            # name / apn-profiles / network-mode
-            data_dict.update( parse_interface_lte_detail(result_command) ) 
+            # name / apn-profiles / network-mode (None si el equipo no tiene interfaz LTE)
+            data_dict.update( parse_interface_lte_detail(result_command) or {} ) 
         elif "/interface/lte/at-chat" in key_command:
             # latitude, longitude, altitude
             if "error" in result_command.lower():
@@ -183,6 +223,71 @@ def parse_LTE_Mikrotik_dictionary(data_ssh_list : dict = {}) -> dict:
     return data_dict
 
 
+# Convierte un valor de texto a int / float cuando corresponde (igual que el parser de "monitor once")
+def _to_number(value: str):
+    if value and value.replace("-", "").isdigit():
+        return int(value)
+    if value and value.replace(".", "", 1).replace("-", "", 1).isdigit():
+        return float(value)
+    return value
+
+
+## Parser de una pasada para la salida de SSH_SCRIPT_LTE. Sin 'field_map' devuelve las mismas
+## claves que parse_LTE_Mikrotik_dictionary; con 'field_map' (p.ej. LTE_BASE_DICTIONARY) las
+## claves de salida del mapa, con las comillas removidas.
+## Si falta la línea final "fin|ok=1" (canal cerrado a mitad del script) devuelve
+## {KEYNAME_ERROR_DICT: mensaje} en vez de un diccionario parcial
+_LTE_DETAIL_KEYS = ("name", "apn-profiles", "network-mode")
+_SCRIPT_FIN      = "fin|ok=1"
+
+## [:tostr] une los arreglos con ';' (network-mode=lte;3g); "print detail" los muestra con ','
+def _tostr_array(value: str) -> str:
+    return value.replace(";", ",")
+
+def parse_lte_script_output(message: str, field_map: dict = None) -> dict:
+    lines = message.splitlines()
+    if not any(line.strip() == _SCRIPT_FIN for line in reversed(lines)):
+        return {KEYNAME_ERROR_DICT: f"Salida del script LTE incompleta (sin '{_SCRIPT_FIN}')"}
+
+    data_dict   = {}
+    gps_lines   = []
+    key         = None
+    for line in lines:
+        seccion, sep, resto = line.partition("|")
+        if not sep or seccion not in ("m", "i", "l", "g", "e", "fin") or "=" not in resto:
+            # Continuación de un valor con saltos de línea (respuesta AT)
+            if key == "g":
+                gps_lines.append(line)
+            continue
+        key, _, value = resto.partition("=")
+        if seccion == "m":
+            data_dict[key.replace(" ", "_")] = _to_number(_tostr_array(value.strip()))
+        elif seccion == "i":
+            data_dict[key] = value.strip()
+        elif seccion == "l":
+            if key in _LTE_DETAIL_KEYS:
+                data_dict[key] = _tostr_array(value.strip())
+        elif seccion == "g":
+            key = "g"
+            gps_lines.append(value)
+
+    gps_output = "\n".join(gps_lines)
+    if gps_output and "error" not in gps_output.lower():
+        data_dict.update( parse_gps_data(gps_output) )
+
+    return map_lte_fields(data_dict, field_map) if field_map and data_dict else data_dict
+
+
+## Renombra las claves de RouterOS según 'field_map' (sin distinguir mayúsculas) y quita comillas
+def map_lte_fields(data_dict: dict, field_map: dict = LTE_BASE_DICTIONARY) -> dict:
+    data_lower  = {key.lower(): value for key, value in data_dict.items()}
+    mapped      = {}
+    for new_key, original_key in field_map.items():
+        value = data_lower.get(original_key.lower())
+        mapped[new_key] = value.replace('"', '') if isinstance(value, str) else value
+    return mapped
+
+
 # Parsing la respuesta del programa C en formato json
 def extract_command_outputs(salida_json: str) -> list:
     outputs = []
@@ -204,6 +309,19 @@ def extract_command_outputs(salida_json: str) -> list:
     return outputs
 
 
+## Datos LTE de un equipo por una sesión de SSHSessionPool (ssh_pool.py), con las claves de
+## parse_LTE_Mikrotik_dictionary. Lanza la excepción de la sesión si el equipo no responde
+## (o RuntimeError si la salida del script llegó cortada)
+def get_lte_data_pool(pool, ip_remote: str, modo: str = SSH_MODO_COMANDOS, timeout: float = None) -> dict:
+    if modo == SSH_MODO_SCRIPT:
+        salida = pool.run_commands(ip_remote, [SSH_SCRIPT_LTE], timeout)
+        data   = parse_lte_script_output(salida[SSH_SCRIPT_LTE])
+        if KEYNAME_ERROR_DICT in data:
+            raise RuntimeError(f"{ip_remote}: {data[KEYNAME_ERROR_DICT]}")
+        return data
+    return parse_LTE_Mikrotik_dictionary(pool.run_commands(ip_remote, SSH_COMMAND_LIST, timeout))
+
+
 # Ejecutar el programa en C y capturar la salida para datos por terminal (conexion ssh)
 def get_ip_lte_ssh(ip_remote    : str, 
                    fullpath_script : str, 
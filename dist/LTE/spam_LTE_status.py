@@ -1,10 +1,16 @@
 from smartlink.http_utils import DB_API_URL
-from LTE_module import USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, get_ip_lte_ssh
+from LTE_module import USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, SSH_MODO_COMANDOS, SSH_MODO_SCRIPT, get_lte_data_pool
+from ssh_pool import SSHSessionPool
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from time import time
+import argparse
 import zmq
 import requests
 import asyncio
 import os
+import hashlib
+import random
 import signal
 import sys
 
@@ -21,38 +27,71 @@ INTERVALO_TIEMPO        = 5                         # Frecuencia de consulta
 INTER_TIEMPO_ESTADO     = INTERVALO_TIEMPO * 2.5    # Límite para "TARDE"
 MAX_TIEMPO_ESTADO       = INTERVALO_TIEMPO * 4      # Timeout de consulta
 INTERVALO_INVENTARIO    = INTERVALO_TIEMPO * 3      # Frecuencia de actualización inventario
+MAX_BACKOFF             = 60                        # Intervalo máximo de consulta para equipos que no responden
+MAX_CONSULTAS           = 64                        # Consultas SSH simultáneas (hilos)
 
 # === API - URLs ===
 URL_API_INVENTARIO          = DB_API_URL + f"inventario/get/tipo/{TIPO}"
 INVENTARIO_FALLBACK_PATH    = "/usr/smartlink/LTE/ips_inventario.txt"
 
+# === Sesión HTTP y validadores de la última respuesta del inventario ===
+_sesion_http        = requests.Session()
+_inventario_http    = {"etag": None, "modificado": None, "huella": None}
+
 # === ZeroMQ socket ===
 context = zmq.Context()
 zmq_socket = context.socket(zmq.PUB)
 zmq_socket.bind("tcp://localhost:5555")
 
+# === Sesiones SSH persistentes: un transporte por MikroTik, los comandos van como canales ===
+SSH_POOL = SSHSessionPool(USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK,
+                          timeout       = MAX_TIEMPO_ESTADO - 1,
+                          idle_timeout  = MAX_BACKOFF * 2)
+MODO_SSH = SSH_MODO_COMANDOS        # SSH_MODO_SCRIPT: un solo exec con salida clave=valor (-s)
+
 # === Estados globales ===
 dict_ip_status      = {}
+dict_ip_metricas    = {}        # ip -> {"ultima_respuesta": timestamp, "fallos": consultas fallidas seguidas}
 lista_ips_completa  = []
-lista_ips_marca_anterior = []
-procesos_en_curso   = {}
+procesos_en_curso   = {}        # ip -> tarea de consulta periódica del equipo
 
 # === Obtener lista de IPs desde API o archivo local ===
+## La consulta es condicional: se reutiliza la conexión HTTP, se envían ETag / Last-Modified si la
+## API los entregó antes, y si el contenido no cambió se devuelve la lista actual sin parsear ni
+## reescribir el respaldo local
 def get_inventario_LTE():
     global lista_ips_completa
+    headers = {}
+    if _inventario_http["etag"]:
+        headers["If-None-Match"] = _inventario_http["etag"]
+    if _inventario_http["modificado"]:
+        headers["If-Modified-Since"] = _inventario_http["modificado"]
     try:
-        response = requests.get(URL_API_INVENTARIO, timeout = INTERVALO_INVENTARIO - 3)
+        response = _sesion_http.get(URL_API_INVENTARIO, headers = headers, timeout = INTERVALO_INVENTARIO - 3)
+        if response.status_code == 304 and lista_ips_completa:
+            return lista_ips_completa
         if response.status_code == 200:
+            _inventario_http["etag"]        = response.headers.get("ETag")
+            _inventario_http["modificado"]  = response.headers.get("Last-Modified")
+            huella = hashlib.sha1(response.content).hexdigest()
+            if huella == _inventario_http["huella"] and lista_ips_completa:
+                return lista_ips_completa
+
             data = response.json()
             lista_ips = [row["ip"] for row in data]
             # Guardar copia local
             with open(INVENTARIO_FALLBACK_PATH, "w") as f:
                 f.write("\n".join(lista_ips))
+            _inventario_http["huella"] = huella
             lista_ips_completa = lista_ips
             return lista_ips
     except Exception:
         pass
 
+    # API sin respuesta: se mantiene el inventario en uso; al iniciar se lee el respaldo local
+    if lista_ips_completa:
+        return lista_ips_completa
+
     if os.path.exists(INVENTARIO_FALLBACK_PATH):
         with open(INVENTARIO_FALLBACK_PATH, "r") as f:
             lista_ips = [line.strip() for line in f if line.strip()]
@@ -62,23 +101,22 @@ def get_inventario_LTE():
     return []
 
 
+# === Consulta SSH sobre la sesión persistente del equipo ===
+def consultar_lte(ip) -> dict:
+    return get_lte_data_pool(SSH_POOL, ip, modo = MODO_SSH, timeout = MAX_TIEMPO_ESTADO - 1)
+
+
 # === Hacer petición SSH con timeout y calcular estado ===
 async def hacer_peticion_con_estado(ip):
     inicio = time()
     try:
-        resultado = await asyncio.wait_for(
-            asyncio.to_thread(get_ip_lte_ssh, 
-                              ip_remote     = ip,
-                              fullpath_script = "/usr/smartlink/LTE/ssh_LTE_request",
-                              usuario       = USER_SSH_MIKROTIK,
-                              contraseña    = PASS_SSH_MIKROTIK,
-                              timeout_ssh   = MAX_TIEMPO_ESTADO - 1),
-            timeout = MAX_TIEMPO_ESTADO
-        )
-    except asyncio.TimeoutError:
+        resultado = await asyncio.wait_for(asyncio.to_thread(consultar_lte, ip), timeout = MAX_TIEMPO_ESTADO)
+    except Exception:
+        # Timeout, equipo inalcanzable o sesión SSH rechazada
         resultado = None
 
-    tiempo = time() - inicio
+    tiempo   = time() - inicio
+    metricas = dict_ip_metricas.setdefault(ip, {"ultima_respuesta": None, "fallos": 0})
 
     if resultado:
         resultado["ip"] = ip
@@ -86,86 +124,79 @@ async def hacer_peticion_con_estado(ip):
             resultado["Estado IP"] = ESTADOS[1]
         else:
             resultado["Estado IP"] = ESTADOS[2]
+        metricas["ultima_respuesta"] = time()
+        metricas["fallos"] = 0
     else:
         resultado = {"ip": ip,
                      "status" : "disconnected", 
                      "Estado IP": ESTADOS[3]}
+        metricas["fallos"] += 1
+
+    # Frescura y latencia de la consulta para los suscriptores
+    ultima = metricas["ultima_respuesta"]
+    resultado["latencia_consulta"]  = round(tiempo * 1000, 1)                                        # ms
+    resultado["ultima_respuesta"]   = datetime.fromtimestamp(ultima).strftime("%Y-%m-%d %H:%M:%S") if ultima else None
+    resultado["antiguedad"]         = round(time() - ultima, 1) if ultima else None                  # s
+    resultado["fallos_seguidos"]    = metricas["fallos"]
 
     return resultado
 
 
-# === Marca de tiempo ===
-async def ciclo_marca():
-    global lista_ips_marca_anterior, procesos_en_curso, dict_ip_status
-    
-    # Inicializar con todas las IPs del inventario
-    lista_ips_marca_anterior = lista_ips_completa[:]
-    
+# === Consulta periódica de un equipo ===
+## Cada resultado se publica apenas termina. Si el equipo no responde el intervalo se duplica
+## en cada falla (hasta MAX_BACKOFF) y vuelve a INTERVALO_TIEMPO en cuanto responde
+async def ciclo_equipo(ip):
+    # Desfase inicial para no abrir todas las sesiones SSH al mismo tiempo
+    await asyncio.sleep(random.uniform(0, INTERVALO_TIEMPO))
+    proxima = time()
+
     while True:
-        marca_inicio        = time()
-        resultados_marca    = []
-        nuevas_respuestas   = []
-
-        # 1. Lanzar consultas para todas las IPs del ciclo actual
-        for ip in lista_ips_marca_anterior:
-            if ip not in procesos_en_curso:
-                procesos_en_curso[ip] = asyncio.create_task(hacer_peticion_con_estado(ip))
-
-        # 2. Esperar respuestas durante el intervalo
-        tiempo_transcurrido = 0
-        while tiempo_transcurrido < INTERVALO_TIEMPO - 0.5:     # Se le resta 0.5 segundos para darle una 
-                                                                # ventana de tiempo para recibir correctamente las peticiones
-            await asyncio.sleep(0.5)    # Revisar frecuentemente
-            tiempo_transcurrido = time() - marca_inicio
-
-            # Verificar tareas completadas
-            tareas_completadas = [ip for ip, t in procesos_en_curso.items() 
-                                if t.done()]
-            
-            for ip in tareas_completadas:
-                tarea = procesos_en_curso[ip]
-                try:
-                    resultado = tarea.result()
-                    resultados_marca.append(resultado)
-                    nuevas_respuestas.append(ip)
-                    dict_ip_status[ip] = resultado["Estado IP"]
-                except Exception:
-                    # Registrar falla pero no reintentar (se manejará en próximo ciclo)
-                    dict_ip_status[ip] = ESTADOS[3]
-                finally:
-                    del procesos_en_curso[ip]  # Limpiar siempre
-
-        # 3. Enviar resultados y preparar próximo ciclo
-        for resultado in resultados_marca:
-            zmq_socket.send_json(resultado)
-
-        # 4. Solo las IPs que respondieron se consultarán en el próximo ciclo
-        lista_ips_marca_anterior = nuevas_respuestas #if nuevas_respuestas else lista_ips_completa[:]
-        
-        # 5. Asegurar intervalo exacto
-        tiempo_restante = INTERVALO_TIEMPO - (time() - marca_inicio)
-        if tiempo_restante > 0:
-            await asyncio.sleep(tiempo_restante)
+        resultado = await hacer_peticion_con_estado(ip)
+        dict_ip_status[ip] = resultado["Estado IP"]
+        zmq_socket.send_json(resultado)
+
+        fallos    = resultado["fallos_seguidos"]
+        intervalo = min(INTERVALO_TIEMPO * 2 ** fallos, MAX_BACKOFF) if fallos else INTERVALO_TIEMPO
+        proxima   = max(proxima + intervalo, time())
+        await asyncio.sleep(proxima - time())
+
+
+# === Aplicar cambios del inventario en caliente ===
+## IPs nuevas: se lanza su consulta periódica. IPs retiradas: se cancela su tarea y se cierra su sesión.
+## Las IPs que siguen en el inventario no se tocan (ni su tarea ni su sesión SSH)
+def aplicar_inventario(lista_ips):
+    vigentes    = set(lista_ips)
+    retiradas   = [ip for ip in procesos_en_curso if ip not in vigentes]
+    nuevas      = [ip for ip in dict.fromkeys(lista_ips) if ip not in procesos_en_curso]
+
+    for ip in retiradas:
+        procesos_en_curso.pop(ip).cancel()
+        dict_ip_status.pop(ip, None)
+        dict_ip_metricas.pop(ip, None)
+        # Si la sesión está en uso la cierra luego la limpieza por inactividad
+        SSH_POOL.close(ip, blocking = False)
+
+    for ip in nuevas:
+        procesos_en_curso[ip] = asyncio.create_task(ciclo_equipo(ip))
+
+    if retiradas or nuevas:
+        print(f"• Inventario actualizado: +{len(nuevas)} / -{len(retiradas)} IPs ({len(procesos_en_curso)} en consulta)")
+        if retiradas:
+            print(f"  Retiradas = {retiradas}")
+        if nuevas:
+            print(f"  Nuevas = {nuevas}")
 
 
 # === Monitor de inventario ===
 async def actualizar_inventario():
-    inventario_prev = get_inventario_LTE()
-    print(f"• Inventario obtenido = {inventario_prev}")
-
-    await asyncio.sleep(INTERVALO_INVENTARIO)
-
     while True:
         start = time()
-        nueva_lista = get_inventario_LTE()
-
-        print(f"• Inventario obtenido = {nueva_lista}")
+        nueva_lista = await asyncio.to_thread(get_inventario_LTE)
 
-        if nueva_lista and nueva_lista != inventario_prev:
-            print("\n⚠ Inventario cambiado, lanzando error...\n")
-            raise ValueError("El inventario ha cambiado")           # Lanza error en lugar de reiniciar
+        # Una lista vacía se considera una falla de la fuente, no un inventario sin equipos
+        if nueva_lista:
+            aplicar_inventario(nueva_lista)
 
-        inventario_prev = nueva_lista
         delta = max(INTERVALO_INVENTARIO - (time() - start), 0)
         await asyncio.sleep(delta)
 
@@ -184,6 +215,7 @@ def signal_handler(sig, frame):
     print("\nTerminando ejecución...")
     for tarea in procesos_en_curso.values():
         tarea.cancel()
+    SSH_POOL.close()
     sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
@@ -191,12 +223,17 @@ signal.signal(signal.SIGINT, signal_handler)
 
 # === MAIN ===
 async def main():
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(MAX_CONSULTAS))
     await asyncio.gather(
         actualizar_inventario(),
-        ciclo_marca(),
         #imprimir_estado()
     )
 
 # -------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publicador ZMQ del estado de equipos LTE")
+    parser.add_argument('-s', '--script', action='store_true', help='Consulta cada equipo con un solo script RouterOS (salida clave=valor)')
+    args = parser.parse_args()
+    if args.script:
+        MODO_SSH = SSH_MODO_SCRIPT
     asyncio.run(main())
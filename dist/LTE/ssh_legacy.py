@@ -0,0 +1,129 @@
+# =============================================================================
+#                   Smartlink - Algoritmos SSH legacy para paramiko
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  paramiko 4.0 en adelante eliminó los algoritmos sha1 que todavía usan los
+#  CPE antiguos (ver ssh_test.py). Este módulo los vuelve a registrar en
+#  paramiko.Transport para el perfil "legacy" de ssh_pool.py:
+#    - KEX   : diffie-hellman-group1-sha1, diffie-hellman-group14-sha1,
+#              diffie-hellman-group-exchange-sha1
+#    - claves: ssh-rsa (firma RSA-SHA1) y ssh-dss (solo verificación de la
+#              clave del equipo; no se usan claves DSS propias)
+#  register_legacy_algorithms() solo agrega los que falten, así que con
+#  paramiko 3.x se mantienen las implementaciones originales. Los algoritmos
+#  registrados no entran en los preferidos por defecto: solo se ofrecen
+#  cuando apply_profile() aplica el perfil legacy.
+# =============================================================================
+from cryptography.exceptions                        import InvalidSignature
+from cryptography.hazmat.primitives                 import hashes
+from cryptography.hazmat.primitives.asymmetric      import dsa
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+from paramiko.kex_group14   import KexGroup14SHA256
+from paramiko.kex_gex       import KexGexSHA256
+from paramiko.message       import Message
+from paramiko.pkey          import PKey
+from paramiko.rsakey        import RSAKey
+from paramiko.ssh_exception import SSHException
+from paramiko               import util
+from hashlib                import sha1
+import paramiko
+
+
+## RFC 2409, grupo Oakley 2 (1024 bits)
+class KexGroup1SHA1(KexGroup14SHA256):
+    P = 0xFFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7EDEE386BFB5A899FA5AE9F24117C4B1FE649286651ECE65381FFFFFFFFFFFFFFFF  # noqa
+    G = 2
+    name        = "diffie-hellman-group1-sha1"
+    hash_algo   = sha1
+
+
+class KexGroup14SHA1(KexGroup14SHA256):
+    name        = "diffie-hellman-group14-sha1"
+    hash_algo   = sha1
+
+
+## Los equipos antiguos suelen ofrecer grupos de 1024 bits
+class KexGexSHA1(KexGexSHA256):
+    name        = "diffie-hellman-group-exchange-sha1"
+    min_bits    = 1024
+    hash_algo   = sha1
+
+
+## Clave RSA que además acepta firmas "ssh-rsa" (SHA1)
+class LegacyRSAKey(RSAKey):
+    HASHES = {**RSAKey.HASHES, "ssh-rsa": hashes.SHA1}
+
+
+## Clave pública DSS del equipo: solo verifica la firma del intercambio de claves
+class LegacyDSSKey(PKey):
+    name = "ssh-dss"
+
+    def __init__(self, msg : Message = None, data : bytes = None):
+        self.public_blob = None
+        if msg is None and data is not None:
+            msg = Message(data)
+        self._check_type_and_load_cert(msg, self.name, "ssh-dss-cert-v01@openssh.com")
+        self.p = msg.get_mpint()
+        self.q = msg.get_mpint()
+        self.g = msg.get_mpint()
+        self.y = msg.get_mpint()
+        self.size = util.bit_length(self.p)
+
+
+    def asbytes(self) -> bytes:
+        m = Message()
+        m.add_string(self.name)
+        for value in (self.p, self.q, self.g, self.y):
+            m.add_mpint(value)
+        return m.asbytes()
+
+
+    @property
+    def _fields(self):
+        return (self.name, self.p, self.q, self.g, self.y)
+
+
+    def get_name(self) -> str:
+        return self.name
+
+
+    def get_bits(self) -> int:
+        return self.size
+
+
+    def can_sign(self) -> bool:
+        return False
+
+
+    def sign_ssh_data(self, data, algorithm = None):
+        raise SSHException("LegacyDSSKey solo verifica firmas")
+
+
+    def verify_ssh_sig(self, data : bytes, msg : Message) -> bool:
+        if msg.get_text() != self.name:
+            return False
+        sig = msg.get_binary()
+        if len(sig) != 40:
+            return False
+        signature = encode_dss_signature(util.inflate_long(sig[:20], True), util.inflate_long(sig[20:], True))
+        key = dsa.DSAPublicNumbers(self.y, dsa.DSAParameterNumbers(self.p, self.q, self.g)).public_key()
+        try:
+            key.verify(signature, data, hashes.SHA1())
+        except InvalidSignature:
+            return False
+        return True
+
+
+LEGACY_KEX  = {kex.name: kex for kex in (KexGroup1SHA1, KexGroup14SHA1, KexGexSHA1)}
+LEGACY_KEYS = {"ssh-rsa": LegacyRSAKey, "ssh-dss": LegacyDSSKey}
+
+
+## Registra en paramiko los algoritmos legacy que la versión instalada no trae
+def register_legacy_algorithms():
+    for name, kex in LEGACY_KEX.items():
+        paramiko.Transport._kex_info.setdefault(name, kex)
+    for name, key in LEGACY_KEYS.items():
+        paramiko.Transport._key_info.setdefault(name, key)
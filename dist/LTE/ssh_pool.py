@@ -0,0 +1,295 @@
+# =============================================================================
+#                   Smartlink - Sesiones SSH persistentes (MikroTik)
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Mantiene un transporte SSH autenticado por equipo y ejecuta cada lote de
+#  comandos como canales sobre ese mismo transporte (sin lanzar un proceso ni
+#  repetir el handshake en cada consulta):
+#    - los comandos de un lote se abren en paralelo, hasta 'max_canales'
+#    - keepalive del transporte para que el NAT / RouterOS no lo corte
+#    - los transportes sin uso por más de 'idle_timeout' se cierran
+#    - si un transporte reutilizado falla se reconecta una vez y se reintenta
+#    - perfiles de algoritmos por equipo: "moderno" (los de paramiko) o
+#      "legacy" (agrega KEX sha1 / ssh-rsa / ssh-dss / CBC para CPE antiguos,
+#      ver ssh_test.py). Si la negociación falla con "moderno" se prueba
+#      "legacy" y queda asignado al equipo. Solo se ofrecen los algoritmos que
+#      la versión instalada de paramiko soporta; los que falten se avisan al
+#      aplicar el perfil y en el error del handshake.
+#  Versión de paramiko: 3.x trae todos los algoritmos del perfil "legacy"; desde
+#  4.0 los KEX sha1 y ssh-rsa / ssh-dss se registran con ssh_legacy.py. Si aun
+#  así el perfil no agrega ningún KEX ni tipo de clave, no se reintenta con él.
+# =============================================================================
+from smartlink.error_utils  import KEYNAME_ERROR_DICT
+import threading
+import json
+import paramiko
+import socket
+import time
+import sys
+import os
+
+## También se importa como LTE.ssh_pool (heatmap): ssh_legacy está en esta misma carpeta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from ssh_legacy             import register_legacy_algorithms
+
+SSH_PORT = 22
+
+PERFIL_MODERNO  = "moderno"
+PERFIL_LEGACY   = "legacy"
+SSH_PROFILES    = {
+    PERFIL_MODERNO  : {},
+    PERFIL_LEGACY   : {
+        "kex"       : ("diffie-hellman-group1-sha1", "diffie-hellman-group14-sha1", "diffie-hellman-group-exchange-sha1"),
+        "key_types" : ("ssh-rsa", "ssh-dss"),
+        "ciphers"   : ("aes128-cbc", "aes256-cbc", "3des-cbc"),
+    },
+}
+
+register_legacy_algorithms()
+
+## Algoritmos soportados por paramiko para cada opción de seguridad
+_SUPPORTED = {
+    "kex"       : (paramiko.Transport._preferred_kex, paramiko.Transport._kex_info),
+    "key_types" : (paramiko.Transport._preferred_keys, paramiko.Transport._key_info),
+    "ciphers"   : (paramiko.Transport._preferred_ciphers, paramiko.Transport._cipher_info),
+}
+
+
+## Algoritmos del perfil que la versión instalada de paramiko no soporta
+def unavailable_algorithms(perfil : str) -> list:
+    return [name for option, extra in SSH_PROFILES[perfil].items()
+            for name in extra if name not in _SUPPORTED[option][1]]
+
+_UNAVAILABLE    = {perfil: unavailable_algorithms(perfil) for perfil in SSH_PROFILES}
+_warned         = set()
+
+## El reintento con "legacy" solo tiene sentido si ofrece algún KEX o tipo de clave nuevo
+_LEGACY_NEGOCIABLE = any(
+    name not in _UNAVAILABLE[PERFIL_LEGACY]
+    for option in ("kex", "key_types") for name in SSH_PROFILES[PERFIL_LEGACY][option]
+)
+
+
+## Perfil fijado en la anotación del inventario, p.ej. {"perfil_ssh": "legacy"} (None si no hay)
+def profile_from_inventory(row : dict):
+    anotacion = row.get("anotacion")
+    try:
+        anotacion = json.loads(anotacion) if isinstance(anotacion, str) else anotacion
+    except ValueError:
+        return None
+    perfil = anotacion.get("perfil_ssh") if isinstance(anotacion, dict) else None
+    return perfil if perfil in SSH_PROFILES else None
+
+
+## Aplica un perfil: los algoritmos por defecto de paramiko y, a continuación, los del perfil.
+## Los que paramiko no soporta no se pueden ofrecer: se avisa una vez por perfil
+def apply_profile(transport : paramiko.Transport, perfil : str):
+    if _UNAVAILABLE[perfil] and perfil not in _warned:
+        _warned.add(perfil)
+        print(f"⚠ Perfil SSH '{perfil}': paramiko {paramiko.__version__} no soporta {', '.join(_UNAVAILABLE[perfil])}")
+    options = transport.get_security_options()
+    for option, extra in SSH_PROFILES[perfil].items():
+        preferred, supported = _SUPPORTED[option]
+        setattr(options, option, tuple(dict.fromkeys(
+            [name for name in preferred] + [name for name in extra if name in supported]
+        )))
+
+
+class SSHSessionPool(object):
+    """
+    Uso:
+        pool = SSHSessionPool(usuario, contraseña)
+        salida = pool.run_commands(ip, ["/interface print detail", ...])   # {comando: salida}
+    Es seguro usarlo desde varios hilos; las consultas a un mismo equipo se
+    serializan sobre su transporte.
+    """
+
+    def __init__(self, user : str, password : str, timeout : float = 5, keepalive : int = 10,
+                 idle_timeout : float = 120, max_canales : int = 4, port : int = SSH_PORT,
+                 perfiles : dict = None):
+        self.user           = user
+        self.password       = password
+        self.timeout        = timeout
+        self.keepalive      = keepalive
+        self.idle_timeout   = idle_timeout
+        self.max_canales    = max(1, max_canales)
+        self.port           = port
+        self._perfiles      = dict(perfiles or {})      # ip -> perfil fijo o detectado
+        self._sessions      = {}        # ip -> {"transport", "lock", "last_used"}
+        self._lock          = threading.Lock()
+        self._last_eviction = time.monotonic()
+
+
+    def _entry(self, ip : str) -> dict:
+        with self._lock:
+            entry = self._sessions.get(ip)
+            if entry is None:
+                entry = self._sessions[ip] = {"transport": None, "lock": threading.Lock(), "last_used": time.monotonic()}
+            return entry
+
+
+    def set_profile(self, ip : str, perfil : str):
+        if perfil not in SSH_PROFILES:
+            raise ValueError(f"Perfil SSH desconocido: {perfil}")
+        self._perfiles[ip] = perfil
+
+
+    def _connect(self, ip : str, timeout : float) -> paramiko.Transport:
+        perfil = self._perfiles.get(ip, PERFIL_MODERNO)
+        try:
+            return self._handshake(ip, timeout, perfil)
+        except paramiko.IncompatiblePeer:
+            # Solo una negociación fallida pasa a "legacy"; un timeout del banner u otro
+            # SSHException no debe dejar al equipo fijado en ese perfil
+            if perfil != PERFIL_MODERNO or not _LEGACY_NEGOCIABLE:
+                raise
+        # El equipo no negocia con los algoritmos actuales: se prueba el perfil legacy y se recuerda
+        transport = self._handshake(ip, timeout, PERFIL_LEGACY)
+        self._perfiles[ip] = PERFIL_LEGACY
+        return transport
+
+
+    def _handshake(self, ip : str, timeout : float, perfil : str) -> paramiko.Transport:
+        sock = socket.create_connection((ip, self.port), timeout = timeout)
+        transport = paramiko.Transport(sock)
+        try:
+            apply_profile(transport, perfil)
+            transport.banner_timeout    = timeout
+            transport.auth_timeout      = timeout
+            transport.start_client(timeout = timeout)
+            transport.auth_password(self.user, self.password)
+            transport.set_keepalive(self.keepalive)
+        except paramiko.AuthenticationException:
+            transport.close()
+            raise
+        except paramiko.SSHException as e:
+            transport.close()
+            if not _UNAVAILABLE[perfil]:
+                raise
+            # La negociación pudo fallar por un algoritmo que esta versión de paramiko ya no trae
+            # (se mantiene el tipo de la excepción, p.ej. IncompatiblePeer)
+            raise type(e)(
+                f"{e} (perfil {perfil} incompleto: paramiko {paramiko.__version__} no soporta "
+                f"{', '.join(_UNAVAILABLE[perfil])})"
+            ) from e
+        except Exception:
+            transport.close()
+            raise
+        return transport
+
+
+    @staticmethod
+    def _read_channel(channel, deadline : float) -> str:
+        chunks = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("Tiempo agotado esperando la salida del comando")
+            channel.settimeout(remaining)
+            data = channel.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+        return b"".join(chunks).decode(errors = "replace")
+
+
+    def _run_batch(self, transport : paramiko.Transport, commands : list, timeout : float) -> dict:
+        deadline    = time.monotonic() + timeout
+        output      = {}
+        for start in range(0, len(commands), self.max_canales):
+            channels = []
+            try:
+                # Todos los canales del grupo se ejecutan a la vez en el equipo
+                for command in commands[start:start + self.max_canales]:
+                    channel = transport.open_session(timeout = max(0.1, deadline - time.monotonic()))
+                    channel.exec_command(command)
+                    channels.append((command, channel))
+                for command, channel in channels:
+                    output[command] = self._read_channel(channel, deadline)
+            finally:
+                for _, channel in channels:
+                    channel.close()
+        return output
+
+
+    ## Ejecuta 'commands' en 'ip' y devuelve {comando: salida}. Lanza la excepción si el equipo no responde
+    def run_commands(self, ip : str, commands : list, timeout : float = None) -> dict:
+        timeout = timeout or self.timeout
+        self.evict_idle()
+        while True:
+            entry = self._entry(ip)
+            with entry["lock"]:
+                # La entrada pudo cerrarse por inactividad mientras se esperaba el lock
+                if self._sessions.get(ip) is not entry:
+                    continue
+                return self._run_locked(ip, entry, commands, timeout)
+
+
+    def _run_locked(self, ip : str, entry : dict, commands : list, timeout : float) -> dict:
+        for intento in (1, 2):
+            reused = entry["transport"] is not None and entry["transport"].is_active()
+            try:
+                if not reused:
+                    self._close_transport(entry)
+                    entry["transport"] = self._connect(ip, timeout)
+                output = self._run_batch(entry["transport"], commands, timeout)
+                entry["last_used"] = time.monotonic()
+                return output
+            except (paramiko.SSHException, OSError, EOFError):
+                self._close_transport(entry)
+                # Un transporte reutilizado pudo quedar muerto: se reconecta una vez
+                if not reused or intento == 2:
+                    raise
+
+
+    ## Igual que mySSHClient.mapping_command_ssh: {comando: salida} o {KEYNAME_ERROR_DICT: mensaje}
+    def mapping_command_ssh(self, ip : str, commands : list, timeout : float = None) -> dict:
+        try:
+            return self.run_commands(ip, commands, timeout)
+        except Exception as e:
+            return {KEYNAME_ERROR_DICT: f"SSH {ip}: {type(e).__name__} {e}"}
+
+
+    @staticmethod
+    def _close_transport(entry : dict):
+        if entry["transport"] is not None:
+            try:
+                entry["transport"].close()
+            except Exception:
+                pass
+            entry["transport"] = None
+
+
+    ## Cierra los transportes sin uso por más de idle_timeout (como mucho una revisión cada 10 s)
+    def evict_idle(self):
+        now = time.monotonic()
+        if now - self._last_eviction < min(10, self.idle_timeout):
+            return
+        self._last_eviction = now
+        with self._lock:
+            idle = [ip for ip, entry in self._sessions.items() if now - entry["last_used"] > self.idle_timeout]
+        for ip in idle:
+            self.close(ip, blocking = False)
+
+
+    def close(self, ip : str = None, blocking : bool = True):
+        with self._lock:
+            ips = list(self._sessions) if ip is None else [ip]
+        for ip_session in ips:
+            entry = self._sessions.get(ip_session)
+            if entry is None or not entry["lock"].acquire(blocking):
+                continue        # en uso: se revisará en la próxima pasada
+            try:
+                self._close_transport(entry)
+                with self._lock:
+                    self._sessions.pop(ip_session, None)
+            finally:
+                entry["lock"].release()
+
+
+    def active(self) -> int:
+        with self._lock:
+            return sum(1 for entry in self._sessions.values() if entry["transport"] is not None)
@@ -9,13 +9,13 @@
 from smartlink.models.LTE_data_models       import LTE as Model
 from smartlink.models.ubicacion_gps_models  import UbicacionGPS
 from smartlink.error_utils  import KEYNAME_ERROR_DICT, multiple_storage_errors
-from smartlink.ssh_utils    import mySSHClient
 from smartlink.snmp_utils   import mySNMPClient
 from smartlink.global_utils import FOLDER_OUTPUT, group_ips
 from smartlink.csv_utils    import write_log_files, restart_log_file
 from smartlink.http_utils   import DB_API_URL, get_request_to_url, get_request_to_url_with_filters, post_request_to_url_model_array
 from smartlink.json_utils   import load_json_to_dict
-from LTE_module             import USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, SSH_COMMAND_LIST, parse_LTE_Mikrotik_dictionary
+from LTE_module             import USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, SSH_COMMAND_LIST, SSH_SCRIPT_LTE, parse_LTE_Mikrotik_dictionary, parse_lte_script_output
+from ssh_pool               import SSHSessionPool, profile_from_inventory
 from concurrent.futures     import ThreadPoolExecutor
 from datetime               import datetime
 import argparse
@@ -42,6 +42,7 @@ _DEBUG_MODE = False
 parser = argparse.ArgumentParser(description="Script para capturar datos LTE por SSH y SNMP")
 parser.add_argument('-d', '--debug', action='store_true', help='Enable debug mode')
 parser.add_argument('-t', '--test', action='store_true', help='Enable test environment')
+parser.add_argument('-s', '--script', action='store_true', help='Consulta SSH en un solo script RouterOS (salida clave=valor)')
 args = parser.parse_args()
 _DEBUG_MODE = args.debug
 
@@ -49,23 +50,26 @@ _DEBUG_MODE = args.debug
 base_dict_snmp = load_json_to_dict( os.path.join(oid_folder, "mikrotik2024.json") )
 global_error_array = []
 
+## Sesiones SSH (canales en paralelo y perfiles de algoritmos por equipo)
+SSH_POOL = SSHSessionPool(USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, timeout = 10)
+
 ## Funciones personzalidas
 def async_task(ip_device, conf_snmp, queue : queue.Queue):
     hora_de_consulta        = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # - - - - - Obtenemos los datos SSH
-    ssh_agent = mySSHClient(ip_target       = ip_device, 
-                            user_ssh        = USER_SSH_MIKROTIK, 
-                            password_ssh    = PASS_SSH_MIKROTIK,
-                            debug_mode      = _DEBUG_MODE, 
-                            timeout         = 10)
-    
-    data_ssh_dict = ssh_agent.mapping_command_ssh(SSH_COMMAND_LIST, 3, False)
+    data_ssh_dict = SSH_POOL.mapping_command_ssh(ip_device, [SSH_SCRIPT_LTE] if args.script else SSH_COMMAND_LIST)
     error_ssh = data_ssh_dict.pop(KEYNAME_ERROR_DICT, None)
     if error_ssh:
         error_ssh = [ip_device, hora_de_consulta, error_ssh]
         queue.put( [{}, {}, error_ssh] )
-    data_ssh = parse_LTE_Mikrotik_dictionary(data_ssh_dict)
+    if args.script:
+        data_ssh = parse_lte_script_output(data_ssh_dict.get(SSH_SCRIPT_LTE, ""))
+        error_parse = data_ssh.pop(KEYNAME_ERROR_DICT, None)
+        if error_parse and not error_ssh:
+            queue.put( [{}, {}, [ip_device, hora_de_consulta, error_parse]] )
+    else:
+        data_ssh = parse_LTE_Mikrotik_dictionary(data_ssh_dict)
 
 
     # - - - - - Obtenemos los datos SNMP
@@ -125,6 +129,9 @@ try:
     filter_database = ["tipo", TIPO]
     raw_inventory   = get_request_to_url_with_filters(DB_INVENTARIO_URL, filter_array = filter_database)
     subscribers     = [ [row["ip"], row["snmp_conf"]] for row in raw_inventory]
+    for row in raw_inventory:
+        if perfil := profile_from_inventory(row):
+            SSH_POOL.set_profile(row["ip"], perfil)
 
     # Chequeamos el numero de equipos Cambiumm detectados
     num_cambium     = len( subscribers )
@@ -177,6 +184,7 @@ try:
                 post_request_to_url_model_array(URL_GPS_LIST, array_model_to_post = gps_array_list)
 
     ## -----------Final del ThreadPoolExecutor -------------- ##
+    SSH_POOL.close()
     try:
         if global_error_array:
             print(f"\n\n - - - - - - - - Procesando errores encontrados durante la ejecucion - - - - - - - - ")
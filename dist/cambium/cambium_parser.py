@@ -0,0 +1,137 @@
+# =============================================================================
+#                   Smartlink - Plan de parseo de respuestas SNMP Cambium
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+#  Tablas        : cambium_data, ubicacion_gps
+# =============================================================================
+#  Cada JSON de OID (PMPAP / PMPSM) se compila una sola vez en un plan:
+#    - orden fijo de claves y OID, con la posición de cada campo que se guarda
+#    - lista precalculada de campos extra para 'ifresults_metricas' (todo lo
+#      que no es GPS ni un campo fijo)
+#    - expresión regular de "dBm V/H" compilada
+#  transform_values() arma [data_snmp, dictionary_gps, error_msg] en una sola
+#  pasada a partir de los valores en el orden del plan (motor SNMP asíncrono);
+#  transform() hace lo mismo con el diccionario de mySNMPClient. La salida es
+#  la misma que generaba async_task en update_cambium_data.py.
+# =============================================================================
+from smartlink.error_utils  import KEYNAME_ERROR_DICT
+from functools              import lru_cache
+import re
+
+_AVG_POWER_REGEX    = re.compile(r"(-?\d+\.\d+)\s*dBm\s*[VH]")
+
+## Campos que arma el parser; las claves del JSON que empiezan con alguno de ellos no son "extra"
+_FIXED_FIELDS       = ("ip", "fecha", "avg_power", "link_radio", "snr")
+_FIELD_KEYS         = ("avg_power", "link_radio_tx", "link_radio_rx", "snr_v", "snr_h", "GPSLat", "GPSLon", "GPSAlt")
+
+
+def _gps_float(value) -> float:
+    if value is None:
+        return 0.0
+    return float(str(value).replace('+', '').strip() or 0)
+
+
+class CambiumParsePlan(object):
+    __slots__ = ("tipo", "keys", "oids", "oid_map", "is_ap", "_index", "_extras")
+
+    def __init__(self, tipo : str, oid_items : tuple):
+        self.tipo       = tipo
+        self.keys       = tuple(key for key, _ in oid_items)
+        self.oids       = tuple(oid for _, oid in oid_items)
+        self.oid_map    = dict(oid_items)
+        self.is_ap      = "-AP" in tipo
+        position        = {key: index for index, key in enumerate(self.keys)}
+        # Posición de cada campo fijo (None si el JSON no lo define)
+        self._index     = tuple(position.get(key) for key in _FIELD_KEYS)
+        self._extras    = tuple(
+            (key, index) for index, key in enumerate(self.keys)
+            if "GPS" not in key.upper() and not key.startswith(_FIXED_FIELDS)
+        )
+
+
+    def transform_values(self, ip_device : str, fecha_device : str, values : list):
+        """[data_snmp, dictionary_gps, error_msg] desde los valores en el orden de self.oids."""
+        if not self.keys:
+            return None
+
+        def _get(slot, default = None):
+            return values[slot] if slot is not None else default
+
+        i_avg, i_tx, i_rx, i_snr_v, i_snr_h, i_lat, i_lon, i_alt = self._index
+
+        ## Avg power rx/tx
+        message_avg_power = _get(i_avg)
+        if self.is_ap:
+            avg_power = {"tx" : float(message_avg_power) if message_avg_power is not None else None}
+        else:
+            matches = [float(m) for m in _AVG_POWER_REGEX.findall(message_avg_power)] if message_avg_power else [0, 0]
+            avg_power = {
+                "rx" : matches[0] if len(matches) > 0 else None,
+                "tx" : matches[1] if len(matches) > 1 else None
+            }
+
+        data_snmp = {
+            "ip"                    : ip_device,
+            "fecha"                 : fecha_device,
+            "avg_power"             : avg_power,
+            "link_radio"            : {"tx" : _get(i_tx), "rx" : _get(i_rx)},
+            "snr"                   : {"V" : _get(i_snr_v), "H" : _get(i_snr_h)},
+            "ifresults_metricas"    : {key: values[index] for key, index in self._extras} or None,
+        }
+
+        latitud  = _gps_float(_get(i_lat))
+        longitud = _gps_float(_get(i_lon))
+        dictionary_gps = {
+            "ip"        : ip_device,
+            "fecha"     : fecha_device,
+            "latitud"   : latitud,
+            "longitud"  : longitud,
+            "altitud"   : _gps_float(_get(i_alt))
+        } if latitud and longitud else {}
+
+        return [data_snmp, dictionary_gps, None]
+
+
+    def transform(self, ip_device : str, fecha_device : str, data_snmp_raw : dict):
+        """Igual que transform_values, a partir del diccionario de mySNMPClient.mapping_OID_dict."""
+        error_msg = data_snmp_raw.pop(KEYNAME_ERROR_DICT, None)
+        if error_msg:
+            error_msg = [ip_device, fecha_device, error_msg]
+        if not data_snmp_raw:
+            return [{}, {}, error_msg] if error_msg else None
+
+        result = self.transform_values(ip_device, fecha_device, [data_snmp_raw.get(key) for key in self.keys])
+        if result is None:
+            return [{}, {}, error_msg] if error_msg else None
+        result[2] = error_msg
+        return result
+
+
+@lru_cache(maxsize = 32)
+def _compile(tipo : str, oid_items : tuple) -> CambiumParsePlan:
+    return CambiumParsePlan(tipo, oid_items)
+
+
+## Último plan por tipo junto al mapa de OID del que salió: tipo -> (oid_map, plan).
+## Se guarda el propio dict (no su id) para que no se reutilice su id tras liberarlo
+_PLANS = {}
+
+
+## Plan (cacheado) para el tipo de equipo. Mientras llegue el mismo dict de OID
+## (OidMapCache lo reemplaza solo si cambia el archivo) se resuelve por identidad, sin
+## armar ni hashear la tupla de OID por equipo; un dict nuevo con el mismo contenido
+## reutiliza el plan compilado de _compile
+def get_parse_plan(tipo_PMP : str, oid_maps : dict) -> CambiumParsePlan:
+    if "-AP" in tipo_PMP:
+        tipo = "-AP"
+    elif "-SM" in tipo_PMP:
+        tipo = "-SM"
+    else:
+        return _compile("", ())
+    oid_map = oid_maps[tipo]
+    cached  = _PLANS.get(tipo)
+    if cached is None or cached[0] is not oid_map:
+        cached = _PLANS[tipo] = (oid_map, _compile(tipo, tuple(oid_map.items())))
+    return cached[1]
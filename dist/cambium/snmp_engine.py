@@ -0,0 +1,368 @@
+# =============================================================================
+#                   Smartlink - Motor SNMP asíncrono (v1 / v2c)
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Consulta muchos equipos a la vez sobre un único socket UDP:
+#    - Cada respuesta se empareja con su consulta por request-id (y IP origen).
+#    - Todos los OID de un equipo viajan en la misma PDU: un GET de los OID
+#      tal cual (instancias, p. ej. ifInOctets.1) y, en paralelo, un GETBULK
+#      (GETNEXT en v1) que recorre cada OID como subárbol. Si el agente
+#      responde tooBig se reduce el tamaño de la PDU y se reintenta.
+#    - mapping() retorna el mismo formato que mySNMPClient.mapping_OID_dict:
+#      un valor si el subárbol tiene una instancia, lista si tiene varias y
+#      None si no hay valor. Si el equipo no responde lanza SNMPError.
+#  SNMPv3 no está soportado: esos equipos siguen usando mySNMPClient.
+# =============================================================================
+import asyncio
+import random
+import socket
+
+SNMP_PORT           = 161
+SNMP_V1             = 0         # valor del campo 'version' en el mensaje
+SNMP_V2C            = 1
+
+_GET_REQUEST        = 0xA0
+_GET_NEXT_REQUEST   = 0xA1
+_RESPONSE           = 0xA2
+_GET_BULK_REQUEST   = 0xA5
+
+_ERROR_TOO_BIG      = 1
+_ERROR_NO_SUCH_NAME = 2
+
+_NO_SUCH_OBJECT     = 0x80
+_NO_SUCH_INSTANCE   = 0x81
+_END_OF_MIB_VIEW    = 0x82
+
+MAX_VARBINDS        = 32        # OID por PDU como máximo
+MAX_VALUES_PER_OID  = 1024      # tope de instancias por subárbol (protección ante agentes defectuosos)
+
+
+class SNMPError(Exception):
+    pass
+
+
+class SNMPTimeout(SNMPError):
+    pass
+
+
+## Marcador para noSuchObject / noSuchInstance / endOfMibView
+class _Exception(object):
+    __slots__ = ("tag",)
+
+    def __init__(self, tag : int):
+        self.tag = tag
+
+
+''' -------------------------------------------------------------------------- '''
+## Codificación BER (solo los tipos que usan las PDU de consulta)
+def _encode_length(length : int) -> bytes:
+    if length < 0x80:
+        return bytes([length])
+    raw = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([0x80 | len(raw)]) + raw
+
+
+def _tlv(tag : int, value : bytes) -> bytes:
+    return bytes([tag]) + _encode_length(len(value)) + value
+
+
+def _encode_integer(value : int) -> bytes:
+    return _tlv(0x02, value.to_bytes(max(1, (value.bit_length() + 8) // 8), "big", signed = True))
+
+
+def _encode_oid(oid : str) -> bytes:
+    arcs = [int(arc) for arc in oid.strip(".").split(".")]
+    body = bytearray([40 * arcs[0] + arcs[1]])
+    for arc in arcs[2:]:
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        body.extend(reversed(chunk))
+    return _tlv(0x06, bytes(body))
+
+
+def encode_request(version : int, community : str, pdu_type : int, request_id : int,
+                   oids : list, non_repeaters : int = 0, max_repetitions : int = 0) -> bytes:
+    varbinds = b"".join(_tlv(0x30, _encode_oid(oid) + b"\x05\x00") for oid in oids)
+    pdu = _tlv(pdu_type, _encode_integer(request_id) + _encode_integer(non_repeaters)
+               + _encode_integer(max_repetitions) + _tlv(0x30, varbinds))
+    return _tlv(0x30, _encode_integer(version) + _tlv(0x04, community.encode()) + pdu)
+
+
+''' -------------------------------------------------------------------------- '''
+## Decodificación BER
+def _read_tlv(data : bytes, offset : int):
+    tag     = data[offset]
+    length  = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size    = length & 0x7F
+        length  = int.from_bytes(data[offset:offset + size], "big")
+        offset += size
+    end = offset + length
+    if end > len(data):
+        raise SNMPError("Respuesta SNMP truncada")
+    return tag, data[offset:end], end
+
+
+def _decode_oid(raw : bytes) -> str:
+    arcs    = list(divmod(raw[0], 40)) if raw[0] < 80 else [2, raw[0] - 80]
+    value   = 0
+    for byte in raw[1:]:
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = 0
+    return ".".join(str(arc) for arc in arcs)
+
+
+def _decode_octets(raw : bytes):
+    try:
+        text = raw.decode("utf-8")
+        if text.isprintable():
+            return text
+    except UnicodeDecodeError:
+        pass
+    return "0x" + raw.hex()
+
+
+def _decode_value(tag : int, raw : bytes):
+    if tag == 0x02:
+        return int.from_bytes(raw, "big", signed = True)
+    if tag == 0x04:
+        return _decode_octets(raw)
+    if tag == 0x05:
+        return None
+    if tag == 0x06:
+        return _decode_oid(raw)
+    if tag == 0x40:
+        return ".".join(str(byte) for byte in raw)
+    if tag in (0x41, 0x42, 0x43, 0x46, 0x47):       # Counter32, Gauge32, TimeTicks, Counter64, UInteger32
+        return int.from_bytes(raw, "big")
+    if tag in (_NO_SUCH_OBJECT, _NO_SUCH_INSTANCE, _END_OF_MIB_VIEW):
+        return _Exception(tag)
+    return "0x" + raw.hex()
+
+
+def decode_response(data : bytes):
+    """Retorna (request_id, error_status, error_index, [(oid, valor), ...])."""
+    _, message, _   = _read_tlv(data, 0)
+    _, _, offset    = _read_tlv(message, 0)                 # version
+    _, _, offset    = _read_tlv(message, offset)            # comunidad
+    pdu_type, pdu, _ = _read_tlv(message, offset)
+    if pdu_type != _RESPONSE:
+        raise SNMPError(f"PDU inesperada 0x{pdu_type:02X}")
+
+    _, raw_id, offset       = _read_tlv(pdu, 0)
+    _, raw_status, offset   = _read_tlv(pdu, offset)
+    _, raw_index, offset    = _read_tlv(pdu, offset)
+    _, raw_varbinds, _      = _read_tlv(pdu, offset)
+
+    varbinds, offset = [], 0
+    while offset < len(raw_varbinds):
+        _, varbind, offset  = _read_tlv(raw_varbinds, offset)
+        _, raw_oid, inner   = _read_tlv(varbind, 0)
+        tag, raw_value, _   = _read_tlv(varbind, inner)
+        varbinds.append((_decode_oid(raw_oid), _decode_value(tag, raw_value)))
+
+    return (int.from_bytes(raw_id, "big", signed = True), int.from_bytes(raw_status, "big"),
+            int.from_bytes(raw_index, "big"), varbinds)
+
+
+def _oid_key(oid : str) -> tuple:
+    return tuple(int(arc) for arc in oid.strip(".").split("."))
+
+
+''' -------------------------------------------------------------------------- '''
+class _Protocol(asyncio.DatagramProtocol):
+
+    def __init__(self, engine):
+        self._engine = engine
+
+    def datagram_received(self, data, addr):
+        self._engine._on_datagram(data, addr)
+
+    def error_received(self, exc):
+        pass
+
+
+class AsyncSNMPEngine(object):
+    """
+    Motor SNMP v1/v2c sobre un solo socket UDP. Uso:
+        async with AsyncSNMPEngine() as engine:
+            datos = await engine.mapping(ip, "public", SNMP_V2C, oid_dict)
+    """
+
+    def __init__(self, max_in_flight : int = 512, timeout : float = 2.5, retries : int = 1,
+                 max_repetitions : int = 10, port : int = SNMP_PORT):
+        self._max_in_flight     = max_in_flight
+        self._port              = port
+        self._timeout           = timeout
+        self._retries           = retries
+        self._max_repetitions   = max_repetitions
+        self._request_id        = random.randint(1, 0x3FFFFFFF)
+        self._pending           = {}        # request_id -> (ip, future)
+        self._transport         = None
+        self._slots             = None
+
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self._max_in_flight)
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: _Protocol(self), family = socket.AF_INET)
+        try:
+            self._transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        except OSError:
+            pass
+        return self
+
+
+    async def __aexit__(self, *exc):
+        self._transport.close()
+        for _, future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+
+    def _next_request_id(self) -> int:
+        while True:
+            self._request_id = self._request_id % 0x7FFFFFFF + 1
+            if self._request_id not in self._pending:
+                return self._request_id
+
+
+    def _on_datagram(self, data : bytes, addr):
+        try:
+            response = decode_response(data)
+        except (SNMPError, IndexError, ValueError):
+            return
+        entry = self._pending.get(response[0])
+        if entry is None or entry[0] != addr[0]:
+            return
+        if not entry[1].done():
+            entry[1].set_result(response[1:])
+
+
+    async def request(self, ip : str, community : str, version : int, pdu_type : int, oids : list,
+                      max_repetitions : int = 0):
+        """Una PDU con reintentos. Retorna (error_status, error_index, varbinds)."""
+        async with self._slots:
+            for _ in range(self._retries + 1):
+                request_id  = self._next_request_id()
+                future      = asyncio.get_running_loop().create_future()
+                self._pending[request_id] = (ip, future)
+                try:
+                    self._transport.sendto(encode_request(version, community, pdu_type, request_id, oids,
+                                                          max_repetitions = max_repetitions), (ip, self._port))
+                    return await asyncio.wait_for(future, self._timeout)
+                except asyncio.TimeoutError:
+                    continue
+                finally:
+                    self._pending.pop(request_id, None)
+        raise SNMPTimeout(f"Sin respuesta SNMP de {ip} tras {self._retries + 1} intentos")
+
+
+    async def get(self, ip : str, community : str, version : int, oids : list) -> dict:
+        """GET de instancias exactas. Retorna {oid: valor} solo con las que existen."""
+        values, pending = {}, list(oids)
+        while pending:
+            chunk = pending[:MAX_VARBINDS]
+            status, index, varbinds = await self.request(ip, community, version, _GET_REQUEST, chunk)
+            if status == _ERROR_NO_SUCH_NAME and 0 < index <= len(chunk):
+                # v1: una sola instancia inexistente invalida la PDU; se quita y se reintenta
+                del pending[index - 1]
+                continue
+            if status == _ERROR_TOO_BIG and len(chunk) > 1:
+                for half in (chunk[:len(chunk) // 2], chunk[len(chunk) // 2:]):
+                    values.update(await self.get(ip, community, version, half))
+                del pending[:len(chunk)]
+                continue
+            if status:
+                raise SNMPError(f"GET de {ip} respondió error-status {status}")
+            for (requested, (_, value)) in zip(chunk, varbinds):
+                if not isinstance(value, _Exception):
+                    values[requested] = value
+            del pending[:len(chunk)]
+        return values
+
+
+    async def walk(self, ip : str, community : str, version : int, roots : list) -> dict:
+        """Recorre varios subárboles a la vez. Retorna {raiz: [valores en orden de OID]}."""
+        results     = {root: [] for root in roots}
+        prefixes    = {root: _oid_key(root) for root in roots}
+        cursor      = {root: root for root in roots}        # último OID recibido por subárbol
+        active      = list(roots)
+        repetitions = self._max_repetitions
+        per_pdu     = MAX_VARBINDS
+
+        while active:
+            columns = active[:per_pdu]
+            if version == SNMP_V1:
+                status, index, varbinds = await self.request(ip, community, version, _GET_NEXT_REQUEST,
+                                                             [cursor[root] for root in columns])
+                if status == _ERROR_NO_SUCH_NAME and 0 < index <= len(columns):
+                    active.remove(columns[index - 1])       # fin de la MIB para esa columna
+                    continue
+            else:
+                status, index, varbinds = await self.request(ip, community, version, _GET_BULK_REQUEST,
+                                                             [cursor[root] for root in columns], repetitions)
+                if status == _ERROR_TOO_BIG and (repetitions > 1 or per_pdu > 1):
+                    if repetitions > 1:
+                        repetitions //= 2
+                    else:
+                        per_pdu = max(1, min(per_pdu, len(columns)) // 2)
+                    continue
+            if status:
+                raise SNMPError(f"Consulta de {ip} respondió error-status {status}")
+
+            # GETBULK entrega las repeticiones fila por fila: [c0, c1, ..., c0, c1, ...]
+            finished, progress = set(), False
+            for position, (oid, value) in enumerate(varbinds):
+                root = columns[position % len(columns)]
+                if root in finished:
+                    continue
+                key = _oid_key(oid)
+                if (isinstance(value, _Exception) or key[:len(prefixes[root])] != prefixes[root]
+                        or key <= _oid_key(cursor[root]) or len(results[root]) >= MAX_VALUES_PER_OID):
+                    finished.add(root)
+                    continue
+                results[root].append(value)
+                cursor[root] = oid
+                progress = True
+
+            # Un agente que recorta la respuesta deja columnas sin datos: siguen en la próxima PDU
+            if not progress and not finished:
+                break
+            active = [root for root in active if root not in finished]
+        return results
+
+
+    async def values(self, ip : str, community : str, version : int, oids : list) -> list:
+        """
+        Valores en el mismo orden que 'oids': valor si hay una instancia, lista si hay varias, None si no hay.
+        Lanza SNMPTimeout si el equipo no responde y SNMPError si responde con error.
+        """
+        oids    = [oid.strip(".") for oid in oids]
+        roots   = list(dict.fromkeys(oids))
+        instances, subtrees = await asyncio.gather(self.get(ip, community, version, roots),
+                                                   self.walk(ip, community, version, roots))
+        values = []
+        for oid in oids:
+            if oid in instances:
+                values.append(instances[oid])
+            elif len(subtrees[oid]) == 1:
+                values.append(subtrees[oid][0])
+            else:
+                values.append(subtrees[oid] or None)
+        return values
+
+
+    async def mapping(self, ip : str, community : str, version : int, oid_dict : dict) -> dict:
+        """Equivalente a mySNMPClient.mapping_OID_dict(oid_dict, list): {clave: valor | [valores] | None}."""
+        return dict(zip(oid_dict.keys(), await self.values(ip, community, version, list(oid_dict.values()))))
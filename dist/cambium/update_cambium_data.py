@@ -9,19 +9,25 @@
 from smartlink.models.cambium_data_models  import CambiumData as Model
 from smartlink.models.ubicacion_gps_models import UbicacionGPS
 from concurrent.futures     import ThreadPoolExecutor
-from smartlink.error_utils  import KEYNAME_ERROR_DICT, multiple_storage_errors, LOCAL_DB_ERROR
-from smartlink.global_utils import FOLDER_OUTPUT, group_ips, get_my_server_ip
+from smartlink.error_utils  import multiple_storage_errors, LOCAL_DB_ERROR
+from smartlink.global_utils import FOLDER_OUTPUT, get_my_server_ip
 from smartlink.http_utils   import DB_API_URL, get_request_to_url, get_request_to_url_with_filters, post_request_to_url_model_array
 from smartlink.csv_utils    import restart_log_file, write_log_files
 from smartlink.json_utils   import load_json_to_dict
 from smartlink.snmp_utils   import mySNMPClient
+from snmp_engine            import AsyncSNMPEngine, SNMPError, SNMP_V1, SNMP_V2C
+from cambium_parser         import get_parse_plan
 from datetime               import datetime
 import traceback
 import argparse
-import queue
-import re
+import asyncio
+import time
+import sys
 import os
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collector.pipeline     import PipelinedScheduler, BatchSink, SweepStats
+
 script_path     = os.path.abspath(__file__)
 script_folder   = os.path.dirname(script_path)
 script_name     = os.path.basename(script_path)
@@ -29,6 +35,11 @@ oid_folder      = os.path.join(script_folder, "snmp_json")
 
 MARCA               = "cambium"
 SNMP_TIMEOUT        = 5
+SNMP_RETRIES        = 1         # reintentos del motor asíncrono (timeout por intento = SNMP_TIMEOUT / intentos)
+SNMP_MAX_IN_FLIGHT  = 512       # PDUs simultáneas en el motor asíncrono
+MAX_THREADS         = 25
+POST_BATCH_SIZE     = 200       # modelos por envío a cambium_data/add_list
+SINK_MAX_DELAY      = 5.0       # segundos máximos que un resultado espera su envío
 DB_INVENTARIO_URL   = DB_API_URL + "inventario/get"
 DB_SNMP_CONF_URL    = DB_API_URL + "snmp_conf/get_list_id/"
 URL_POST_MODEL      = DB_API_URL + f"{MARCA}_data/add_list"
@@ -37,21 +48,50 @@ URL_POST_GPS        = DB_API_URL + "ubicacion_gps/add_list"
 ## Direccion de archivos de salida en /usr/smartlink/outputs
 log_file            = os.path.join(FOLDER_OUTPUT, f"{MARCA}_data.csv")
 
-## Activacion del modo DEBUG
+OID_FILE_PMPAP      = os.path.join(oid_folder, "PMPAP_v1.json")
+OID_FILE_PMPSM      = os.path.join(oid_folder, "PMPSM_v1.json")
+
+## snmp_conf.version -> versión SNMP del mensaje; las que no están aquí (v3) usan mySNMPClient
+SNMP_ENGINE_VERSIONS = {1: SNMP_V1, 2: SNMP_V2C}
+
+## Activacion del modo DEBUG (se sobrescribe desde main() o desde el colector)
 _DEBUG_MODE = False
-parser = argparse.ArgumentParser(description = "Script para almacenar datos de un equipo CAMBIUM en MariaDB usando la API")
-parser.add_argument('-d', '--debug', action='store_true', help='Habilita el modo DEBUG (mensajes para diagnosticar)')
-args = parser.parse_args()
-_DEBUG_MODE = args.debug
 
-## Carga de los diccionarios para mapear OID's
-dict_PMPAP = load_json_to_dict( os.path.join(oid_folder, "PMPAP_v1.json") )
-dict_PMPSM = load_json_to_dict( os.path.join(oid_folder, "PMPSM_v1.json") )
-global_error_array = []
+## Feed de resultados en vivo (collector.feed.ResultFeed); lo asigna el colector residente
+FEED = None
+
+
+## Carga de los diccionarios para mapear OID's, por tipo de equipo
+def load_oid_maps() -> dict:
+    return {
+        "-AP" : load_json_to_dict(OID_FILE_PMPAP),
+        "-SM" : load_json_to_dict(OID_FILE_PMPSM),
+    }
 
 ''' -------------------------------------------------------------------------- '''
+## Fila del feed en vivo: el modelo más snr_h / snr_v numéricos, como las columnas generadas de cambium_data
+def feed_row(model : Model) -> dict:
+    row = model.model_dump()
+    snr = row.get("snr") or {}
+    for key, column in (("H", "snr_h"), ("V", "snr_v")):
+        try:
+            row[column] = float(snr.get(key, snr.get(key.lower())))
+        except (TypeError, ValueError):
+            row[column] = None
+    return row
+
+
+## Versión SNMP para el motor asíncrono, o None si el equipo debe usar mySNMPClient
+def get_engine_version(dict_snmp : dict):
+    try:
+        return SNMP_ENGINE_VERSIONS.get(int((dict_snmp or {}).get("version")))
+    except (TypeError, ValueError):
+        return None
+
+
 ## Tarea asincrona para manejar multiples en pararelo
-def async_task(ip_device : str, tipo_PMP: str, queue : queue.Queue, dict_snmp : dict = None):
+## Retorna [data_snmp, dictionary_gps, error_msg] o None si no hubo datos ni error
+def async_task(ip_device : str, tipo_PMP: str, dict_snmp : dict = None, oid_maps : dict = None):
     agent_ip_snmp = mySNMPClient(
         ip_target   = ip_device,
         timeout     = SNMP_TIMEOUT,
@@ -60,144 +100,128 @@ def async_task(ip_device : str, tipo_PMP: str, queue : queue.Queue, dict_snmp :
     # Actualizamos acorde a las credenciales snmp
     agent_ip_snmp.update_credentials(dict_snmp)    
     
-    oid_dict = {}
-    if "-AP" in tipo_PMP:
-        oid_dict = dict_PMPAP.copy()
-    elif "-SM" in tipo_PMP:
-        oid_dict = dict_PMPSM.copy()
-
-    data_snmp_raw   = agent_ip_snmp.mapping_OID_dict(oid_dict, list)  # Si no hay valor, None
+    plan            = get_parse_plan(tipo_PMP, oid_maps)
+    data_snmp_raw   = agent_ip_snmp.mapping_OID_dict(dict(plan.oid_map), list)  # Si no hay valor, None
     fecha_device    = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    error_msg       = data_snmp_raw.pop(KEYNAME_ERROR_DICT, None)
-    if error_msg:
-        error_msg   = [ip_device, fecha_device, error_msg]
-    
-    if not data_snmp_raw:
-        if _DEBUG_MODE:
-            print(f"No se pudo extraer datos de {ip_device} / {dict_snmp}")
-        if error_msg:
-            queue.put( [{}, {}, error_msg] )
-        return 
-    
+    result          = plan.transform(ip_device, fecha_device, data_snmp_raw)
+    if _DEBUG_MODE and not (result and result[0]):
+        print(f"No se pudo extraer datos de {ip_device} / {dict_snmp}")
+    return result
 
-    # Agregamos los campos iniciales
-    data_snmp       = {
-        "ip"    : ip_device,
-        "fecha" : fecha_device
-    }
 
-    ## Avg power rx/tx
-    message_avg_power = data_snmp_raw["avg_power"]
-    if "-AP" in tipo_PMP:
-        data_snmp["avg_power"] = {
-            "tx" : float(message_avg_power)
-        }
-    else:
-        matches = [float(m) for m in re.findall(r"(-?\d+\.\d+)\s*dBm\s*[VH]", message_avg_power)] if message_avg_power else [0,0]
-        data_snmp["avg_power"] = {
-            "rx" : matches[0] if len(matches) > 0 else None,
-            "tx" : matches[1] if len(matches) > 1 else None
-        }
-
-    data_snmp["link_radio"] = {
-        "tx" : data_snmp_raw["link_radio_tx"],
-        "rx" : data_snmp_raw["link_radio_rx"],
-    }
+## Equipos Cambium del inventario: [ip, id snmp_conf, tipo]
+def get_subscribers() -> list:
+    filter_suscr    = ["marca", MARCA]
+    raw_inventory   = get_request_to_url_with_filters(DB_INVENTARIO_URL, filter_array = filter_suscr)
+    return [ [row["ip"], row["snmp_conf"], row["tipo"] ] for row in raw_inventory]
 
-    data_snmp["snr"] = {
-        "V" : data_snmp_raw["snr_v"],
-        "H" : data_snmp_raw["snr_h"],
-    }
 
-    # Agregamos campos pendientes
-    array_filtrado = [
-        key for key in data_snmp_raw 
-        if "GPS" not in key.upper() and not any(key.startswith(existing_key) for existing_key in data_snmp)
-    ] 
-    extra_dictionary = {key: data_snmp_raw[key] for key in array_filtrado}
-    data_snmp["ifresults_metricas"] = extra_dictionary or None
-
-    # Creamos el diccionario para datos GPS
-    latitud  = float(data_snmp_raw.get("GPSLat", "0").replace('+', '').strip() or 0)
-    longitud = float(data_snmp_raw.get("GPSLon", "0").replace('+', '').strip() or 0)
-    altitud  = float(data_snmp_raw.get("GPSAlt", "0").strip() or 0)
-    dictionary_gps = {
-        "ip"        : ip_device,
-        "fecha"     : fecha_device,
-        "latitud"   : latitud,
-        "longitud"  : longitud,
-        "altitud"   : altitud
-    } if latitud and longitud else {}
-
-    queue.put([data_snmp, dictionary_gps, error_msg])
+## Credenciales SNMP por id de snmp_conf
+def get_snmp_config(config_ids : list) -> dict:
+    params              = {"index": list(set(config_ids))}
+    snmp_config_dict    = get_request_to_url(DB_SNMP_CONF_URL, optional_param = params)
+    return {cfg.pop("id"): cfg for cfg in snmp_config_dict}
 
 
-''' ------------------------------------------------------------------------------
----------------------------    PROGRAMA PRINCIAPAL     ---------------------------
------------------------------------------------------------------------------- '''
-try:
-    ## Obtenemos datos de la lista de equipos RAJANT de la API
-    filter_suscr    = ["marca", MARCA]
-    raw_inventory   = get_request_to_url_with_filters(DB_INVENTARIO_URL, filter_array = filter_suscr)
-    subscribers     = [ [row["ip"], row["snmp_conf"], row["tipo"] ] for row in raw_inventory]
+## Consulta todos los equipos v1/v2c con el motor asíncrono sobre un solo socket UDP.
+## Cada resultado se entrega a on_result / on_error igual que en el planificador por hilos
+def poll_cambium_engine(subscribers : list, oid_maps : dict, on_result, on_error) -> SweepStats:
+    stats = SweepStats(f"{MARCA}-snmp", SNMP_MAX_IN_FLIGHT)
 
-    # Chequeamos el numero de equipos Cambiumm detectados
-    num_cambium     = len( subscribers )
-    if num_cambium  == 0:
-        raise Exception("No hay equipos Cambium registrados")
-    print(f"Se han detectado un total de {num_cambium} equipos Cambium / PMP-AP en Inventario")
+    async def _poll(engine : AsyncSNMPEngine, subscriber : list):
+        _ip, _tipo, _conf_snmp = subscriber
+        plan            = get_parse_plan(_tipo, oid_maps)
+        started         = time.monotonic()
+        fecha_device    = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            values = await engine.values(_ip, str(_conf_snmp.get("comunidad") or ""),
+                                         get_engine_version(_conf_snmp), plan.oids)
+            result = plan, values, None
+        except SNMPError as e:
+            result = plan, None, [_ip, fecha_device, str(e)]
+        return subscriber, result, fecha_device, time.monotonic() - started
 
-    # Obtenemos la configuracion en forma de diccionario:
-    config_snmp_unicos  = list(set(device[1] for device in subscribers))
-    params              = {"index": config_snmp_unicos}
+    async def _run():
+        async with AsyncSNMPEngine(SNMP_MAX_IN_FLIGHT, timeout = SNMP_TIMEOUT / (SNMP_RETRIES + 1),
+                                   retries = SNMP_RETRIES) as engine:
+            return await asyncio.gather(*(_poll(engine, subscriber) for subscriber in subscribers))
+
+    for subscriber, (plan, values, error_msg), fecha_device, seconds in asyncio.run(_run()):
+        try:
+            result = [{}, {}, error_msg] if error_msg else plan.transform_values(subscriber[0], fecha_device, values)
+        except Exception as e:
+            stats.record(subscriber[0], seconds, str(e))
+            on_error(subscriber, e)
+            continue
+        error_msg = result[2] if result else None
+        stats.record(subscriber[0], seconds, error_msg[2] if error_msg else None)
+        on_result(subscriber, result)
+
+    stats.finish()
+    return stats
 
-    snmp_config_dict    = get_request_to_url(DB_SNMP_CONF_URL, optional_param = params)
-    config_dict         = {cfg.pop("id"): cfg for cfg in snmp_config_dict}
-    subscribers         = [ [_ip, _tipo, config_dict.get(_index, {})] for _ip, _index, _tipo in subscribers]
 
-    if _DEBUG_MODE: 
-        for suscriptor in subscribers: print(suscriptor)
+## Una pasada completa sobre 'subscribers' = [ip, tipo, credenciales snmp]. Retorna los errores encontrados
+## modo = "bulk" consulta los equipos v1/v2c con el motor asíncrono y deja a mySNMPClient (en hilos)
+## solo los v3; modo = "hilos" usa mySNMPClient para todos.
+## Si se entrega 'executor' se reutiliza (colector residente); si no, se crea uno para la pasada
+def update_cambium(subscribers : list, oid_maps : dict, executor : ThreadPoolExecutor = None, modo : str = "bulk") -> list:
+    if executor is None:
+        with ThreadPoolExecutor(MAX_THREADS) as own_executor:
+            return update_cambium(subscribers, oid_maps, own_executor, modo)
 
-    q = queue.Queue()
-    max_threads_number = 25
-    list_groups_ip_to_request = group_ips(subscribers, max_group_size = max_threads_number)
+    global_error_array = []
     once = True
-    total_groups = len(list_groups_ip_to_request)
-    counter = 0
-
-    with ThreadPoolExecutor(max_threads_number) as executor:
-        for _group in list_groups_ip_to_request:
-            counter += 1
-            print(f"Procesando grupo N° {counter} ... de {total_groups}")
-            futures = [executor.submit(async_task, _ip, _tipo, q, _conf_snmp) for _ip, _tipo, _conf_snmp in _group]
-            
-            # Esperar a que todos los hilos del grupo terminen
-            for future in futures:
-                future.result()
-
-            # Procesar los resultados inmediatamente
-            model_array_list, gps_array_list = [], []
-
-            while not q.empty():
-                model_dict, gps_dict, error_message = q.get()
-                if model_dict:
-                    model_array_list.append( Model(**model_dict) )
-                    if _DEBUG_MODE:
-                        print(f"\n♦ ♦\n{model_dict}")
-                if gps_dict:
-                    gps_array_list.append( UbicacionGPS(**gps_dict) )
-                if error_message:
-                    global_error_array.append(error_message)
-
-            if model_array_list:
-                if once:
-                    once = False
-                    restart_log_file(log_file, Model)
-                post_request_to_url_model_array(URL_POST_MODEL, array_model_to_post = model_array_list)
-                write_log_files(log_file, model_array_list)
-
-            if gps_array_list:
-                post_request_to_url_model_array(URL_POST_GPS, array_model_to_post = gps_array_list)
+
+    def flush_models(model_array_list : list):
+        nonlocal once
+        if once:
+            once = False
+            restart_log_file(log_file, Model)
+        post_request_to_url_model_array(URL_POST_MODEL, array_model_to_post = model_array_list)
+        write_log_files(log_file, model_array_list)
+        if FEED is not None:
+            FEED.publish(MARCA, [feed_row(model) for model in model_array_list])
+
+    def flush_gps(gps_array_list : list):
+        post_request_to_url_model_array(URL_POST_GPS, array_model_to_post = gps_array_list)
+
+    def task(subscriber : list):
+        _ip, _tipo, _conf_snmp = subscriber
+        return async_task(_ip, _tipo, _conf_snmp, oid_maps)
+
+    def on_result(subscriber : list, result : list):
+        if not result:
+            return
+        model_dict, gps_dict, error_message = result
+        if model_dict:
+            model_sink.add( Model(**model_dict) )
+            if _DEBUG_MODE:
+                print(f"\n♦ ♦\n{model_dict}")
+        if gps_dict:
+            gps_sink.add( UbicacionGPS(**gps_dict) )
+        if error_message:
+            global_error_array.append(error_message)
+
+    def on_error(subscriber : list, error : Exception):
+        global_error_array.append([subscriber[0], datetime.now().strftime("%Y-%m-%d %H:%M:%S"), str(error)])
+
+    # Un equipo que agota SNMP_TIMEOUT solo retiene su propio hilo; los resultados se envían por lotes
+    with BatchSink(flush_models, batch_size = POST_BATCH_SIZE, max_delay = SINK_MAX_DELAY, name = MARCA) as model_sink, \
+         BatchSink(flush_gps, batch_size = POST_BATCH_SIZE, max_delay = SINK_MAX_DELAY, name = "ubicacion_gps") as gps_sink:
+        subscribers_hilos = subscribers
+        if modo == "bulk":
+            subscribers_bulk  = [s for s in subscribers if get_engine_version(s[2]) is not None]
+            subscribers_hilos = [s for s in subscribers if get_engine_version(s[2]) is None]
+            try:
+                print(f"• {poll_cambium_engine(subscribers_bulk, oid_maps, on_result, on_error)}")
+            except OSError as e:
+                print(f"{script_name} | No se pudo abrir el socket SNMP ({e}), se usa mySNMPClient para todos")
+                subscribers_hilos = subscribers
+
+        stats = PipelinedScheduler(executor, name = MARCA).run(subscribers_hilos, task, on_result, on_error,
+                                                               key = lambda subscriber: subscriber[0])
+    print(f"• {stats}")
 
     ## -----------Final del ThreadPoolExecutor -------------- ##
     try:
@@ -212,22 +236,57 @@ try:
         if str(e):
             print(f"Error al guardar los fallos en {MARCA} : {e}")
 
-except Exception as e:
-    if str(e):
-        print(f" ✘ ✘ ERROR en {script_name}:\n{e}")
-        try:
-            my_ip = get_my_server_ip()
-            fecha_device    = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            global_error_array = [[my_ip, fecha_device, str(e)]]
-            multiple_storage_errors(global_error_array)
-        except Exception as e:
-            if str(e):
-                print(f"Error al guardar los fallos en {MARCA} : {e}")
-                
-    if _DEBUG_MODE:
-        print(traceback.format_exc())
+    return global_error_array
+
+
+''' ------------------------------------------------------------------------------
+---------------------------    PROGRAMA PRINCIAPAL     ---------------------------
+------------------------------------------------------------------------------ '''
+def main():
+    global _DEBUG_MODE
+    parser = argparse.ArgumentParser(description = "Script para almacenar datos de un equipo CAMBIUM en MariaDB usando la API")
+    parser.add_argument('-d', '--debug', action='store_true', help='Habilita el modo DEBUG (mensajes para diagnosticar)')
+    parser.add_argument('-m', '--modo', choices=['bulk', 'hilos'], default='bulk', help='bulk: motor SNMP asíncrono para v1/v2c (por defecto) | hilos: mySNMPClient por equipo')
+    args = parser.parse_args()
+    _DEBUG_MODE = args.debug
+
+    try:
+        ## Obtenemos datos de la lista de equipos CAMBIUM de la API
+        subscribers     = get_subscribers()
+
+        # Chequeamos el numero de equipos Cambiumm detectados
+        num_cambium     = len( subscribers )
+        if num_cambium  == 0:
+            raise Exception("No hay equipos Cambium registrados")
+        print(f"Se han detectado un total de {num_cambium} equipos Cambium / PMP-AP en Inventario")
+
+        # Obtenemos la configuracion en forma de diccionario:
+        config_dict         = get_snmp_config([device[1] for device in subscribers])
+        subscribers         = [ [_ip, _tipo, config_dict.get(_index, {})] for _ip, _index, _tipo in subscribers]
+
+        if _DEBUG_MODE: 
+            for suscriptor in subscribers: print(suscriptor)
+
+        update_cambium(subscribers, load_oid_maps(), modo = args.modo)
+
+    except Exception as e:
+        if str(e):
+            print(f" ✘ ✘ ERROR en {script_name}:\n{e}")
+            try:
+                my_ip = get_my_server_ip()
+                fecha_device    = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                global_error_array = [[my_ip, fecha_device, str(e)]]
+                multiple_storage_errors(global_error_array)
+            except Exception as e:
+                if str(e):
+                    print(f"Error al guardar los fallos en {MARCA} : {e}")
+                    
+        if _DEBUG_MODE:
+            print(traceback.format_exc())
 
-finally:
-    print(f"Tarea finalizada. Se pueden revisar los valores en la BD o en {log_file}")
+    finally:
+        print(f"Tarea finalizada. Se pueden revisar los valores en la BD o en {log_file}")
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# =============================================================================
+#                   Smartlink - Colector residente
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+#  Tablas        : latencia, cambium_data, rajant_data, sensores, ubicacion_gps
+# =============================================================================
+#  Reemplaza las ejecuciones por cron de update_general.py, update_cambium_data.py
+#  y update_rajant_data.py por un único proceso que:
+#    - mantiene en memoria el inventario, las credenciales (snmp_conf) y los
+#      mapas de OID, y solo los recarga cuando cambian
+#    - ejecuta cada clase de equipo en su propio hilo, con su intervalo y un
+#      jitter aleatorio, para no lanzar todas las consultas en el mismo minuto
+#    - reutiliza un ThreadPoolExecutor por clase durante toda la vida del proceso
+#    - con --zmq publica cada lote enviado a la API (collector/feed.py) para el
+#      detector de eventos en vivo (eventos/detector_eventos.py)
+# =============================================================================
+import sys
+import os
+
+DIST_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(DIST_FOLDER)
+sys.path.append(os.path.join(DIST_FOLDER, "rajant"))
+sys.path.append(os.path.join(DIST_FOLDER, "general"))
+sys.path.append(os.path.join(DIST_FOLDER, "cambium"))
+
+from smartlink.http_utils   import DB_API_URL, get_request_to_url
+from smartlink.json_utils   import load_json_to_dict
+from concurrent.futures     import ThreadPoolExecutor
+from general                import update_general
+from cambium                import update_cambium_data
+from rajant                 import update_rajant_data
+from collector.feed         import ResultFeed
+import traceback
+import threading
+import argparse
+import hashlib
+import random
+import signal
+import json
+import time
+
+script_path     = os.path.abspath(__file__)
+script_name     = os.path.basename(script_path)
+
+URL_INVENTARIO  = DB_API_URL + "inventario/get"
+CLASES          = ("latencia", "cambium", "rajant")
+
+_DEBUG_MODE     = False
+
+
+''' -------------------------------------------------------------------------- '''
+## Inventario y credenciales SNMP en memoria
+class InventoryCache(object):
+    """
+    Copia en memoria de /inventario/get y de las snmp_conf usadas por los
+    equipos Cambium. Se refresca como máximo cada 'refresh_s' segundos; si la
+    API falla se sigue usando la última copia válida.
+    """
+
+    def __init__(self, refresh_s : float):
+        self._refresh_s     = refresh_s
+        self._lock          = threading.Lock()
+        self._rows          = []
+        self._snmp_conf     = {}
+        self._signature     = None
+        self._loaded_at     = 0.0
+
+
+    def _refresh(self):
+        rows        = get_request_to_url(URL_INVENTARIO) or []
+        conf_ids    = [row["snmp_conf"] for row in rows
+                       if row.get("marca") == update_cambium_data.MARCA and row.get("snmp_conf") is not None]
+        snmp_conf   = update_cambium_data.get_snmp_config(conf_ids) if conf_ids else {}
+
+        signature   = hashlib.sha1(json.dumps([rows, snmp_conf], sort_keys = True, default = str).encode()).hexdigest()
+        if signature != self._signature:
+            print(f"♦ Inventario actualizado: {len(rows)} equipos, {len(snmp_conf)} configuraciones SNMP")
+            self._rows, self._snmp_conf, self._signature = rows, snmp_conf, signature
+
+
+    def _current(self):
+        with self._lock:
+            if time.time() - self._loaded_at >= self._refresh_s:
+                try:
+                    self._refresh()
+                except Exception as e:
+                    print(f"✘ No se pudo refrescar el inventario, se usa la copia anterior: {e}")
+                # Aunque falle se espera al siguiente periodo para no saturar la API
+                self._loaded_at = time.time()
+            return self._rows, self._snmp_conf
+
+
+    def ips(self, marca : str = None) -> list:
+        rows, _ = self._current()
+        return [row["ip"] for row in rows if marca is None or row.get("marca") == marca]
+
+
+    def cambium_subscribers(self) -> list:
+        rows, snmp_conf = self._current()
+        return [ [row["ip"], row["tipo"], snmp_conf.get(row.get("snmp_conf"), {})]
+                 for row in rows if row.get("marca") == update_cambium_data.MARCA ]
+
+
+## Mapas de OID cargados una vez y recargados solo si cambia el archivo
+class OidMapCache(object):
+
+    def __init__(self, files : dict):
+        self._files     = files        # tipo -> ruta del JSON
+        self._lock      = threading.Lock()
+        self._maps      = {}
+        self._mtimes    = {}
+
+
+    def get(self) -> dict:
+        with self._lock:
+            for key, path in self._files.items():
+                try:
+                    mtime = os.path.getmtime(path)
+                    if self._mtimes.get(key) != mtime:
+                        self._maps[key]     = load_json_to_dict(path)
+                        self._mtimes[key]   = mtime
+                        print(f"♦ Mapa de OID cargado: {os.path.basename(path)}")
+                except Exception as e:
+                    if key not in self._maps:
+                        raise
+                    print(f"✘ No se pudo recargar {path}, se usa la versión anterior: {e}")
+            return dict(self._maps)
+
+
+''' -------------------------------------------------------------------------- '''
+## Hilo que ejecuta una pasada de una clase de equipos cada 'interval_s' (+/- jitter)
+class PeriodicJob(threading.Thread):
+
+    def __init__(self, name : str, interval_s : float, jitter : float, sweep, stop_event : threading.Event):
+        super().__init__(name = name, daemon = True)
+        self._interval  = interval_s
+        self._jitter    = jitter
+        self._sweep     = sweep
+        self._stop_event = stop_event
+
+
+    def run(self):
+        # Fase inicial aleatoria: cada clase arranca en un instante distinto
+        next_run = time.monotonic() + random.uniform(0, self._interval * self._jitter)
+        while not self._stop_event.wait(max(0.0, next_run - time.monotonic())):
+            started = time.monotonic()
+            try:
+                self._sweep()
+            except Exception as e:
+                print(f"✘ Error en la pasada de {self.name}: {e}")
+                if _DEBUG_MODE:
+                    print(traceback.format_exc())
+
+            elapsed  = time.monotonic() - started
+            next_run = started + self._interval * (1 + random.uniform(-self._jitter, self._jitter))
+            if next_run < time.monotonic():
+                print(f"⚠️ La pasada de {self.name} tomó {elapsed:.1f} s, más que su intervalo ({self._interval} s)")
+                next_run = time.monotonic()
+            elif _DEBUG_MODE:
+                print(f"• Pasada de {self.name} completada en {elapsed:.1f} s")
+
+
+''' ------------------------------------------------------------------------------
+---------------------------    PROGRAMA PRINCIAPAL     ---------------------------
+------------------------------------------------------------------------------ '''
+def main():
+    global _DEBUG_MODE
+    parser = argparse.ArgumentParser(description="Colector residente de latencia, Cambium y Rajant")
+    parser.add_argument('--intervalo_latencia', type=float, default=60, help="Segundos entre pasadas de latencia")
+    parser.add_argument('--intervalo_cambium', type=float, default=300, help="Segundos entre pasadas de Cambium")
+    parser.add_argument('--intervalo_rajant', type=float, default=300, help="Segundos entre pasadas de Rajant")
+    parser.add_argument('--muestras_latencia', type=int, default=1, help="Echos por IP en cada pasada de latencia (N > 1: min/avg/max/jitter/pérdida)")
+    parser.add_argument('--intervalo_inventario', type=float, default=300, help="Segundos entre refrescos del inventario y snmp_conf")
+    parser.add_argument('--jitter', type=float, default=0.1, help="Fracción aleatoria (+/-) aplicada a cada intervalo")
+    parser.add_argument('--delta_rajant', type=int, metavar='N', default=0, help="Rajant en modo delta (rajant_snapshot) con un snapshot completo cada N pasadas")
+    parser.add_argument('--zmq', metavar='ENDPOINT', default=None, help="Publica los resultados en este endpoint ZeroMQ PUB (p.ej. tcp://*:5556)")
+    parser.add_argument('--clases', nargs='+', choices=CLASES, default=list(CLASES), help="Clases de equipos a recolectar")
+    parser.add_argument('-d', '--debug', action='store_true', help='Enable debug mode')
+    args = parser.parse_args()
+
+    _DEBUG_MODE = args.debug
+    for module in (update_general, update_cambium_data, update_rajant_data):
+        module._DEBUG_MODE = args.debug
+    if args.delta_rajant > 0:
+        # El último snapshot de cada IP queda en memoria mientras el colector esté vivo
+        update_rajant_data.MODO_DELTA       = True
+        update_rajant_data.DELTA_ENCODER    = update_rajant_data.SnapshotDeltaEncoder(args.delta_rajant)
+
+    feed = None
+    if args.zmq:
+        feed = ResultFeed(args.zmq)
+        for module in (update_general, update_cambium_data, update_rajant_data):
+            module.FEED = feed
+        print(f"♦ Publicando resultados en {args.zmq}")
+
+    inventory   = InventoryCache(args.intervalo_inventario)
+    oid_maps    = OidMapCache({
+        "-AP" : update_cambium_data.OID_FILE_PMPAP,
+        "-SM" : update_cambium_data.OID_FILE_PMPSM,
+    })
+
+    executors = {
+        "latencia"  : ThreadPoolExecutor(update_general.MAX_THREAD_NUMBER, thread_name_prefix = "latencia"),
+        "cambium"   : ThreadPoolExecutor(update_cambium_data.MAX_THREADS, thread_name_prefix = "cambium"),
+        "rajant"    : ThreadPoolExecutor(update_rajant_data.MAX_THREADS, thread_name_prefix = "rajant"),
+    }
+    sweeps = {
+        "latencia"  : lambda: update_general.update_latencia(inventory.ips(), executors["latencia"], muestras = args.muestras_latencia),
+        "cambium"   : lambda: update_cambium_data.update_cambium(inventory.cambium_subscribers(), oid_maps.get(), executors["cambium"]),
+        "rajant"    : lambda: update_rajant_data.update_rajant(inventory.ips(update_rajant_data.MARCA), executors["rajant"]),
+    }
+    intervals = {
+        "latencia"  : args.intervalo_latencia,
+        "cambium"   : args.intervalo_cambium,
+        "rajant"    : args.intervalo_rajant,
+    }
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    jobs = [PeriodicJob(clase, intervals[clase], args.jitter, sweeps[clase], stop_event) for clase in args.clases]
+    for job in jobs:
+        print(f"♦ {job.name}: cada {intervals[job.name]} s (jitter {args.jitter:.0%})")
+        job.start()
+
+    while not stop_event.wait(1):
+        pass
+
+    print(f"{script_name} | Deteniendo colector, esperando pasadas en curso ...")
+    for job in jobs:
+        job.join()
+    for executor in executors.values():
+        executor.shutdown(wait = True)
+    if feed is not None:
+        feed.close()
+
+
+if __name__ == "__main__":
+    main()
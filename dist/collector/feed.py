@@ -0,0 +1,61 @@
+# =============================================================================
+#                   Smartlink - Publicación en vivo de resultados
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Los colectores publican por ZeroMQ (PUB) cada lote que envían a la API, para
+#  que procesos residentes (eventos/detector_eventos.py) lo consuman sin volver
+#  a leerlo de la base de datos. Cada mensaje tiene dos partes:
+#    [tópico, JSON con la lista de filas]
+#  con tópicos "latencia", "cambium" y "sensores". Las filas son las mismas
+#  que se envían a add_list (más las columnas que MariaDB calcula al insertar,
+#  p.ej. snr_h / snr_v de cambium_data).
+#  El envío no bloquea: si un suscriptor no consume, ZeroMQ descarta al llegar
+#  al límite de la cola y el colector sigue igual.
+# =============================================================================
+import threading
+import json
+
+try:
+    import zmq
+except ImportError:
+    zmq = None
+
+
+class ResultFeed(object):
+    """
+    Uso:
+        feed = ResultFeed("tcp://*:5556")
+        feed.publish("latencia", [modelo.model_dump() for modelo in lote])
+    Es seguro usarlo desde varios hilos (el socket se protege con un lock).
+    """
+
+    def __init__(self, endpoint : str, max_cola : int = 10000):
+        if zmq is None:
+            raise RuntimeError("pyzmq no está instalado: no se puede publicar el feed de resultados")
+        self.endpoint   = endpoint
+        self._context   = zmq.Context.instance()
+        self._socket    = self._context.socket(zmq.PUB)
+        self._socket.setsockopt(zmq.SNDHWM, max_cola)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._socket.bind(endpoint)
+        self._lock      = threading.Lock()
+        self.descartados = 0
+
+
+    def publish(self, topico : str, filas : list):
+        if not filas:
+            return
+        mensaje = json.dumps(filas, default = str).encode()
+        with self._lock:
+            try:
+                self._socket.send_multipart([topico.encode(), mensaje], flags = zmq.NOBLOCK)
+            except zmq.Again:
+                self.descartados += 1
+
+
+    def close(self):
+        with self._lock:
+            self._socket.close()
@@ -0,0 +1,241 @@
+# =============================================================================
+#                   Smartlink - Planificador en tubería para colectores
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Reemplaza el esquema "enviar un grupo de group_ips, esperar todos los
+#  future.result(), vaciar la cola, POST, siguiente grupo":
+#    - PipelinedScheduler mantiene el ThreadPoolExecutor ocupado con una
+#      ventana acotada de tareas en vuelo; cada vez que termina un equipo entra
+#      el siguiente, así un equipo lento solo ocupa su propio hilo.
+#    - BatchSink recibe los resultados a medida que terminan y los envía (API /
+#      CSV) por lotes, al llegar a 'batch_size' o al pasar 'max_delay' segundos.
+#    - SweepStats guarda la duración de cada equipo en la pasada (p50, p95,
+#      más lentos y uso del pool); la última pasada de cada colector queda en
+#      LAST_SWEEP_STATS.
+# =============================================================================
+from concurrent.futures     import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import threading
+import time
+
+## Estadísticas de la última pasada de cada colector (nombre -> SweepStats)
+LAST_SWEEP_STATS = {}
+
+
+''' -------------------------------------------------------------------------- '''
+## Duraciones por equipo de una pasada
+class SweepStats(object):
+
+    def __init__(self, name : str, workers : int):
+        self.name       = name
+        self.workers    = workers
+        self.durations  = {}        # clave del equipo -> segundos
+        self.errors     = {}        # clave del equipo -> mensaje
+        self.started    = time.monotonic()
+        self.elapsed    = 0.0
+
+
+    def record(self, key, seconds : float, error : str = None):
+        self.durations[key] = seconds
+        if error:
+            self.errors[key] = error
+
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.started
+        LAST_SWEEP_STATS[self.name] = self
+
+
+    def percentile(self, fraction : float) -> float:
+        values = sorted(self.durations.values())
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+    def slowest(self, count : int = 5) -> list:
+        return sorted(self.durations.items(), key = lambda item: item[1], reverse = True)[:count]
+
+
+    def utilization(self) -> float:
+        # Fracción del tiempo de la pasada en que los hilos del pool estuvieron trabajando
+        if not self.elapsed or not self.workers:
+            return 0.0
+        return min(1.0, sum(self.durations.values()) / (self.elapsed * self.workers))
+
+
+    def summary(self) -> dict:
+        total = sum(self.durations.values())
+        return {
+            "coleccion"     : self.name,
+            "equipos"       : len(self.durations),
+            "errores"       : len(self.errors),
+            "duracion"      : round(self.elapsed, 3),
+            "trabajo_total" : round(total, 3),
+            "p50"           : round(self.percentile(0.50), 3),
+            "p95"           : round(self.percentile(0.95), 3),
+            "maximo"        : round(max(self.durations.values(), default = 0.0), 3),
+            "uso_pool"      : round(self.utilization(), 3),
+            "mas_lentos"    : [[key, round(seconds, 3)] for key, seconds in self.slowest()],
+        }
+
+
+    def __str__(self):
+        s = self.summary()
+        return (f"{s['coleccion']}: {s['equipos']} equipos en {s['duracion']} s "
+                f"(trabajo {s['trabajo_total']} s, p50 {s['p50']} s, p95 {s['p95']} s, "
+                f"máx {s['maximo']} s, uso del pool {s['uso_pool']:.0%}, errores {s['errores']})")
+
+
+''' -------------------------------------------------------------------------- '''
+## Acumula resultados y los entrega a 'flush_fn(lote)' por tamaño o por tiempo
+class BatchSink(object):
+    """
+    Uso:
+        with BatchSink(enviar_lote, batch_size = 200, max_delay = 5) as sink:
+            sink.add(modelo)
+    flush_fn se llama siempre desde un solo hilo a la vez; si falla se informa
+    el error y el lote se descarta para no bloquear la pasada.
+    """
+
+    def __init__(self, flush_fn, batch_size : int = 200, max_delay : float = 5.0, name : str = "sink"):
+        self._flush_fn      = flush_fn
+        self._batch_size    = max(1, batch_size)
+        self._max_delay     = max_delay
+        self._name          = name
+        self._items         = []
+        self._first_at      = None
+        self._lock          = threading.Lock()
+        self._flush_lock    = threading.Lock()
+        self._closed        = threading.Event()
+        self._timer         = None
+        self.flushed        = 0         # elementos entregados a flush_fn
+        self.batches        = 0
+
+
+    def __enter__(self):
+        if self._max_delay:
+            self._timer = threading.Thread(target = self._run_timer, name = f"{self._name}-flush", daemon = True)
+            self._timer.start()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def _take(self, force : bool) -> list:
+        with self._lock:
+            if not self._items:
+                return []
+            due = self._first_at is not None and time.monotonic() - self._first_at >= self._max_delay
+            if not (force or due or len(self._items) >= self._batch_size):
+                return []
+            batch, self._items, self._first_at = self._items, [], None
+            return batch
+
+
+    def _deliver(self, batch : list):
+        if not batch:
+            return
+        with self._flush_lock:
+            try:
+                self._flush_fn(batch)
+                self.flushed += len(batch)
+                self.batches += 1
+            except Exception as e:
+                print(f"✘ {self._name}: error al enviar un lote de {len(batch)} elementos: {e}")
+
+
+    def _run_timer(self):
+        interval = max(0.05, self._max_delay / 2)
+        while not self._closed.wait(interval):
+            self._deliver(self._take(force = False))
+
+
+    def add(self, item):
+        with self._lock:
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+            self._items.append(item)
+            full = len(self._items) >= self._batch_size
+        if full:
+            self._deliver(self._take(force = False))
+
+
+    def flush(self):
+        self._deliver(self._take(force = True))
+
+
+    def close(self):
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush()
+
+
+''' -------------------------------------------------------------------------- '''
+## Mantiene el pool saturado con una ventana acotada de tareas en vuelo
+class PipelinedScheduler(object):
+    """
+    run(items, task, on_result) envía 'task(item)' al executor manteniendo
+    como máximo 'window' tareas en vuelo (por defecto 2 x hilos del pool, para
+    que nunca haya hilos libres esperando). Cada resultado se entrega a
+    'on_result(item, resultado)' en el hilo que llama a run(), en orden de
+    término. Si la tarea lanza una excepción se entrega a 'on_error(item, exc)'.
+    """
+
+    def __init__(self, executor : ThreadPoolExecutor, window : int = None, name : str = "pasada"):
+        self._executor  = executor
+        self._workers   = getattr(executor, "_max_workers", None) or 1
+        self._window    = window or 2 * self._workers
+        self._name      = name
+
+
+    @staticmethod
+    def _timed(task, item):
+        started = time.monotonic()
+        try:
+            return task(item), time.monotonic() - started, None
+        except Exception as e:
+            return None, time.monotonic() - started, e
+
+
+    def run(self, items, task, on_result, on_error = None, key = None) -> SweepStats:
+        stats       = SweepStats(self._name, self._workers)
+        key         = key or (lambda item: item)
+        pending     = {}
+        iterator    = iter(items)
+        exhausted   = False
+
+        while True:
+            while not exhausted and len(pending) < self._window:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[self._executor.submit(self._timed, task, item)] = item
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when = FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                result, seconds, error = future.result()
+                stats.record(key(item), seconds, str(error) if error else None)
+                try:
+                    if error is None:
+                        on_result(item, result)
+                    elif on_error is not None:
+                        on_error(item, error)
+                    else:
+                        print(f"✘ {self._name}: error con {key(item)}: {error}")
+                except Exception as e:
+                    print(f"✘ {self._name}: error al procesar el resultado de {key(item)}: {e}")
+
+        stats.finish()
+        return stats
@@ -0,0 +1,258 @@
+# =============================================================================
+#                   Smartlink - Sondeo ICMP asíncrono
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Envía un echo request por IP sobre un único socket ICMP y empareja las
+#  respuestas por número de secuencia, de modo que miles de consultas quedan
+#  en vuelo a la vez sin crear procesos ni hilos.
+#    - Usa un socket ICMP de datagrama (no requiere root si la IP del grupo
+#      está en net.ipv4.ping_group_range); si no está permitido, usa un socket
+#      RAW (requiere root / CAP_NET_RAW).
+#    - Cada IP tiene su propio timeout; sin respuesta la latencia es -1, igual
+#      que ping_host.
+#    - Se guardan las marcas de tiempo de envío y recepción de cada sonda.
+#    - Modo ráfaga: N echos por IP separados por 'intervalo', con las ráfagas
+#      desfasadas entre IPs; la pasada dura ~N * intervalo + timeout y se
+#      obtienen min / avg / max / mdev (jitter) y % de pérdida por IP.
+# =============================================================================
+from collections    import namedtuple
+from datetime       import datetime
+import asyncio
+import socket
+import math
+import struct
+import time
+import os
+
+ICMP_ECHO_REQUEST   = 8
+ICMP_ECHO_REPLY     = 0
+LATENCIA_SIN_RESPUESTA = -1
+
+# SO_TIMESTAMPNS / SCM_TIMESTAMPNS en Linux (no siempre expuestos por el módulo socket)
+_SO_TIMESTAMPNS     = getattr(socket, "SO_TIMESTAMPNS", 35)
+
+## Resultado de una sonda: latencia en ms (-1 sin respuesta) y marcas de tiempo (epoch, s)
+ProbeResult = namedtuple("ProbeResult", ["ip", "latencia", "enviado", "recibido"])
+
+## Resumen de una ráfaga de echos a una IP (ms; None si no hubo respuestas)
+BurstResult = namedtuple("BurstResult", ["ip", "enviado", "muestras", "recibidas", "minimo", "promedio", "maximo", "mdev", "perdida"])
+
+
+def summarize_burst(ip : str, results : list) -> BurstResult:
+    """min / avg / max / mdev igual que iputils ping; pérdida en % de echos enviados."""
+    rtts     = [r.latencia for r in results if r.latencia != LATENCIA_SIN_RESPUESTA]
+    enviado  = min(r.enviado for r in results)
+    perdida  = round(100.0 * (len(results) - len(rtts)) / len(results), 2)
+    if not rtts:
+        return BurstResult(ip, enviado, len(results), 0, None, None, None, None, perdida)
+    promedio = sum(rtts) / len(rtts)
+    mdev     = math.sqrt(max(0.0, sum(x * x for x in rtts) / len(rtts) - promedio * promedio))
+    return BurstResult(ip, enviado, len(results), len(rtts), min(rtts), round(promedio, 3), max(rtts), round(mdev, 3), perdida)
+
+
+def _checksum(data : bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _open_icmp_socket():
+    """Retorna (socket, es_raw). Primero intenta el socket sin privilegios."""
+    try:
+        sock, is_raw = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except PermissionError:
+        sock, is_raw = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+    sock.setblocking(False)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    except OSError:
+        pass
+    # Marca de recepción tomada por el kernel: no depende de la carga del event loop
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, _SO_TIMESTAMPNS, 1)
+    except OSError:
+        pass
+    return sock, is_raw
+
+
+class AsyncICMPProber(object):
+    """
+    Prober ICMP sobre un solo socket. Uso:
+        async with AsyncICMPProber() as prober:
+            resultados = await prober.ping_many(ips, timeout = 1.0)
+    """
+
+    def __init__(self, max_in_flight : int = 2000):
+        self._max_in_flight = max_in_flight
+        self._identifier    = os.getpid() & 0xFFFF
+        self._sequence      = 0
+        self._pending       = {}        # secuencia -> (ip, future)
+        self._sock          = None
+        self._is_raw        = False
+        self._loop          = None
+        self._slots         = None
+
+
+    async def __aenter__(self):
+        self._loop  = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self._max_in_flight)
+        self._sock, self._is_raw = _open_icmp_socket()
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+        return self
+
+
+    async def __aexit__(self, *exc):
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        for _, future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+
+    def _next_sequence(self) -> int:
+        # Secuencia libre de 16 bits (max_in_flight < 65536)
+        while True:
+            self._sequence = (self._sequence + 1) & 0xFFFF
+            if self._sequence not in self._pending:
+                return self._sequence
+
+
+    def _build_packet(self, sequence : int) -> bytes:
+        payload = struct.pack("!d", time.time()) + b"smartlink-probe"
+        header  = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self._identifier, sequence)
+        # En el socket de datagrama el kernel completa identificador y checksum
+        if self._is_raw:
+            header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, _checksum(header + payload), self._identifier, sequence)
+        return header + payload
+
+
+    def _on_readable(self):
+        while True:
+            try:
+                packet, ancdata, _, (source_ip, _) = self._sock.recvmsg(2048, 64)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+            received_at = time.time()
+            for level, msg_type, data in ancdata:
+                if level == socket.SOL_SOCKET and msg_type == _SO_TIMESTAMPNS and len(data) >= 16:
+                    seconds, nanoseconds = struct.unpack("qq", data[:16])
+                    received_at = seconds + nanoseconds / 1e9
+
+            # El socket RAW entrega también la cabecera IP
+            if self._is_raw:
+                packet = packet[(packet[0] & 0x0F) * 4:]
+            if len(packet) < 8:
+                continue
+
+            icmp_type, _, _, identifier, sequence = struct.unpack("!BBHHH", packet[:8])
+            if icmp_type != ICMP_ECHO_REPLY:
+                continue
+            # El RAW recibe las respuestas de todos los procesos: filtramos por identificador
+            if self._is_raw and identifier != self._identifier:
+                continue
+
+            entry = self._pending.get(sequence)
+            if entry is None or entry[0] != source_ip:
+                continue
+            ip, future = entry
+            if not future.done():
+                future.set_result(received_at)
+
+
+    async def ping(self, ip : str, timeout : float = 1.0) -> ProbeResult:
+        # Solo direcciones IPv4 literales: resolver nombres bloquearía el event loop
+        try:
+            socket.inet_aton(ip)
+        except (OSError, TypeError):
+            return ProbeResult(ip, LATENCIA_SIN_RESPUESTA, time.time(), None)
+
+        async with self._slots:
+            future      = self._loop.create_future()
+            sequence    = self._next_sequence()
+            self._pending[sequence] = (ip, future)
+            sent_at     = time.time()
+            try:
+                await self._loop.sock_sendto(self._sock, self._build_packet(sequence), (ip, 0))
+                received_at = await asyncio.wait_for(future, timeout)
+                return ProbeResult(ip, round((received_at - sent_at) * 1000, 3), sent_at, received_at)
+            except (asyncio.TimeoutError, OSError):
+                return ProbeResult(ip, LATENCIA_SIN_RESPUESTA, sent_at, None)
+            finally:
+                self._pending.pop(sequence, None)
+
+
+    async def ping_many(self, ips : list, timeout : float = 1.0) -> list:
+        return await asyncio.gather(*(self.ping(ip, timeout) for ip in ips))
+
+
+    async def ping_burst(self, ip : str, count : int, interval : float, timeout : float = 1.0, delay : float = 0.0) -> BurstResult:
+        # Los echos se lanzan cada 'interval' sin esperar la respuesta del anterior
+        if delay:
+            await asyncio.sleep(delay)
+        probes = []
+        for index in range(count):
+            if index:
+                await asyncio.sleep(interval)
+            probes.append(asyncio.ensure_future(self.ping(ip, timeout)))
+        return summarize_burst(ip, await asyncio.gather(*probes))
+
+
+    async def ping_many_burst(self, ips : list, count : int, interval : float, timeout : float = 1.0) -> list:
+        # Cada IP arranca con un desfase dentro del primer intervalo para repartir los envíos
+        total = max(len(ips), 1)
+        return await asyncio.gather(*(
+            self.ping_burst(ip, count, interval, timeout, delay = interval * index / total)
+            for index, ip in enumerate(ips)
+        ))
+
+
+## Sondea todas las IPs y retorna diccionarios con el formato del modelo Latencia.
+## Con muestras > 1 se envía una ráfaga por IP y se agregan latencia_min, latencia_max,
+## jitter (mdev), perdida (%) y muestras; 'latencia' es el promedio (-1 si se perdieron todas)
+def probe_latencias(ips : list, timeout : float = 1.0, max_in_flight : int = 2000,
+                    muestras : int = 1, intervalo : float = 0.2) -> list:
+    async def _run():
+        async with AsyncICMPProber(max_in_flight) as prober:
+            if muestras > 1:
+                return await prober.ping_many_burst(ips, muestras, intervalo, timeout)
+            return await prober.ping_many(ips, timeout)
+
+    if muestras <= 1:
+        return [
+            {
+                "ip"        : result.ip,
+                "latencia"  : result.latencia,
+                "fecha"     : datetime.fromtimestamp(result.enviado).strftime("%Y-%m-%d %H:%M:%S")
+            }
+            for result in asyncio.run(_run())
+        ]
+
+    return [
+        {
+            "ip"            : result.ip,
+            "latencia"      : result.promedio if result.promedio is not None else LATENCIA_SIN_RESPUESTA,
+            "fecha"         : datetime.fromtimestamp(result.enviado).strftime("%Y-%m-%d %H:%M:%S"),
+            "latencia_min"  : result.minimo,
+            "latencia_max"  : result.maximo,
+            "jitter"        : result.mdev,
+            "perdida"       : result.perdida,
+            "muestras"      : result.muestras,
+        }
+        for result in asyncio.run(_run())
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+    for row in probe_latencias(sys.argv[1:] or ["127.0.0.1"], muestras = 5):
+        print(row)
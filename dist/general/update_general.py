@@ -7,19 +7,29 @@
 #  Tablas        : latencia
 # =============================================================================
 from smartlink.models.latencia_models import Latencia as Model
-from smartlink.global_utils import FOLDER_OUTPUT, group_ips, print_dictionary
+from smartlink.global_utils import FOLDER_OUTPUT, print_dictionary
 from smartlink.http_utils   import DB_API_URL, get_request_to_url, post_request_to_url_model_array
 from smartlink.csv_utils    import restart_log_file, write_log_files
 from smartlink.local_utils  import ping_host, print_index_models_from_array
 from concurrent.futures     import ThreadPoolExecutor
 from datetime               import datetime
+from icmp_prober            import probe_latencias
+from typing                 import Optional
 
 import argparse
 import traceback
-import queue
+import sys
 import os
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collector.pipeline     import PipelinedScheduler, BatchSink
+
 MAX_THREAD_NUMBER   = 25
+ICMP_TIMEOUT        = 2.0       # segundos de espera por IP en el prober ICMP
+ICMP_MAX_IN_FLIGHT  = 2000      # echo requests simultáneos como máximo
+POST_BATCH_SIZE     = 500       # modelos por envío a latencia/add_list
+INTERVALO_MUESTRAS  = 0.2       # segundos entre echos de una misma ráfaga
+SINK_MAX_DELAY      = 5.0       # segundos máximos que un resultado espera su envío (modo ping)
 script_path         = os.path.abspath(__file__)
 script_folder       = os.path.dirname(script_path)
 script_name         = os.path.basename(script_path)
@@ -27,20 +37,29 @@ script_name         = os.path.basename(script_path)
 # Direccion de archivos de salida en /usr/smartlink/outputs
 file_latency        = os.path.join(FOLDER_OUTPUT, "latency.csv")
 
-## Activacion del modo DEBUG
+URL_INVENTARIO      = DB_API_URL + "inventario/get"
+URL_POST_MODEL      = DB_API_URL + "latencia/add_list"
+
+## Latencia con las estadísticas de una ráfaga de N echos (modo multi-muestra)
+class ModelMuestras(Model):
+    latencia_min    : Optional[float] = None
+    latencia_max    : Optional[float] = None
+    jitter          : Optional[float] = None
+    perdida         : Optional[float] = None
+    muestras        : Optional[int]   = None
+
+
+## Activacion del modo DEBUG (se sobrescribe desde main() o desde el colector)
 _DEBUG_MODE = False
 _TEST_MODE  = False
-parser = argparse.ArgumentParser(description="Script para capturar latencia de multiples equipos")
-parser.add_argument('-d', '--debug', action='store_true', help='Enable debug mode')
-parser.add_argument('-t', '--test', action='store_true', help='Enable test environment')
-args = parser.parse_args()
-_DEBUG_MODE = args.debug
-_TEST_MODE  = args.test
+
+## Feed de resultados en vivo (collector.feed.ResultFeed); lo asigna el colector residente
+FEED = None
 
 
 ''' -------------------------------------------------------------------------- '''
-def async_task(ip_host : str, queue : queue.Queue):
-    # Realiza un ping asíncrono y guarda el resultado en la cola
+def async_task(ip_host : str) -> dict:
+    # Realiza un ping y retorna el resultado
     response_task = {
         "ip"        : ip_host,
         "latencia"  : ping_host(ip_host, _debug = _DEBUG_MODE),
@@ -49,66 +68,113 @@ def async_task(ip_host : str, queue : queue.Queue):
     if _DEBUG_MODE:
         print_dictionary(response_task)
     
-    queue.put(response_task)
+    return response_task
+
+
+## Lista de IPs a medir: todo el inventario
+def get_subscribers() -> list:
+    return [item["ip"] for item in get_request_to_url(URL_INVENTARIO)]
+
+
+## Envía un lote de modelos a latencia/add_list y lo agrega al CSV de salida
+def send_models(model_array_list : list, restart_log : bool = False):
+    try:
+        if not _TEST_MODE:
+            post_request_to_url_model_array(URL_POST_MODEL, 
+                                            array_model_to_post = model_array_list,
+                                            _debug = _DEBUG_MODE)
+        else:
+            len_models_available = len(model_array_list)
+            row_to_print = min(len_models_available, 5)
+            print_index_models_from_array(model_array_list, row_to_print)
+    except Exception as e:
+        print(f"{script_name} | Error al tratar de enviar los datos por HTTP: {e}")
+
+    if FEED is not None:
+        FEED.publish("latencia", [model.model_dump() for model in model_array_list])
+        
+    try:
+        if restart_log:
+            # Cabecera del modelo enviado: ModelMuestras agrega las columnas de la ráfaga
+            restart_log_file(file_latency, type(model_array_list[0]) if model_array_list else Model)
+        write_log_files(file_latency, model_array_list)
+    except Exception as e:
+        print(f"{script_name} | Error al tratar de almacenar el registro: {e}")
+
+
+## Pasada con el prober ICMP asíncrono: todas las IPs en vuelo a la vez sobre un solo socket.
+## Con muestras > 1 se envía una ráfaga por IP (intercaladas entre IPs) y se registran
+## min / avg / max / jitter / pérdida
+def update_latencia_icmp(suscribers : list, muestras : int = 1):
+    resultados = probe_latencias(suscribers, timeout = ICMP_TIMEOUT, max_in_flight = ICMP_MAX_IN_FLIGHT,
+                                 muestras = muestras, intervalo = INTERVALO_MUESTRAS)
+    if _DEBUG_MODE:
+        for response_task in resultados:
+            print_dictionary(response_task)
+
+    model_class      = ModelMuestras if muestras > 1 else Model
+    model_array_list = [model_class(**response_task) for response_task in resultados]
+    for index in range(0, len(model_array_list), POST_BATCH_SIZE):
+        send_models(model_array_list[index:index + POST_BATCH_SIZE], restart_log = index == 0)
+
+
+## Una pasada completa de latencia sobre 'suscribers'.
+## modo = "icmp" usa el prober asíncrono; si no hay permisos para sockets ICMP
+## (o modo = "ping") se usa ping_host en hilos con el planificador en tubería (siempre una muestra).
+## Si se entrega 'executor' se reutiliza (colector residente); si no, se crea uno para la pasada
+def update_latencia(suscribers : list, executor : ThreadPoolExecutor = None, modo : str = "icmp", muestras : int = 1):
+    if modo == "icmp":
+        try:
+            return update_latencia_icmp(suscribers, muestras)
+        except OSError as e:
+            print(f"{script_name} | No se pudo abrir un socket ICMP ({e}), se usa ping_host")
+
+    if executor is None:
+        with ThreadPoolExecutor(MAX_THREAD_NUMBER) as own_executor:
+            return update_latencia(suscribers, own_executor, modo = "ping")
+
+    once = True
+    def flush(model_array_list : list):
+        nonlocal once
+        send_models(model_array_list, restart_log = once)
+        once = False
+
+    def on_result(_ip : str, model_data : dict):
+        if model_data:
+            sink.add(Model(**model_data))
+
+    # Cada IP que termina libera su hilo para la siguiente; los resultados se envían por lotes
+    with BatchSink(flush, batch_size = POST_BATCH_SIZE, max_delay = SINK_MAX_DELAY, name = "latencia") as sink:
+        stats = PipelinedScheduler(executor, name = "latencia").run(suscribers, async_task, on_result)
+    print(f"• {stats}")
 
 
 ''' ------------------------------------------------------------------------------
 ---------------------------    PROGRAMA PRINCIAPAL     ---------------------------
 ------------------------------------------------------------------------------ '''
-try:
-    ## Obtenemos datos de la lista de equipos de la API
-    url_inventario  = DB_API_URL + f"inventario/get"
-    suscribers      = [item["ip"] for item in get_request_to_url(url_inventario)]
-    print(f"Se han detectado un total de {len(suscribers)} equipos en Inventario")
+def main():
+    global _DEBUG_MODE, _TEST_MODE
+    parser = argparse.ArgumentParser(description="Script para capturar latencia de multiples equipos")
+    parser.add_argument('-d', '--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('-t', '--test', action='store_true', help='Enable test environment')
+    parser.add_argument('-m', '--modo', choices=['icmp', 'ping'], default='icmp', help='icmp: prober asíncrono (por defecto) | ping: ping_host en hilos')
+    parser.add_argument('-n', '--muestras', type=int, default=1, help='Echos por IP en cada pasada (modo icmp). Con N > 1 se registran min/avg/max/jitter/pérdida')
+    args = parser.parse_args()
+    _DEBUG_MODE = args.debug
+    _TEST_MODE  = args.test
 
-    q = queue.Queue()
-    max_threads_number = MAX_THREAD_NUMBER
-
-    list_groups_ip_to_request   = group_ips(suscribers, max_group_size = max_threads_number)
-    url_to_post_models_dict     = DB_API_URL + "latencia/add_list"
-    once = True
-    with ThreadPoolExecutor(max_threads_number) as executor:
-        for _group in list_groups_ip_to_request:
-            futures = [executor.submit(async_task, _ip, q) for _ip in _group]
-            
-            # Esperar a que todos los hilos del grupo terminen
-            for future in futures:
-                future.result()
-
-            # Procesar los resultados inmediatamente
-            model_array_list = []
-            while not q.empty():
-                model_data = q.get()
-                if model_data:
-                    model_array_list.append(Model(**model_data))
-
-            # Enviar datos en lotes a la base de datos
-            if model_array_list:
-                try:
-                    if not _TEST_MODE:
-                        post_request_to_url_model_array(url_to_post_models_dict, 
-                                                        array_model_to_post = model_array_list,
-                                                        _debug = _DEBUG_MODE)
-                    else:
-                        len_models_available = len(model_array_list)
-                        row_to_print = min(len_models_available, 5)
-                        print_index_models_from_array(model_array_list, row_to_print)
-                except Exception as e:
-                    print(f"{script_name} | Error al tratar de enviar los datos por HTTP: {e}")
+    try:
+        ## Obtenemos datos de la lista de equipos de la API
+        suscribers      = get_subscribers()
+        print(f"Se han detectado un total de {len(suscribers)} equipos en Inventario")
+        update_latencia(suscribers, modo = args.modo, muestras = args.muestras)
                     
-                try:
-                    if once:
-                        restart_log_file(file_latency, Model)
-                        once = False
-                    write_log_files(file_latency, model_array_list)
-                except Exception as e:
-                    print(f"{script_name} | Error al tratar de almacenar el registro: {e}")
-                
-except Exception as e:
-    if str(e):
-        print(f"\n‼ Error en {script_name}:\n{e}")
-        if _DEBUG_MODE:
-            print(traceback.format_exc())
-
+    except Exception as e:
+        if str(e):
+            print(f"\n‼ Error en {script_name}:\n{e}")
+            if _DEBUG_MODE:
+                print(traceback.format_exc())
 
 
+if __name__ == "__main__":
+    main()
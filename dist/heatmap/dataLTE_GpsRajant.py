@@ -7,12 +7,14 @@
 import sys
 sys.path.append('/usr/smartlink')
 
-from rajant.bcapi_utils     import getRajantData, _ROLES, _PASSWORDS
+from rajant.bcapi_utils     import getRajantData, _ROLES, _PASSWORDS, SESSION_POOL
 from rajant.format_utils    import dms_to_dd
-from LTE.LTE_module         import USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, SSH_COMMAND_LIST, parse_LTE_Mikrotik_dictionary
+from LTE.LTE_module         import USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, SSH_COMMAND_LIST, SSH_SCRIPT_LTE, SSH_MODO_COMANDOS, SSH_MODO_SCRIPT
+from LTE.LTE_module         import LTE_BASE_DICTIONARY, parse_LTE_Mikrotik_dictionary, parse_lte_script_output, map_lte_fields
+from LTE.ssh_pool           import SSHSessionPool, profile_from_inventory
 
 from smartlink.http_utils   import DB_API_URL, get_request_to_url_with_filters
-from smartlink.ssh_utils    import mySSHClient
+from smartlink.error_utils  import KEYNAME_ERROR_DICT
 from smartlink.global_utils import FOLDER_HITMAN
 from smartlink.local_utils  import ping_host
 from datetime               import datetime
@@ -38,6 +40,10 @@ DEBUG_MODE          = True
 FOLDER_OUT_HITMAN   = os.path.join(FOLDER_HITMAN, TIPO)
 FOLDER_ALTERNATIVE  = os.path.join("/home/support/heatmap", TIPO.upper())
 
+## Una sesión SSH abierta por router durante todo el muestreo: cada muestra solo abre canales
+SSH_POOL            = SSHSessionPool(USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, keepalive = 5, idle_timeout = 60)
+MODO_SSH            = SSH_MODO_COMANDOS
+
 
 ## Funcion para obtener los datos GPS (si no hay, retorna None)
 def getGPSData(ip_device_rajant : str, time_out : int = 5) -> dict | None:
@@ -47,7 +53,8 @@ def getGPSData(ip_device_rajant : str, time_out : int = 5) -> dict | None:
             user    = _ROLES[DEFAULT_ROL], 
             passw   = _PASSWORDS[DEFAULT_ROL],
             timeout = time_out, 
-            debug_mode = DEBUG_MODE
+            debug_mode = DEBUG_MODE,
+            pool    = SESSION_POOL
         )
 
         if data_proto_rajant and data_proto_rajant.HasField("gps"):
@@ -66,51 +73,32 @@ def getGPSData(ip_device_rajant : str, time_out : int = 5) -> dict | None:
         return None
     
 
+## Datos LTE del router con las claves de LTE_BASE_DICTIONARY ({} si no responde)
 def getSshData(ip_target : str, timeout : int = 10, _mode_debug = False) -> dict:
-
-    ssh_agent = mySSHClient(ip_target       = ip_target, 
-                            user_ssh        = USER_SSH_MIKROTIK, 
-                            password_ssh    = PASS_SSH_MIKROTIK,
-                            debug_mode      = _mode_debug, 
-                            timeout         = timeout)
-    
-    data_ssh_dict = ssh_agent.mapping_command_ssh(SSH_COMMAND_LIST, 3, False)
+    comandos = [SSH_SCRIPT_LTE] if MODO_SSH == SSH_MODO_SCRIPT else SSH_COMMAND_LIST
+
+    data_ssh_dict = SSH_POOL.mapping_command_ssh(ip_target, comandos, timeout)
+    error_ssh = data_ssh_dict.pop(KEYNAME_ERROR_DICT, None)
+    if error_ssh:
+        if _mode_debug:
+            print(f"✘ {error_ssh}")
+        return {}
+
+    if MODO_SSH == SSH_MODO_SCRIPT:
+        data_ssh = parse_lte_script_output(data_ssh_dict[SSH_SCRIPT_LTE], field_map = LTE_BASE_DICTIONARY)
+        error_parse = data_ssh.pop(KEYNAME_ERROR_DICT, None)
+        if error_parse:
+            if _mode_debug:
+                print(f"✘ {ip_target}: {error_parse}")
+            return {}
+        return data_ssh
     data_ssh = parse_LTE_Mikrotik_dictionary(data_ssh_dict)
-
-    return data_ssh
+    return map_lte_fields(data_ssh, LTE_BASE_DICTIONARY) if data_ssh else {}
 
 
 ## Funcion en pararelo para cada equipo obtenido
 async def async_task(row_ip, fq_sample, queue: asyncio.Queue):
 
-    base_dictionary = {
-        "name"              : "name",
-        "type"              : "type",
-        "APN"               : "apn-profiles",
-        "manufacturer"      : "manufacturer",
-        "model"             : "model",
-        "IMEI"              : "IMEI",
-        "IMSI"              : "IMSI",
-        "status"            : "status",
-        "networkmode"       : "network-mode",
-        "rssi"              : "rssi",
-        "rsrp"              : "rsrp",
-        "rsrq"              : "rsrq",
-        "snr"               : "sinr",
-        "currentoperator"   : "current-operator",
-        "lac"               : "lac",
-        "currentcellid"     : "currentcell-id",
-        "enbid"             : "enb-id",
-        "sectorid"          : "sectorid",
-        "linkdowns"         : "link-downs",
-        "gpsLat"            : "latitud",
-        "gpsLong"           : "longitud",
-        "gpsAlt"            : "altura",
-        #"accestechnology" : None,
-        #"lastlinkdowntime" : None,
-        #"lastlinkuptime" : None,
-    }
-
     ip_device, ip_gps_reference = row_ip
 
     task_timeout = min(5, fq_sample -2)
@@ -126,14 +114,7 @@ async def async_task(row_ip, fq_sample, queue: asyncio.Queue):
 
     ## Datos de LTE por SSH
     hora_de_consulta    = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    if data_ssh:
-        data_ssh_lower      = {key.lower(): value for key, value in data_ssh.items()}
-        dictionary_sistema  = {new_key: data_ssh_lower.get(original_key.lower(), None) 
-                            for new_key, original_key in base_dictionary.items() }
-        dictionary_sistema  = {
-            key: (value.replace('"', '') if isinstance(value, str) else value)
-            for key, value in dictionary_sistema.items()
-        }
+    dictionary_sistema  = dict(data_ssh) if data_ssh else {}
 
     if data_gps:
         dictionary_sistema.update(data_gps)
@@ -162,25 +143,33 @@ async def process_devices(ip_list, freq_muestreo):
 ##  ---------------------------    PROGRAMA PRINCIAPAL     ---------------------------
 try:
     if len(sys.argv) < 3:
-        print("Uso: python script.py <tiempo_duracion_min> <intervalo_seg>")
+        print("Uso: python script.py <tiempo_duracion_min> <intervalo_seg> [script]")
         sys.exit(1)
     
     tiempo_duracion_min     = int(sys.argv[1])
     intervalo_seg           = int(sys.argv[2])
+    if len(sys.argv) > 3 and sys.argv[3] == SSH_MODO_SCRIPT:
+        MODO_SSH = SSH_MODO_SCRIPT
 
     ## Obtenemos datos de la lista de equipos tipo LTE de la API
     url_inventario      = DB_API_URL + f"inventario/get"
     filter_inventario   = ["tipo", TIPO]
     
+    inventario  = get_request_to_url_with_filters(url_inventario, filter_array = filter_inventario)
     subscribers = [
         [item["ip"], anotacion_dict.get("gps")]
-        for item in get_request_to_url_with_filters(url_inventario, filter_array = filter_inventario)
+        for item in inventario
         if item.get("anotacion") 
         and isinstance(item["anotacion"], str)  # Ensure it's a string before parsing
         and "modo" in (anotacion_dict := json.loads(item["anotacion"]))  # Parse JSON safely
         and anotacion_dict["modo"] == "heatmap"
     ]
 
+    # Perfil de algoritmos SSH fijado en el inventario (CPE antiguos)
+    for item in inventario:
+        if perfil := profile_from_inventory(item):
+            SSH_POOL.set_profile(item["ip"], perfil)
+
     if len(subscribers) == 0:
         print(f"No hay equipos compatibles con LTE / Hitman")
         raise Exception()
@@ -215,6 +204,7 @@ try:
         shutil.rmtree(FOLDER_ALTERNATIVE)
 
     shutil.copytree(FOLDER_OUT_HITMAN, FOLDER_ALTERNATIVE)
+    SSH_POOL.close()
 
 except Exception as e:
     if str(e):
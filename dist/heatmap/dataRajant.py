@@ -7,7 +7,7 @@
 import sys
 sys.path.append('/usr/smartlink')
 
-from rajant.bcapi_utils     import getRajantData, _ROLES, _PASSWORDS
+from rajant.bcapi_utils     import getRajantData, _ROLES, _PASSWORDS, SESSION_POOL
 from rajant.format_utils    import dms_to_dd
 # - - - - - - - - - - - - - - - - -
 from smartlink.local_utils  import ping_host
@@ -63,7 +63,8 @@ def getVersionData(ip_target : str, time_out : int = 5) -> dict | None:
             user        = _ROLES[DEFAULT_ROL],
             passw       = _PASSWORDS[DEFAULT_ROL],
             timeout     = time_out - 2,
-            debug_mode  = DEBUG_MODE
+            debug_mode  = DEBUG_MODE,
+            pool        = SESSION_POOL
         )
         if not data_proto_rajant or not data_proto_rajant.HasField("gps"):
             #print(f"Valores gps vacios en {ip_target}")
@@ -2,6 +2,9 @@ from smartlink.error_utils import RAJANT_SESSION_FAILED, RAJANT_QUERY_INVALID
 from bcutilshcg import bcsession
 from datetime import datetime as dt
 import bcapihcg
+import threading
+import asyncio
+import atexit
 import time
 
 _PASSWORDS = {
@@ -33,8 +36,9 @@ def get_amplifiers(model, state):
 
 class iperf3_broker():
     _session            = None
-    _OFFSET_TIME_SCAN   = 10
-    _SLEEP_TIME_RESULT  = 10
+    _OFFSET_TIME_SCAN   = 10        # espera máxima [s] por el resultado después de la duración del test
+    _POLL_INTERVAL      = 0.5       # primera consulta del resultado; el intervalo se duplica hasta _POLL_MAX_INTERVAL
+    _POLL_MAX_INTERVAL  = 4.0
 
     def __init__(self, ip_cliente, role : str = "admin", timeout : int = 1, debug_mode : bool = False):
         self._client    = ip_cliente
@@ -114,6 +118,24 @@ class iperf3_broker():
             return None
 
 
+    def _poll_result_iperf3(self, session, task_id) -> bytes:
+        output_request  = bcapihcg.Common_pb2.TaskOutputRequest(id=task_id)
+        result_request  = bcapihcg.Message_pb2.BCMessage(taskOutputRequest=output_request)
+        deadline        = time.monotonic() + self._OFFSET_TIME_SCAN
+        interval        = self._POLL_INTERVAL
+        while True:
+            session.sendmsg(result_request)
+            response = session.recvmsg()
+            if response.taskOutputResponse.status == bcapihcg.Message_pb2.BCMessage.Result.SUCCESS and response.taskOutputResponse.data:
+                return response.taskOutputResponse.data
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError("Error al recibir resultado del IPERF3 | Rajant")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, self._POLL_MAX_INTERVAL)
+
+
     def start_test_iperf3(self, ip_server_target : str = None, duration_time : int = 15) -> list:
         fecha_resultado = dt.now().replace(microsecond=0).isoformat(sep=' ')
         data_result_iperf3 = [self._client, ip_server_target, "-", "-", "-", "-", "-", fecha_resultado]
@@ -140,23 +162,14 @@ class iperf3_broker():
             # Esperar a que el test finalice
             if self._debug:
                 print(f"-> {self._client} -> {ip_server_target} : Ejecutando test_iperf3 / {duration_time}s ...")
-            wait_time = min(60, duration_time) + self._OFFSET_TIME_SCAN
-            time.sleep(wait_time)
+            test_time = min(60, duration_time)
+            time.sleep(test_time)
 
             if self._debug:
                 print(f"-> {self._client} -> {ip_server_target} : Solicitando resultados")
 
-            # Solicitar resultados del test
-            output_request = bcapihcg.Common_pb2.TaskOutputRequest(id=result.id)
-            result_request = bcapihcg.Message_pb2.BCMessage(taskOutputRequest=output_request)
-
-            session.sendmsg(result_request)
-            response = session.recvmsg()
-
-            if response.taskOutputResponse.status != bcapihcg.Message_pb2.BCMessage.Result.SUCCESS:
-                raise RuntimeError("Error al recibir resultado del IPERF3 | Rajant")
-
-            result_data = response.taskOutputResponse.data
+            # Solicitar resultados del test hasta que estén disponibles (o se cumpla _OFFSET_TIME_SCAN)
+            result_data = self._poll_result_iperf3(session, result.id)
             parsed_result = bcapihcg.Common_pb2.Iperf3Result()
             parsed_result.ParseFromString(result_data)
             # Parsear resultados
@@ -171,10 +184,7 @@ class iperf3_broker():
                 fecha_resultado                                             # 7
             ]
             if self._debug:
-                print(f"-> {self._client} -> {ip_server_target} : Finalizado. Esperando {self._SLEEP_TIME_RESULT}s para continuar")
-            
-            # Tiempo de espera entre pruebas
-            time.sleep(self._SLEEP_TIME_RESULT)
+                print(f"-> {self._client} -> {ip_server_target} : Finalizado")
 
         except Exception as e:
             if self._debug:
@@ -268,7 +278,9 @@ class InterfaceStats(object):
                 return self._session
 
 
-    def _printstate(self, debug_mode = False):
+    def _query_state(self, debug_mode = False):
+        # Consulta el estado usando la sesión actual (la abre si no existe).
+        # Ante cualquier error la sesión se descarta para no reutilizarla rota.
         session = None
         try:
             # get state from the crumb
@@ -282,9 +294,7 @@ class InterfaceStats(object):
                 raise RuntimeError(_error_msg)
 
             session.sendmsg(m)
-            state= session.recvmsg().state
-            self.destroy_session()
-            return state
+            return session.recvmsg().state
         
         except Exception as e:
             if session:
@@ -295,12 +305,117 @@ class InterfaceStats(object):
             raise RuntimeError(_error_msg) from e
 
 
+    def _printstate(self, debug_mode = False):
+        try:
+            return self._query_state(debug_mode)
+        finally:
+            self.destroy_session()
+
+
+class BcSessionPool(object):
+    """
+    Pool de sesiones BreadCrumb persistentes, una por (IP, rol).
+
+    La sesión (handshake + autenticación + lectura del modelo) se abre una sola
+    vez y se reutiliza en cada consulta. Es seguro usarlo desde varios hilos
+    (get_state) y desde asyncio (get_state_async); las consultas a una misma
+    IP se serializan con su propio lock.
+      - Si una sesión reutilizada falla, se descarta y se reintenta una vez con
+        una sesión nueva (reconexión automática).
+      - Tras un fallo de conexión, esa IP no se reintenta hasta pasados
+        'retry_backoff' segundos, para no bloquear el ciclo en equipos caídos.
+      - Las sesiones sin uso durante 'idle_timeout' segundos se cierran.
+    """
+
+    def __init__(self, idle_timeout : float = 120, retry_backoff : float = 5):
+        self._idle_timeout  = idle_timeout
+        self._retry_backoff = retry_backoff
+        self._lock          = threading.Lock()
+        self._entries       = {}
+        atexit.register(self.close_all)
+
+
+    def _get_entry(self, ipv4 : str, role, passw : str, timeout : float) -> dict:
+        key = (ipv4, role)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["passw"] != passw:
+                stats               = InterfaceStats()
+                stats._target       = ipv4
+                stats._role         = role
+                stats._passphrase   = passw
+                entry = {"stats" : stats, "passw" : passw, "lock" : threading.Lock(), "last_used" : time.time(), "failed_at" : 0.0}
+                self._entries[key] = entry
+            # Marcado bajo el lock del pool para que evict_idle no la cierre justo antes de usarla
+            entry["last_used"] = time.time()
+        # El timeout solo aplica a las sesiones que se abran a partir de ahora
+        entry["stats"]._session_timeout = timeout
+        return entry
+
+
+    def get_state(self, ipv4 : str, role, passw : str, timeout : float = 5, debug_mode : bool = False):
+        self.evict_idle()
+        entry = self._get_entry(ipv4, role, passw, timeout)
+        with entry["lock"]:
+            stats   = entry["stats"]
+            reused  = stats._session is not None
+            if not reused and time.time() - entry["failed_at"] < self._retry_backoff:
+                _error_msg = f"{RAJANT_SESSION_FAILED[0]}|{RAJANT_SESSION_FAILED[1]}|Reconexión en espera tras un fallo reciente"
+                raise RuntimeError(_error_msg)
+
+            # Un intento con la sesión reutilizada y, si falla, otro con una sesión nueva
+            for attempt in range(2 if reused else 1):
+                try:
+                    state = stats._query_state(debug_mode)
+                    entry["failed_at"] = 0.0
+                    return state
+                except Exception as e:
+                    if debug_mode:
+                        print(f"♦ Pool BreadCrumb {ipv4}: intento {attempt + 1} fallido -> {e}")
+                    if attempt + 1 == (2 if reused else 1):
+                        entry["failed_at"] = time.time()
+                        raise
+
+
+    async def get_state_async(self, ipv4 : str, role, passw : str, timeout : float = 5, debug_mode : bool = False):
+        return await asyncio.to_thread(self.get_state, ipv4, role, passw, timeout, debug_mode)
+
+
+    def evict_idle(self):
+        limit = time.time() - self._idle_timeout
+        with self._lock:
+            idle = [(key, entry) for key, entry in self._entries.items() if entry["last_used"] < limit]
+            for key, entry in idle:
+                # Si la sesión está en uso se deja para la siguiente pasada
+                if not entry["lock"].acquire(blocking = False):
+                    continue
+                try:
+                    entry["stats"].destroy_session()
+                    del self._entries[key]
+                finally:
+                    entry["lock"].release()
+
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            with entry["lock"]:
+                entry["stats"].destroy_session()
+
+
+## Pool compartido por los recolectores que consultan de forma periódica
+SESSION_POOL = BcSessionPool()
+
+
 def getRajantData(ipv4  : str, 
                   user  : str = None, 
                   passw : str = None, 
                   role  : str = None,  # Nuevo parámetro role
                   timeout: int = 5, 
-                  debug_mode: bool = False
+                  debug_mode: bool = False,
+                  pool: BcSessionPool = None
                   ):
     # Si se pasa un rol, extraer el usuario y contraseña correspondientes
     if role:
@@ -318,6 +433,10 @@ def getRajantData(ipv4  : str,
     if passw is None:
         raise ValueError("No hay una contraseña establecida")
 
+    # Con pool se reutiliza la sesión persistente de la IP
+    if pool is not None:
+        return pool.get_state(ipv4, user, passw, timeout, debug_mode)
+
     try:
         session_interface = InterfaceStats()
         session_interface._role = user
@@ -0,0 +1,142 @@
+# =============================================================================
+#                   Smartlink - Snapshots Rajant por cambios (delta)
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+#  Tablas        : rajant_snapshot
+# =============================================================================
+#  Guarda en el colector el último snapshot de cada IP (config, instamesh,
+#  wired, wireless y sensores) y en cada pasada envía solo lo que cambió:
+#    - "completo": snapshot entero. Se envía la primera vez, cada
+#      'keyframe_every' pasadas y cuando config.uptime retrocede (reinicio).
+#    - "delta": {"cambios": {...}, "eliminados": [[ruta], ...]}. 'cambios'
+#      contiene solo las hojas que cambiaron (los diccionarios se recorren, las
+#      listas se reemplazan completas); 'eliminados' las claves que ya no están.
+#  La API (rajant_snapshot_router.py) reconstruye el snapshot de cualquier
+#  instante aplicando los deltas sobre el último "completo".
+# =============================================================================
+from pydantic   import BaseModel
+from typing     import Dict
+import threading
+import copy
+import json
+import os
+
+TIPO_COMPLETO   = "completo"
+TIPO_DELTA      = "delta"
+
+
+class RajantSnapshot(BaseModel):
+    ip      : str
+    fecha   : str
+    tipo    : str
+    datos   : Dict
+
+
+## Diferencia entre dos diccionarios anidados: (cambios, eliminados)
+def diff_snapshot(anterior : dict, actual : dict, ruta : list = None) -> tuple:
+    ruta        = ruta or []
+    cambios     = {}
+    eliminados  = []
+    for key, value in actual.items():
+        if key not in anterior:
+            cambios[key] = value
+        elif isinstance(value, dict) and isinstance(anterior[key], dict):
+            sub_cambios, sub_eliminados = diff_snapshot(anterior[key], value, ruta + [key])
+            if sub_cambios:
+                cambios[key] = sub_cambios
+            eliminados.extend(sub_eliminados)
+        elif anterior[key] != value:
+            cambios[key] = value
+    for key in anterior:
+        if key not in actual:
+            eliminados.append(ruta + [key])
+    return cambios, eliminados
+
+
+## Aplica un delta sobre un snapshot (modifica 'snapshot')
+def apply_delta(snapshot : dict, delta : dict) -> dict:
+    for ruta in delta.get("eliminados", []):
+        target = snapshot
+        for key in ruta[:-1]:
+            target = target.get(key, {})
+        if isinstance(target, dict):
+            target.pop(ruta[-1], None)
+
+    def _merge(target : dict, cambios : dict):
+        for key, value in cambios.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                _merge(target[key], value)
+            else:
+                target[key] = copy.deepcopy(value)
+
+    _merge(snapshot, delta.get("cambios", {}))
+    return snapshot
+
+
+def _uptime(snapshot : dict):
+    return (snapshot.get("config") or {}).get("uptime")
+
+
+class SnapshotDeltaEncoder(object):
+    """
+    Último snapshot por IP y pasadas desde el último "completo". Uso:
+        tipo, datos = encoder.encode(ip, snapshot)
+    Si un envío falla se llama a reset(ips) para que esas IPs vuelvan a
+    enviar un "completo" y la API no quede con un delta perdido.
+    """
+
+    def __init__(self, keyframe_every : int = 12):
+        self._keyframe_every    = max(1, keyframe_every)
+        self._last              = {}        # ip -> snapshot
+        self._cycles            = {}        # ip -> deltas enviados desde el último completo
+        self._lock              = threading.Lock()
+
+
+    def encode(self, ip : str, snapshot : dict) -> tuple:
+        with self._lock:
+            anterior = self._last.get(ip)
+            reinicio = (anterior is not None and _uptime(anterior) is not None and _uptime(snapshot) is not None
+                        and _uptime(snapshot) < _uptime(anterior))
+            if anterior is None or reinicio or self._cycles.get(ip, 0) + 1 >= self._keyframe_every:
+                tipo, datos         = TIPO_COMPLETO, snapshot
+                self._cycles[ip]    = 0
+            else:
+                cambios, eliminados = diff_snapshot(anterior, snapshot)
+                tipo, datos         = TIPO_DELTA, {"cambios": cambios}
+                if eliminados:
+                    datos["eliminados"] = eliminados
+                self._cycles[ip]    = self._cycles.get(ip, 0) + 1
+            self._last[ip] = copy.deepcopy(snapshot)
+            return tipo, datos
+
+
+    def reset(self, ips : list = None):
+        with self._lock:
+            for ip in (list(self._last) if ips is None else ips):
+                self._last.pop(ip, None)
+                self._cycles.pop(ip, None)
+
+
+    ## Persistencia entre ejecuciones por cron (el colector residente la mantiene en memoria)
+    def save(self, path : str):
+        with self._lock:
+            temporal = path + ".tmp"
+            with open(temporal, "w") as file:
+                json.dump({"last": self._last, "cycles": self._cycles}, file)
+            os.replace(temporal, path)
+
+
+    def load(self, path : str):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path) as file:
+                state = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"✘ No se pudo leer el estado de deltas {path}, se enviarán snapshots completos: {e}")
+            return
+        with self._lock:
+            self._last      = state.get("last", {})
+            self._cycles    = state.get("cycles", {})
@@ -1,3 +1,5 @@
+from functools import lru_cache
+from operator import attrgetter
 import traceback
 import json
 import os
@@ -31,110 +33,128 @@ def dms_to_dd(dms_str) -> float:
     return round(dd,7)
 
 
+## Accesores precalculados para los campos que se guardan
+_GET_GPS            = attrgetter("gpsLat", "gpsLong", "gpsAlt")
+_INSTAMESH_FIELDS   = ("packetsDropped", "packetsMulticast", "packetsReceived", "packetsSent")
+_GET_INSTAMESH      = attrgetter(*_INSTAMESH_FIELDS)
+_GET_RX_TX          = attrgetter("rxBytes", "txBytes")
+_GET_NOISE_CHANNEL  = attrgetter("noise", "channel")
+_GET_CLIENT         = attrgetter("mac", "rate", "rssi", "signal")
+_RPT_FIELDS         = ("mac", "action", "cost", "ipv4Address", "encapId")
+_GET_RPT            = attrgetter(*_RPT_FIELDS)
+
+## Orden de las columnas de 'clients' en el formato compacto
+CLIENT_FIELDS       = ("mac", "type", "rate", "rssi", "signal", "ssid")
+
+_SENSOR_FIELDS      = {}        # descriptor de sensores -> nombres de sus campos
+
+
+@lru_cache(maxsize = 16384)
+def _mac_with_manufacturer(byte_mac : bytes) -> tuple:
+    return convert_mac_hex_to_readable(byte_mac, True)
+
+
+@lru_cache(maxsize = 16384)
+def _mac_readable(byte_mac : bytes) -> str:
+    return convert_mac_hex_to_readable(byte_mac)
+
+
+@lru_cache(maxsize = 4096)
+def _dms_to_dd_cached(dms_str : str) -> float:
+    return dms_to_dd(dms_str)
+
+
+def _sensor_fields(sensors) -> tuple:
+    descriptor = sensors.DESCRIPTOR
+    names = _SENSOR_FIELDS.get(descriptor)
+    if names is None:
+        names = _SENSOR_FIELDS[descriptor] = tuple(descriptor.fields_by_name)
+    return names
+
+
 ## Extraccion del pool de datos de rajant
-def extract_rajant_model_data(data_proto_rajant) -> list:
+## Lee solo los campos que se guardan. Con clientes_compactos = True los clientes de cada
+## interfaz wireless se entregan como {"campos": CLIENT_FIELDS, "valores": [[...], ...]}
+def extract_rajant_model_data(data_proto_rajant, clientes_compactos : bool = False) -> list:
     rajant_dictionary   = {}
     wired_array_ip_cost = []
 
     try:
         #  - - - > Si hay datos GPS se almacenan
         if data_proto_rajant.HasField("gps") and (gps_data := data_proto_rajant.gps.gpsPos).ListFields():
+            gps_lat, gps_long, gps_alt = _GET_GPS(gps_data)
             rajant_dictionary["gps"] = {
-                "latitud"   : dms_to_dd(gps_data.gpsLat),
-                "longitud"  : dms_to_dd(gps_data.gpsLong),
-                "altitud"   : round(float(gps_data.gpsAlt), 2)
+                "latitud"   : _dms_to_dd_cached(gps_lat),
+                "longitud"  : _dms_to_dd_cached(gps_long),
+                "altitud"   : round(float(gps_alt), 2)
             }
 
         # - - - >  Valores del sistema / sensores
+        data_system = data_proto_rajant.system
         if data_proto_rajant.HasField("system"):
-            data_system = data_proto_rajant.system
-            sensor_dictionary = {
+            sensors = data_system.sensors
+            rajant_dictionary["sensores"] = {
                 "info": {
                     "sysTemperatura": data_system.temperature,
                     "modelo": data_proto_rajant.manufacturer.model
                 },
                 "valores": {
-                    sensor_type: [data.value.current for data in getattr(data_system.sensors, sensor_type)]
-                    for sensor_type in data_system.sensors.DESCRIPTOR.fields_by_name
-                    if hasattr(data_system.sensors, sensor_type)
+                    sensor_type: [data.value.current for data in getattr(sensors, sensor_type)]
+                    for sensor_type in _sensor_fields(sensors)
                 }
             }
-            rajant_dictionary["sensores"] = sensor_dictionary
 
         # - - - >  Obtenemos los valores de configuracion del equipo
         rajant_dictionary["config"] = {"uptime": data_system.uptime}
 
         # - - - >  Obtenemos los datos Instamesh
-        instamesh_fields = ["packetsDropped", "packetsMulticast", "packetsReceived", "packetsSent"]
-        rajant_dictionary["instamesh"] = {
-            field: getattr(data_proto_rajant.instamesh, field) for field in instamesh_fields
-        }
-
-        # - - - >  Obtenemos los valores de Wired
-        fields_wired_stats          = ["rxBytes", "txBytes"]
-        final_wired_dictionary      = {}
-        # Valores de cada interfaz "wired" que existan
-        # SOLAMNETE si estos contienen modo "AptMaster"
+        rajant_dictionary["instamesh"] = dict(zip(_INSTAMESH_FIELDS, _GET_INSTAMESH(data_proto_rajant.instamesh)))
+
+        # - - - >  Obtenemos los valores de Wired (solo interfaces en modo "AptMaster")
+        final_wired_dictionary = {}
         for _wired_data in data_proto_rajant.wired:
-            #print(f"IP = {data_proto_rajant.system.ipv4.address} / {_wired_data.aptState}")
             if int(_wired_data.aptState) != 0:
                 continue
-            # Valor de Costo        //       Extraemos solo el costo si tiene APT_MASTER
             for _peer_data in _wired_data.peer:
                 if _peer_data.HasField("cost"):
-                    wired_array_ip_cost.append([_peer_data.ipv4Address, int(_peer_data.cost)])    
-            
-            stats_data  = _wired_data.stats
-            wired_stats = {field: getattr(stats_data, field) for field in fields_wired_stats}
-            final_wired_dictionary[_wired_data.name] = wired_stats
+                    wired_array_ip_cost.append([_peer_data.ipv4Address, int(_peer_data.cost)])
+            rx_bytes, tx_bytes = _GET_RX_TX(_wired_data.stats)
+            final_wired_dictionary[_wired_data.name] = {"rxBytes": rx_bytes, "txBytes": tx_bytes}
         rajant_dictionary["wired"] = final_wired_dictionary
 
         # - - - > Obtenemos los valores de Wireless
-        fields_wireless             = ["noise", "channel"]      
-        fields_wireless_stats       = ["rxBytes", "txBytes"]
-        fields_rptArp               = ["mac", "action", "cost", "ipv4Address", "encapId"]
         final_wireless_dictionary   = {}
-        
-        for _wireless_data in data_proto_rajant.wireless:   # Todos los datos wireless en data.proto
-            name_wireless = _wireless_data.name
+        wireless_costs              = []
+        for _wireless_data in data_proto_rajant.wireless:
             clientes = []
             for _client in _wireless_data.ap:
                 ssid_name = _client.essid
                 for _client_data in _client.client:
-                    mac_value, manufacturer_value = convert_mac_hex_to_readable(_client_data.mac, True)
-                    clientes.append({
-                        "mac"       : mac_value,
-                        "type"      : manufacturer_value,
-                        "rate"      : _client_data.rate,
-                        "rssi"      : _client_data.rssi,
-                        "signal"    : _client_data.signal,
-                        "ssid"      : ssid_name
-                    })
-            wireless_dict = {
-                **{field: getattr(_wireless_data, field) for field in fields_wireless},
-                **{field: getattr(_wireless_data.stats, field) for field in fields_wireless_stats}
-            }   # Almacenamos en un diccionario (TODO: deberia ser un array para minimizar espacio)
+                    mac, rate, rssi, signal = _GET_CLIENT(_client_data)
+                    mac_value, manufacturer_value = _mac_with_manufacturer(mac)
+                    clientes.append([mac_value, manufacturer_value, rate, rssi, signal, ssid_name])
+
+            noise, channel      = _GET_NOISE_CHANNEL(_wireless_data)
+            rx_bytes, tx_bytes  = _GET_RX_TX(_wireless_data.stats)
+            wireless_dict = {"noise": noise, "channel": channel, "rxBytes": rx_bytes, "txBytes": tx_bytes}
             if clientes:
-                wireless_dict["clients"] = clientes
+                if clientes_compactos:
+                    wireless_dict["clients"] = {"campos": list(CLIENT_FIELDS), "valores": clientes}
+                else:
+                    wireless_dict["clients"] = [dict(zip(CLIENT_FIELDS, cliente)) for cliente in clientes]
 
-            final_wireless_dictionary[name_wireless] = wireless_dict
+            final_wireless_dictionary[_wireless_data.name] = wireless_dict
+            # Se conserva el criterio anterior: costo de los peers de la última interfaz
             wireless_costs = [ int(peer.cost) for peer in _wireless_data.peer if peer.HasField("cost") ]
 
         if wireless_costs:
             final_wireless_dictionary["cost"] = min(wireless_costs)
 
-        #  - - - - - - - - - > Obtenemos los valores de rptArp 
-        if hasattr(data_proto_rajant.system, 'rptPeer'):
-            rpt_data = data_proto_rajant.system.rptPeer
-            rpt_dict = {}
-            for field in fields_rptArp:
-                if hasattr(rpt_data, field):
-                    rpt_dict[field] = (
-                        convert_mac_hex_to_readable(getattr(rpt_data, field))
-                        if field == "mac"
-                        else getattr(rpt_data, field)
-                    )
-            final_wireless_dictionary["rpt"] = rpt_dict
+        #  - - - - - - - - - > Obtenemos los valores de rptArp
+        rpt_values = _GET_RPT(data_system.rptPeer)
+        rpt_dict = dict(zip(_RPT_FIELDS, rpt_values))
+        rpt_dict["mac"] = _mac_readable(rpt_values[0])
+        final_wireless_dictionary["rpt"] = rpt_dict
         rajant_dictionary["wireless"] = final_wireless_dictionary
 
     except Exception as e:
@@ -0,0 +1,198 @@
+# =============================================================================
+#                   Smartlink - Planificador de pruebas IPERF3
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+#  Tablas        : iperf3
+# =============================================================================
+#  Reparte las pruebas de los clientes Rajant entre varios servidores IPERF3
+#  en paralelo con dos límites de concurrencia:
+#    - por servidor : pruebas simultáneas contra un mismo servidor
+#    - por segmento : pruebas simultáneas dentro de un mismo segmento de la
+#      malla (por defecto la subred /24), para que no compitan por el mismo
+#      medio y se falseen entre sí. Una prueba ocupa el segmento del cliente
+#      y el del servidor (una sola vez si coinciden).
+#  Cada vez que termina una prueba se lanza la siguiente que cumpla ambos
+#  límites. on_result() decide si el cliente vuelve a la cola (reintento).
+#  Iperf3Progress guarda los resultados en un JSON tras cada prueba para
+#  poder reanudar una pasada interrumpida.
+# =============================================================================
+from concurrent.futures     import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections            import defaultdict
+import ipaddress
+import json
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collector.pipeline     import SweepStats
+
+
+## Segmento de la malla de un cliente: su subred /prefijo
+def subnet_segment(prefijo : int = 24):
+    def _segment(ip : str) -> str:
+        try:
+            return str(ipaddress.ip_network(f"{ip}/{prefijo}", strict = False))
+        except ValueError:
+            return ip
+    return _segment
+
+
+class Iperf3Scheduler(object):
+    """
+    Uso:
+        scheduler = Iperf3Scheduler(["10.0.0.1", "10.0.1.1"], por_servidor = 1, por_segmento = 1)
+        stats = scheduler.run(clientes, test_fn, on_result)
+    test_fn(cliente, servidor) -> resultado   (se ejecuta en un hilo del pool)
+    on_result(cliente, servidor, resultado, intento) -> True para reintentar
+    (se llama desde el hilo que ejecuta run()).
+    """
+
+    def __init__(self, servers : list, por_servidor : int = 1, por_segmento : int = 1,
+                 segment_fn = None, name : str = "iperf3"):
+        if not servers:
+            raise ValueError("Se requiere al menos un servidor IPERF3")
+        self.servers        = list(dict.fromkeys(servers))
+        self.por_servidor   = max(1, por_servidor)
+        self.por_segmento   = max(1, por_segmento)
+        self.segment_fn     = segment_fn or subnet_segment()
+        self.server_segment = {server: self.segment_fn(server) for server in self.servers}
+        self.name           = name
+
+
+    def _pick_server(self, client : str, segment : str, server_load : dict, segment_load : dict, last_server : str):
+        # Servidor libre con menos carga y con lugar en su segmento; en un reintento se
+        # prefiere otro distinto al anterior
+        candidates = [
+            server for server in self.servers
+            if server != client and server_load[server] < self.por_servidor
+            and (self.server_segment[server] == segment or segment_load[self.server_segment[server]] < self.por_segmento)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key = lambda server: (server == last_server, server_load[server]))
+
+
+    ## 'attempts': pruebas ya realizadas por cliente (al reanudar una pasada)
+    def run(self, clients : list, test_fn, on_result, attempts : dict = None) -> SweepStats:
+        workers     = len(self.servers) * self.por_servidor
+        stats       = SweepStats(self.name, workers)
+        pending     = list(dict.fromkeys(clients))
+        server_load = defaultdict(int)
+        segment_load = defaultdict(int)
+        attempts    = defaultdict(int, attempts or {})
+        last_server = {}
+        in_flight   = {}
+
+        def _timed(client : str, server : str):
+            started = time.monotonic()
+            try:
+                return test_fn(client, server)
+            finally:
+                stats.record(client, time.monotonic() - started)
+
+        with ThreadPoolExecutor(workers, thread_name_prefix = self.name) as executor:
+            while pending or in_flight:
+                # Lanzamos todo lo que entre en los límites, en orden de llegada a la cola
+                index = 0
+                while index < len(pending) and len(in_flight) < workers:
+                    client  = pending[index]
+                    segment = self.segment_fn(client)
+                    server  = None
+                    if segment_load[segment] < self.por_segmento:
+                        server = self._pick_server(client, segment, server_load, segment_load, last_server.get(client))
+                    if server is None:
+                        index += 1
+                        continue
+                    pending.pop(index)
+                    segments = {segment, self.server_segment[server]}
+                    server_load[server]     += 1
+                    for reserved in segments:
+                        segment_load[reserved] += 1
+                    attempts[client]        += 1
+                    last_server[client]     = server
+                    in_flight[executor.submit(_timed, client, server)] = (client, server, segments)
+
+                if not in_flight:
+                    # Solo quedan clientes sin servidor posible
+                    break
+
+                done, _ = wait(in_flight, return_when = FIRST_COMPLETED)
+                for future in done:
+                    client, server, segments = in_flight.pop(future)
+                    server_load[server]     -= 1
+                    for reserved in segments:
+                        segment_load[reserved] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        stats.errors[client] = str(e)
+                        result = None
+                    if on_result(client, server, result, attempts[client]):
+                        pending.append(client)
+
+        stats.finish()
+        return stats
+
+
+## Resultados de la pasada en curso, guardados tras cada prueba para reanudarla
+class Iperf3Progress(object):
+
+    def __init__(self, path : str):
+        self.path       = path
+        self.pase       = None
+        self.resultados = {}        # cliente -> fila del resultado
+        self.intentos   = {}        # cliente -> pruebas realizadas
+        self.pendientes = []        # clientes que aún deben probarse
+
+
+    def start(self, pase : str, clientes : list):
+        self.pase       = pase
+        self.resultados = {}
+        self.intentos   = {}
+        self.pendientes = list(clientes)
+        self.save()
+
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as file:
+                state = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"✘ No se pudo leer el progreso {self.path}: {e}")
+            return False
+        self.pase       = state.get("pase")
+        self.resultados = state.get("resultados", {})
+        self.intentos   = state.get("intentos", {})
+        self.pendientes = state.get("pendientes", [])
+        return bool(self.pase)
+
+
+    def record(self, cliente : str, resultado : list, intentos : int, terminado : bool):
+        if resultado is not None:
+            self.resultados[cliente] = resultado
+        self.intentos[cliente] = intentos
+        if terminado and cliente in self.pendientes:
+            self.pendientes.remove(cliente)
+        self.save()
+
+
+    def save(self):
+        temporal = self.path + ".tmp"
+        with open(temporal, "w") as file:
+            json.dump({
+                "pase"          : self.pase,
+                "resultados"    : self.resultados,
+                "intentos"      : self.intentos,
+                "pendientes"    : self.pendientes,
+            }, file)
+        os.replace(temporal, self.path)
+
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
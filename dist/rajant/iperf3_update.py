@@ -2,6 +2,8 @@ from smartlink.global_utils import FOLDER_OUTPUT
 from smartlink.models.rajant_performance_models import rajant_performance
 from smartlink.http_utils   import DB_API_URL, get_request_to_url_with_filters, post_request_to_url_model_array
 from bcapi_utils            import iperf3_broker
+from iperf3_scheduler       import Iperf3Scheduler, Iperf3Progress, subnet_segment
+from datetime               import datetime
 
 import pandas as pd
 import argparse
@@ -12,19 +14,24 @@ script_path     = os.path.abspath(__file__)
 script_folder   = os.path.dirname(script_path)
 script_name     = os.path.basename(script_path)
 output_file     = os.path.join(FOLDER_OUTPUT, "iperf3_result.csv")
+progress_file   = os.path.join(FOLDER_OUTPUT, "iperf3_progress.json")
 
 # Definición de argumentos
 _DEBUG_MODE = False
 parser = argparse.ArgumentParser(description="Script IPERF3 test performance with MariaDB")
 parser.add_argument('-d', '--debug', action='store_true', help='Enable debug mode')
-parser.add_argument('-i', '--ip-server', type=str, required=True, help='Dirección IP del servidor')
+parser.add_argument('-i', '--ip-server', type=str, nargs='+', required=True, help='Dirección IP de uno o más servidores IPERF3')
 parser.add_argument('-t', '--time-scan', type=int, default=15, help='Scan interval time [s] in seconds —— 15 segundos por defecto')
 parser.add_argument('-b', '--bias', type=float, default=1.0, help='El valor minimo [Mbps] para ser considerado exitoso —— 1.0 Mbps por defecto')
+parser.add_argument('-s', '--por-servidor', type=int, default=1, help='Pruebas simultáneas por servidor —— 1 por defecto')
+parser.add_argument('-g', '--por-segmento', type=int, default=1, help='Pruebas simultáneas por segmento de la malla —— 1 por defecto')
+parser.add_argument('-p', '--prefijo', type=int, default=24, help='Prefijo de la subred que define un segmento de la malla —— /24 por defecto')
+parser.add_argument('-r', '--reanudar', action='store_true', help='Continúa la pasada interrumpida guardada en iperf3_progress.json')
 
 # Lectura de argumentos
 args = parser.parse_args()
 _DEBUG_MODE     = args.debug
-_IP_SERVER      = args.ip_server
+_IP_SERVERS     = args.ip_server
 BASE_TIME_SCAN  = args.time_scan
 BIAS_MIN_BANDWIDTH  = args.bias
 
@@ -33,6 +40,8 @@ INVENTORY_URL   = DB_API_URL + "inventario/get"
 KEYNAME_SERVER  = "server_bcapi"
 ROLE_RAJANT     = "co"
 URL_POST_DATA   = DB_API_URL + "iperf3/add_list"
+MAX_INTENTOS_VACIO  = 3     # pruebas por cliente sin resultado (1era evaluación + 2 reintentos)
+MAX_INTENTOS_BAJO   = 2     # pruebas por cliente bajo BIAS_MIN_BANDWIDTH (1era evaluación + 1 reintento)
 CSV_COL_NAMES   = ["cliente", "servidor", "latencia", "send_Mbps", "send_coreU", "rec_Mbps", "rec_coreU", "fecha"]
 FIELD_INDEX = {
     "ip": 0,         # cliente
@@ -80,12 +89,7 @@ def convert_array_to_model(input_data_array: list) -> rajant_performance:
 
 """ - - - - - - - - - - -  PROGRAMA PRINCIPAL  - - - - - - - - - - - """
 if __name__ == "__main__":
-    # Leemos el archivo para obtener la lista de ip para clientes y servidores
-    total_data      = []
-    not_connected   = []
-    observed_ip     = []
-    
-    clients_list    = []
+    progress = Iperf3Progress(progress_file)
     try:
         ## -----------------------------------------------------------------------------------
         # Obtenemos de los equipos marcados para IPERF3 usando la API Smartlink
@@ -93,19 +97,23 @@ if __name__ == "__main__":
         if not inventario:
             raise Exception(f"Inventario vacio con URL = {INVENTORY_URL}")
         
-        clients_list = [[row["ip"], _IP_SERVER] for row in inventario if row["ip"] != _IP_SERVER]
+        clients_list = [row["ip"] for row in inventario if row["ip"] not in _IP_SERVERS]
+
+        if args.reanudar and progress.load():
+            print(f"\n Reanudando la pasada del {progress.pase}: {len(progress.pendientes)} equipos pendientes")
+        else:
+            progress.start(datetime.now().replace(microsecond=0).isoformat(sep=' '), clients_list)
 
         if _DEBUG_MODE:
-            print(clients_list)
+            print(progress.pendientes)
         
         ## -----------------------------------------------------------------------------------
-        ## Con el inventario de equipos Rajant para realizar Performance, realizamos el IPERF3
-        print(f"\n 1st Eval: Evaluando el 'valor' del bandwidth en equipos Rajant")
+        ## Pruebas en paralelo sobre los servidores, respetando los límites por servidor y por segmento.
+        ## Sin resultado se reintenta hasta MAX_INTENTOS_VACIO; bajo BIAS_MIN_BANDWIDTH, hasta MAX_INTENTOS_BAJO
+        print(f"\n Evaluando el 'valor' del bandwidth de {len(progress.pendientes)} equipos Rajant con {len(_IP_SERVERS)} servidores")
 
-        for _client, _server in clients_list:
-            print(f"\n... Evaluando cliente: {_client}")
-            
-            resultado_temp  = get_result_iperf3(
+        def test_iperf3(_client, _server) -> list:
+            return get_result_iperf3(
                 _client         = _client,
                 _server         = _server,
                 _role_rajant    = ROLE_RAJANT,
@@ -113,90 +121,46 @@ if __name__ == "__main__":
                 scantime        = BASE_TIME_SCAN,
                 _debug          = _DEBUG_MODE
             )
-            
-            _evaluacion = resultado_temp[3]
-            total_data.append(resultado_temp)
 
-            if _evaluacion == "-":
-                if _DEBUG_MODE:
-                    print(f"• 1era Ev : {_client} --> Empty")
-                not_connected.append([_client, _server])
-                continue
+        def on_result(_client, _server, resultado_temp, intento) -> bool:
+            vacio = resultado_temp is None or resultado_temp[FIELD_INDEX["tx_bw"]] == "-"
+            if resultado_temp is None:
+                resultado_temp = [_client, _server, "-", "-", "-", "-", "-", datetime.now().replace(microsecond=0).isoformat(sep=' ')]
 
-            if _evaluacion < BIAS_MIN_BANDWIDTH:
-                if _DEBUG_MODE:
-                    print(f"• 1era Ev : {_client} --> Not acceptable")
-                observed_ip.append([_client, _server])
+            # Un resultado vacío no reemplaza a uno obtenido antes
+            guardar = not vacio or _client not in progress.resultados
+            if vacio:
+                reintentar = intento < MAX_INTENTOS_VACIO
+            else:
+                reintentar = resultado_temp[FIELD_INDEX["tx_bw"]] < BIAS_MIN_BANDWIDTH and intento < MAX_INTENTOS_BAJO
 
-        if _DEBUG_MODE:
-            print(f" \tObservados : {len(observed_ip)}\n \tVacios : {len(not_connected)}\n")
-
-        # Creamos un archivo 'dataframe' para almacenar los valores obtenidos
-        df_iperf3_result    = pd.DataFrame(total_data, columns = CSV_COL_NAMES)
-
-        # Para los equipos con un valor obtenido menor al aceptable, se les realiza una nueva evaluacion
-        if observed_ip:
-            print(f"\n Re-eval: Reevaluando {len(observed_ip)} equipos con bajos o nulos resultados")
-            
-        for _client, _server in observed_ip:
             if _DEBUG_MODE:
-                print(f"... Reevaluando Cliente: {_client} / Server: {_server}")
+                estado = "Empty" if vacio else f"{resultado_temp[FIELD_INDEX['tx_bw']]} Mbps"
+                print(f"• Ev {intento} : {_client} / {_server} --> {estado}{' (reintento)' if reintentar else ''}")
 
-            resultado_temp  = get_result_iperf3(
-                _client         = _client,
-                _server         = _server,
-                _role_rajant    = ROLE_RAJANT,
-                _timeout        = 5,
-                scantime        = BASE_TIME_SCAN,
-                _debug          = _DEBUG_MODE
-            )
-            _evaluacion = resultado_temp[2]
-            
-            if _evaluacion == "-":
-                if _DEBUG_MODE:
-                    print(f"Re-eval: {_client} / {_server} Empty")
-                continue
-            
-            # Obtenemos los valores donde hayan coindicencia del valor ip de _client y _server
-            mask = (df_iperf3_result['cliente'] == _client) & (df_iperf3_result['servidor'] == _server)
-            df_iperf3_result.loc[mask] = resultado_temp
-
-        # Finalmente guardamos los datos obtenidos antes de la segunda ronda
-        df_iperf3_result.to_csv(output_file, index = False)
+            progress.record(_client, resultado_temp if guardar else None, intento, terminado = not reintentar)
+            return reintentar
+
+        scheduler = Iperf3Scheduler(
+            _IP_SERVERS,
+            por_servidor    = args.por_servidor,
+            por_segmento    = args.por_segmento,
+            segment_fn      = subnet_segment(args.prefijo)
+        )
+        stats = scheduler.run(progress.pendientes, test_iperf3, on_result, attempts = progress.intentos)
+        print(f"• {stats}")
 
-        ## - - - - - - - - EVALUACION DE RESULTADOS VACIOS - - - - - - 
-        for a in range(2, 4): # [2, 3]
-            if not_connected:
-                print(f"\n ○ ○ {a}° Eval: Reevaluando el 'valor' del bandwidth de {len(not_connected)} equipos Rajant")
-            
-            still_not_connected = []
-            
-            for _client, _server in not_connected:
-                resultado_temp  = get_result_iperf3(
-                    _client, 
-                    _server,
-                    _role_rajant    = ROLE_RAJANT,
-                    _timeout        = 5, 
-                    scantime        = BASE_TIME_SCAN,
-                    _debug          = _DEBUG_MODE
-                )
-
-                _evaluacion = resultado_temp[2]
-                if _evaluacion == "-":
-                    still_not_connected.append([_client, _server])
-                    continue
-
-                mask = (df_iperf3_result['cliente'] == _client) & (df_iperf3_result['servidor'] == _server)
-                df_iperf3_result.loc[mask] = resultado_temp
-
-            not_connected = still_not_connected.copy()
+        # Creamos un archivo 'dataframe' con los resultados finales, en el orden del inventario
+        orden = {ip: index for index, ip in enumerate(clients_list)}
+        total_data = [progress.resultados[ip] for ip in sorted(progress.resultados, key = lambda ip: orden.get(ip, len(orden)))]
+        df_iperf3_result    = pd.DataFrame(total_data, columns = CSV_COL_NAMES)
 
         if _DEBUG_MODE:
             print("\n Valores finales obtenidos")
             for _, row in df_iperf3_result.iterrows():
                 print(f" \t- - - - - - -\n{row}")
         
-        ## Sobreescribimos el archivo con los datos finales
+        ## Guardamos el archivo con los datos finales
         df_iperf3_result.to_csv(output_file, index = False)
 
         ## Preparamos los datos obtenidos en una lista de Model para añadirlos en la base de datos
@@ -213,6 +177,8 @@ if __name__ == "__main__":
             _debug = _DEBUG_MODE
         )
 
+        ## Pasada completa: la próxima ejecución empieza de cero
+        progress.clear()
         print(f"FINALIZADO")
 
     except Exception as e:
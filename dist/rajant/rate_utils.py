@@ -0,0 +1,133 @@
+# =============================================================================
+#                   Smartlink - Tasas a partir de contadores Rajant
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+#  Tablas        : rajant_data
+# =============================================================================
+#  Los contadores de Rajant son acumulados (rxBytes / txBytes por interfaz,
+#  packets* de instamesh). CounterRateTracker guarda en memoria el último valor
+#  por (ip, sección, interfaz) y agrega junto a cada contador crudo:
+#    - wired / wireless : rxBps, txBps                  (bits por segundo)
+#    - instamesh        : sentPps, receivedPps, droppedPps, multicastPps y
+#                         dropRatio = Δdropped / (Δdropped + Δsent)
+#  Reglas:
+#    - Primera muestra de una IP, o config.uptime menor al anterior (reinicio):
+#      se toma como nueva base y las tasas quedan en None.
+#    - Contador menor al anterior sin reinicio: vuelta de un contador de 32 o
+#      64 bits si el valor anterior estaba en la mitad alta del rango y la tasa
+#      resultante es plausible; si no, se considera un reset de la interfaz.
+# =============================================================================
+from datetime   import datetime
+import threading
+import json
+import os
+
+FORMATO_FECHA       = "%Y-%m-%d %H:%M:%S"
+MAX_BPS             = 10e9          # tasa máxima creíble por interfaz (10 Gbps)
+MAX_PPS             = 15e6          # ídem en paquetes por segundo
+
+_BYTE_COUNTERS      = (("rxBytes", "rxBps"), ("txBytes", "txBps"))
+_PACKET_COUNTERS    = (("packetsSent", "sentPps"), ("packetsReceived", "receivedPps"),
+                       ("packetsDropped", "droppedPps"), ("packetsMulticast", "multicastPps"))
+_NOT_INTERFACES     = ("cost", "rpt")
+
+
+## Incremento de un contador entre dos muestras, o None si fue un reset
+def counter_delta(anterior : int, actual : int, segundos : float, max_rate : float):
+    if actual >= anterior:
+        return actual - anterior
+    for width in (32, 64):
+        limit = 1 << width
+        if limit // 2 <= anterior < limit:
+            delta = actual + limit - anterior
+            return delta if delta / segundos <= max_rate else None
+    return None
+
+
+class CounterRateTracker(object):
+    """
+    Último valor de cada contador por IP. Uso (en el hilo que arma los modelos):
+        tracker.update(ip, rajant_dict, fecha)
+    agrega las tasas dentro de 'rajant_dict' y devuelve el mismo diccionario.
+    """
+
+    def __init__(self):
+        self._last  = {}        # ip -> {"fecha", "uptime", "contadores": {"seccion/interfaz/campo": valor}}
+        self._lock  = threading.Lock()
+
+
+    def update(self, ip : str, rajant_dict : dict, fecha : str) -> dict:
+        uptime      = (rajant_dict.get("config") or {}).get("uptime")
+        contadores  = {}
+        with self._lock:
+            anterior = self._last.get(ip)
+            segundos = None
+            if anterior is not None:
+                reinicio = uptime is not None and anterior["uptime"] is not None and uptime < anterior["uptime"]
+                segundos = (datetime.strptime(fecha, FORMATO_FECHA)
+                            - datetime.strptime(anterior["fecha"], FORMATO_FECHA)).total_seconds()
+                if reinicio or segundos <= 0:
+                    segundos = None
+            previos = anterior["contadores"] if segundos else {}
+
+            ## Incremento del contador respecto de la pasada anterior (None sin base o tras un reset)
+            def _delta(key : str, value, max_rate : float):
+                if not isinstance(value, int):
+                    return None
+                contadores[key] = value
+                if key not in previos:
+                    return None
+                return counter_delta(previos[key], value, segundos, max_rate)
+
+            for seccion in ("wired", "wireless"):
+                for interfaz, stats in (rajant_dict.get(seccion) or {}).items():
+                    if interfaz in _NOT_INTERFACES or not isinstance(stats, dict):
+                        continue
+                    for campo, campo_tasa in _BYTE_COUNTERS:
+                        if campo in stats:
+                            delta = _delta(f"{seccion}/{interfaz}/{campo}", stats[campo], MAX_BPS / 8)
+                            stats[campo_tasa] = round(delta * 8 / segundos, 2) if delta is not None else None
+
+            instamesh = rajant_dict.get("instamesh")
+            if instamesh:
+                deltas = {}
+                for campo, campo_tasa in _PACKET_COUNTERS:
+                    if campo in instamesh:
+                        deltas[campo] = _delta(f"instamesh/{campo}", instamesh[campo], MAX_PPS)
+                        instamesh[campo_tasa] = round(deltas[campo] / segundos, 2) if deltas[campo] is not None else None
+                dropped, sent = deltas.get("packetsDropped"), deltas.get("packetsSent")
+                instamesh["dropRatio"] = (round(dropped / (dropped + sent), 6)
+                                          if dropped is not None and sent is not None and dropped + sent else None)
+
+            self._last[ip] = {"fecha": fecha, "uptime": uptime, "contadores": contadores}
+        return rajant_dict
+
+
+    def reset(self, ips : list = None):
+        with self._lock:
+            for ip in (list(self._last) if ips is None else ips):
+                self._last.pop(ip, None)
+
+
+    ## Persistencia entre ejecuciones por cron (el colector residente la mantiene en memoria)
+    def save(self, path : str):
+        with self._lock:
+            temporal = path + ".tmp"
+            with open(temporal, "w") as file:
+                json.dump(self._last, file)
+            os.replace(temporal, path)
+
+
+    def load(self, path : str):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path) as file:
+                state = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"✘ No se pudo leer el estado de contadores {path}, las tasas se calcularán desde la próxima pasada: {e}")
+            return
+        with self._lock:
+            self._last = state
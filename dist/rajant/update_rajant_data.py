@@ -4,7 +4,7 @@
 #  Versión       : V2025.4
 #  Autor         : HCG-GROUP, Área de Backend
 #  Contacto      : Anexo 3128
-#  Tablas        : rajant_data, sensores, ubicacion_gps
+#  Tablas        : rajant_data, sensores, ubicacion_gps, rajant_snapshot
 # =============================================================================
 from smartlink.models.rajant_data_models    import RajantData       as Model
 from smartlink.models.ubicacion_gps_models  import UbicacionGPS
@@ -13,17 +13,21 @@ from smartlink.models.sensores_models       import Sensor
 from concurrent.futures         import ThreadPoolExecutor
 from datetime                   import datetime
 from smartlink.error_utils      import multiple_storage_errors
-from smartlink.global_utils     import FOLDER_OUTPUT, group_ips
+from smartlink.global_utils     import FOLDER_OUTPUT
 from smartlink.http_utils       import DB_API_URL, get_request_to_url_with_filters, post_request_to_url_model_array
 from smartlink.csv_utils        import restart_log_file, write_log_files
-from bcapi_utils                import getRajantData, _PASSWORDS, _ROLES
+from bcapi_utils                import getRajantData, _PASSWORDS, _ROLES, SESSION_POOL
 from format_utils               import extract_rajant_model_data
+from delta_utils                import SnapshotDeltaEncoder, RajantSnapshot, TIPO_COMPLETO
+from rate_utils                 import CounterRateTracker
 import traceback
-import time
 import argparse
-import queue
+import sys
 import os
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collector.pipeline         import PipelinedScheduler
+
 script_path     = os.path.abspath(__file__)
 script_folder   = os.path.dirname(script_path)
 script_name     = os.path.basename(script_path)
@@ -31,6 +35,8 @@ script_name     = os.path.basename(script_path)
 # Direccion de archivos de salida en /usr/smartlink/outputs
 log_file        = os.path.join(FOLDER_OUTPUT, "rajant_data.csv")
 log_sensores    = os.path.join(FOLDER_OUTPUT, "sensores.csv")
+file_delta      = os.path.join(FOLDER_OUTPUT, "rajant_delta_state.json")
+file_tasas      = os.path.join(FOLDER_OUTPUT, "rajant_rate_state.json")
 
 # Constantes
 MARCA           = "rajant"
@@ -38,66 +44,99 @@ DEFAULT_ROL     = "view"
 URL_GPS_LIST    = DB_API_URL + "ubicacion_gps/add_list"
 URL_SENSOR_LIST = DB_API_URL + "sensores/add_list"
 URL_RAJANT_LIST = DB_API_URL + "rajant_data/add_list"
+URL_INVENTARIO  = DB_API_URL + "inventario/get"
+URL_SNAPSHOT_LIST = DB_API_URL + "rajant_snapshot/add_list"
+MAX_THREADS     = 25
+
+## Modo delta: en vez de rajant_data y sensores se envía a rajant_snapshot un snapshot completo
+## cada KEYFRAME_CADA pasadas (o tras un reinicio) y, entre medio, solo los campos que cambiaron
+MODO_DELTA      = False
+KEYFRAME_CADA   = 12
+SNAPSHOT_KEYS   = ("config", "instamesh", "wired", "wireless", "sensores")
+DELTA_ENCODER   = SnapshotDeltaEncoder(KEYFRAME_CADA)
+
+## Último valor de los contadores por IP para calcular bps / pps / dropRatio
+RATE_TRACKER    = CounterRateTracker()
 
-## Activacion del modo DEBUG
+## Clientes wireless como {"campos": [...], "valores": [[...], ...]} en vez de un diccionario por
+## cliente. Desactivado por defecto: el frontend lee 'clients' como lista de diccionarios
+CLIENTES_COMPACTOS = False
+
+## Activacion del modo DEBUG (se sobrescribe desde main() o desde el colector)
 _DEBUG_MODE = False
-parser = argparse.ArgumentParser(description="Script para obtener datos de equipos Rajant")
-parser.add_argument('-d', '--debug', action='store_true', help='Enable debug mode')
-args = parser.parse_args()
-_DEBUG_MODE = args.debug
+
+## Feed de resultados en vivo (collector.feed.ResultFeed); lo asigna el colector residente
+FEED = None
 
 
-def async_task(ip, queue : queue.Queue):
+## Retorna [rajant_dict, array_cost_master, ip, fecha, error] o None si el equipo no respondió
+def async_task(ip):
     current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
         data_rajant = getRajantData(ipv4    = ip, 
                                     user    = _ROLES[DEFAULT_ROL], 
                                     passw   = _PASSWORDS[DEFAULT_ROL],
                                     timeout = 5, 
-                                    debug_mode = _DEBUG_MODE)
+                                    debug_mode = _DEBUG_MODE,
+                                    pool    = SESSION_POOL)
         if data_rajant is None:
-            return
+            return None
         
-        if _DEBUG_MODE and queue.empty():
+        if _DEBUG_MODE:
             print(f" -> {ip}:\n{data_rajant}\n\n")
 
-        rajant_dict, array_cost_master = extract_rajant_model_data(data_rajant)
+        rajant_dict, array_cost_master = extract_rajant_model_data(data_rajant, clientes_compactos = CLIENTES_COMPACTOS)
         if rajant_dict:
-            queue.put([rajant_dict, array_cost_master, ip, current_date, ""])
+            return [rajant_dict, array_cost_master, ip, current_date, ""]
     except Exception as e:
-        queue.put( [{}, [], ip, current_date, str(e)] )
+        return [{}, [], ip, current_date, str(e)]
+    return None
 
 
-##  ---------------------------    PROGRAMA PRINCIAPAL     ---------------------------
-try:
-    ## Obtenemos datos de la lista de equipos RAJANT de la API
-    url_inventario      = DB_API_URL + f"inventario/get"
+## Modo delta: un registro por IP en rajant_snapshot, completo o solo con los cambios.
+## Si el envío falla esas IPs vuelven a mandar un snapshot completo en la próxima pasada
+def send_snapshots(dictionary_ip_data : dict):
+    snapshot_list = []
+    for ip_device, ip_dictionary in dictionary_ip_data.items():
+        snapshot    = {key: ip_dictionary[key] for key in SNAPSHOT_KEYS if key in ip_dictionary}
+        tipo, datos = DELTA_ENCODER.encode(ip_device, snapshot)
+        snapshot_list.append(RajantSnapshot(ip = ip_device, fecha = ip_dictionary["fecha"], tipo = tipo, datos = datos))
+
+    try:
+        post_request_to_url_model_array(URL_SNAPSHOT_LIST, 
+                                        array_model_to_post = snapshot_list,
+                                        _debug = _DEBUG_MODE)
+    except Exception as e:
+        print(f"{script_name} | Error al enviar los snapshots, se reenviarán completos: {e}")
+        DELTA_ENCODER.reset(list(dictionary_ip_data))
+
+    completos = sum(1 for snapshot in snapshot_list if snapshot.tipo == TIPO_COMPLETO)
+    print(f" • Snapshots enviados: {completos} completos, {len(snapshot_list) - completos} delta")
+
+
+## Equipos Rajant del inventario
+def get_subscribers() -> list:
     filter_inventario   = ["marca", MARCA]
-    subscribers         = [ item["ip"] for item in get_request_to_url_with_filters(url_inventario, filter_array = filter_inventario) ]
-    print(f"Se han detectado un total de {len(subscribers)} equipos en Inventario")
-
-    q = queue.Queue()
-    max_threads_number = 25
-
-    list_groups_ip_to_request = group_ips(subscribers, max_group_size = max_threads_number)
-    total_groups    = len(list_groups_ip_to_request)
-    counter         = 1
-    with ThreadPoolExecutor(max_threads_number) as executor:
-        for counter, _group in enumerate(list_groups_ip_to_request, 1):
-            print(f"♦ Procesando grupo {counter} de {total_groups}...")
-            futures = [executor.submit(async_task, _ip, q) for _ip in _group]
-            for future in futures:
-                future.result()
-            time.sleep(2)
+    return [ item["ip"] for item in get_request_to_url_with_filters(URL_INVENTARIO, filter_array = filter_inventario) ]
 
-    # Procesamos los datos obtenidos de Rajant async_task
-    print(f" • Guardando los datos en la base de datos")
+
+## Una pasada completa sobre 'subscribers'. Los costos hacia el maestro se cruzan
+## entre equipos, por lo que se envía todo al final de la pasada.
+## Si se entrega 'executor' se reutiliza (colector residente); si no, se crea uno para la pasada
+def update_rajant(subscribers : list, executor : ThreadPoolExecutor = None) -> list:
+    if executor is None:
+        with ThreadPoolExecutor(MAX_THREADS) as own_executor:
+            return update_rajant(subscribers, own_executor)
 
     dictionary_ip_data = {}
     dictionary_cost_master = {}
     global_error_array = []
-    while not q.empty():    
-        _rajant_data, _wired_array_cost, ip_device, current_date, error_message  = q.get()
+
+    # Los resultados se procesan a medida que termina cada equipo (sin esperar por grupos)
+    def on_result(_ip : str, result : list):
+        if not result:
+            return
+        _rajant_data, _wired_array_cost, ip_device, current_date, error_message = result
         if error_message:
             global_error_array.append([ip_device, current_date, error_message])
         if _wired_array_cost:
@@ -109,6 +148,12 @@ try:
                 'fecha' : current_date
             }
 
+    stats = PipelinedScheduler(executor, name = MARCA).run(subscribers, async_task, on_result)
+    print(f"• {stats}")
+
+    # Procesamos los datos obtenidos de Rajant async_task
+    print(f" • Guardando los datos en la base de datos")
+
     if _DEBUG_MODE:
         print(f"-> Diccionario obtenido de costos hacia maestro:\n{dictionary_cost_master}")
         
@@ -117,6 +162,10 @@ try:
         if ip_device in dictionary_ip_data and "wired" in dictionary_ip_data[ip_device]:
             dictionary_ip_data[ip_device]["wired"]["cost"] = cost_device
 
+    # Tasas junto a los contadores crudos (wired / wireless / instamesh)
+    for ip_device, ip_dictionary in dictionary_ip_data.items():
+        RATE_TRACKER.update(ip_device, ip_dictionary, ip_dictionary["fecha"])
+
     # Send data to MariaDB
     model_array_list, sensores_array_list, gps_array_list = [], [], []
     for ip_device, ip_dictionary in dictionary_ip_data.items():
@@ -152,9 +201,12 @@ try:
             ))
 
     if model_array_list:
-        post_request_to_url_model_array(URL_RAJANT_LIST, 
-                                        array_model_to_post = model_array_list,
-                                        _debug = _DEBUG_MODE)
+        if MODO_DELTA:
+            send_snapshots(dictionary_ip_data)
+        else:
+            post_request_to_url_model_array(URL_RAJANT_LIST, 
+                                            array_model_to_post = model_array_list,
+                                            _debug = _DEBUG_MODE)
         restart_log_file(log_file, Model)
         write_log_files(log_file, model_array_list)
 
@@ -164,11 +216,15 @@ try:
                                         _debug = _DEBUG_MODE)
 
     if sensores_array_list:
-        post_request_to_url_model_array(URL_SENSOR_LIST, 
-                                        array_model_to_post = sensores_array_list,
-                                        _debug = _DEBUG_MODE)
+        # En modo delta los sensores viajan dentro del snapshot
+        if not MODO_DELTA:
+            post_request_to_url_model_array(URL_SENSOR_LIST, 
+                                            array_model_to_post = sensores_array_list,
+                                            _debug = _DEBUG_MODE)
         restart_log_file(log_sensores, Sensor)
         write_log_files(log_sensores, sensores_array_list)
+        if FEED is not None:
+            FEED.publish("sensores", [model.model_dump() for model in sensores_array_list])
 
     try:
         if global_error_array:
@@ -182,20 +238,44 @@ try:
         if str(e):
             print(f"Error al guardar los fallos en {MARCA} : {e}")
 
-except Exception as e:
-    if str(e):
-        print(f" !! {script_folder} main function error: {e}")
-        if _DEBUG_MODE:
-            print(" > Error Details:")
-            print(traceback.format_exc())
-
-
-
-
-
+    return global_error_array
 
 
+##  ---------------------------    PROGRAMA PRINCIAPAL     ---------------------------
+def main():
+    global _DEBUG_MODE, CLIENTES_COMPACTOS, MODO_DELTA, DELTA_ENCODER
+    parser = argparse.ArgumentParser(description="Script para obtener datos de equipos Rajant")
+    parser.add_argument('-d', '--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('-c', '--clientes_compactos', action='store_true', help='Guarda los clientes wireless como arreglos (campos + valores)')
+    parser.add_argument('-D', '--delta', action='store_true', help='Envía a rajant_snapshot solo los cambios respecto de la pasada anterior')
+    parser.add_argument('-k', '--keyframe', type=int, default=KEYFRAME_CADA, help='Pasadas entre snapshots completos en modo delta')
+    args = parser.parse_args()
+    _DEBUG_MODE = args.debug
+    CLIENTES_COMPACTOS = args.clientes_compactos
+    MODO_DELTA  = args.delta
+    if MODO_DELTA:
+        # Ejecución por cron: el último snapshot de cada IP se guarda entre ejecuciones
+        DELTA_ENCODER = SnapshotDeltaEncoder(args.keyframe)
+        DELTA_ENCODER.load(file_delta)
+
+    RATE_TRACKER.load(file_tasas)
 
+    try:
+        ## Obtenemos datos de la lista de equipos RAJANT de la API
+        subscribers         = get_subscribers()
+        print(f"Se han detectado un total de {len(subscribers)} equipos en Inventario")
+        update_rajant(subscribers)
+        RATE_TRACKER.save(file_tasas)
+        if MODO_DELTA:
+            DELTA_ENCODER.save(file_delta)
 
+    except Exception as e:
+        if str(e):
+            print(f" !! {script_folder} main function error: {e}")
+            if _DEBUG_MODE:
+                print(" > Error Details:")
+                print(traceback.format_exc())
 
 
+if __name__ == "__main__":
+    main()
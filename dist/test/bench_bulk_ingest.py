@@ -0,0 +1,155 @@
+# =============================================================================
+#                   Smartlink - Benchmark de ingesta masiva (add_list / add_bulk)
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Mide en filas/s, sobre un lote sintético de cambium_data o latencia:
+#    - preparación de add_list: un modelo pydantic por fila + tuplas como
+#      routes.__utils__.insert_bulk_data (json.dumps por celda y por acceso)
+#    - preparación de add_bulk: validate_rows de ingest_utils.py (por columna)
+#    - serialización TSV para LOAD DATA LOCAL INFILE
+#  Con --db también mide la escritura en una tabla temporal (CREATE TEMPORARY
+#  TABLE ... LIKE) con INSERT fila a fila, executemany + INSERT IGNORE y
+#  LOAD DATA LOCAL INFILE, reenviando el lote para medir los duplicados.
+#    python3 bench_bulk_ingest.py -n 50000
+#    python3 bench_bulk_ingest.py -t latencia -n 50000 --db /ruta/configAPI.yml
+# =============================================================================
+import sys
+import os
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT_FOLDER)
+
+from ingest_utils   import validate_rows, bulk_write, _tsv_value
+import ingest_utils
+from pydantic       import BaseModel
+from typing         import Dict, Optional
+from datetime       import datetime, timedelta
+import argparse
+import random
+import json
+import time
+
+
+## Mismos campos que models/cambium_data_models.py y LatenciaMuestras (latencia_router.py)
+class CambiumData(BaseModel):
+    ip          : str
+    fecha       : str
+    snr         : Dict
+    link_radio  : Dict
+    avg_power   : Dict
+    ifresults_metricas: Dict
+
+class Latencia(BaseModel):
+    ip          : str
+    latencia    : float
+    fecha       : str
+    latencia_min    : Optional[float] = None
+    latencia_max    : Optional[float] = None
+    jitter          : Optional[float] = None
+    perdida         : Optional[float] = None
+    muestras        : Optional[int]   = None
+
+MODELOS = {"cambium_data": CambiumData, "latencia": Latencia}
+
+
+def generar_filas(tabla : str, n : int) -> list:
+    inicio, filas = datetime(2025, 1, 1), []
+    for i in range(n):
+        ip    = f"10.{(i // 65536) % 256}.{(i // 256) % 256}.{i % 256}"
+        fecha = (inicio + timedelta(minutes = i // 1000)).strftime('%Y-%m-%d %H:%M:%S')
+        if tabla == "latencia":
+            lat = round(random.uniform(1, 250), 2)
+            filas.append({"ip": ip, "fecha": fecha, "latencia": lat, "latencia_min": lat * 0.8, "latencia_max": lat * 1.3,
+                          "jitter": 1.5, "perdida": 0.0, "muestras": 5})
+        else:
+            filas.append({"ip": ip, "fecha": fecha,
+                          "snr": {"H": f"{random.randint(10, 40)} dB", "V": f"{random.randint(10, 40)} dB"},
+                          "link_radio": {"rx": -60, "tx": 24, "modulacion": "8X"},
+                          "avg_power": {"rx": "-61.2 dBm"},
+                          "ifresults_metricas": {"in_octets": random.randint(0, 10 ** 9), "out_octets": random.randint(0, 10 ** 9)}})
+    return filas
+
+
+## Preparación actual de add_list: validación por fila + insert_bulk_data
+def preparar_add_list(modelo, filas : list):
+    columns = list(modelo.model_fields.keys())
+    modelos = [modelo(**fila) for fila in filas]
+    return columns, [
+        tuple(json.dumps(getattr(item, col)) if isinstance(getattr(item, col), (dict, list)) else getattr(item, col) for col in columns)
+        for item in modelos
+    ]
+
+
+def medir(label : str, n : int, function, repeat : int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result  = function()
+        best    = min(best, time.perf_counter() - started)
+    print(f"{label:<44} {n / best:12,.0f} filas/s   ({best * 1e3:8.1f} ms)")
+    return result
+
+
+def medir_db(config_path : str, tabla : str, columns : list, rows : list):
+    import mariadb
+    import yaml
+    with open(config_path) as ymlfile:
+        config = yaml.safe_load(ymlfile)["databases"]["smartlink"]
+    conn = mariadb.connect(user = config["user"], password = config["password"], host = config["host"],
+                           port = config["port"], database = config["database"], local_infile = True)
+    cursor = conn.cursor()
+    temporal = f"bench_{tabla}"
+    query = f"INSERT INTO {temporal} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+    def preparar():
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {temporal}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {temporal} LIKE {tabla}")
+
+    def fila_a_fila():
+        for row in rows:
+            cursor.execute(query, row)
+        conn.commit()
+
+    print()
+    for label, function in (
+        ("INSERT fila a fila", fila_a_fila),
+        ("executemany + INSERT IGNORE", lambda: bulk_write(conn, temporal, columns, rows)),
+        ("LOAD DATA LOCAL INFILE", lambda: bulk_write(conn, temporal, columns, rows, load_data = True)),
+    ):
+        preparar()
+        started = time.perf_counter()
+        function()
+        print(f"{label:<44} {len(rows) / (time.perf_counter() - started):12,.0f} filas/s")
+        if label != "INSERT fila a fila":
+            started   = time.perf_counter()
+            reenviado = function()
+            print(f"{'  reenvío del mismo lote (duplicados)':<44} {len(rows) / (time.perf_counter() - started):12,.0f} filas/s"
+                  f"   {reenviado['duplicados']} duplicados, {reenviado['insertados']} insertados")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingesta masiva: add_list (pydantic por fila) vs. add_bulk (por columna)")
+    parser.add_argument('-t', '--tabla', choices=sorted(MODELOS), default="cambium_data", help='Tabla / modelo a simular')
+    parser.add_argument('-n', '--filas', type=int, default=20000, help='Filas del lote')
+    parser.add_argument('--db', metavar='configAPI.yml', help='Mide también la escritura en MariaDB (tabla temporal)')
+    args = parser.parse_args()
+
+    ingest_utils.LOAD_DATA_MIN_ROWS = 0          # el benchmark decide el método con load_data
+    modelo = MODELOS[args.tabla]
+    filas  = generar_filas(args.tabla, args.filas)
+    print(f"{args.tabla}: {args.filas} filas\n")
+
+    medir("add_list (pydantic por fila + tuplas)", args.filas, lambda: preparar_add_list(modelo, filas))
+    columns, rows = medir("add_bulk (validate_rows por columna)", args.filas, lambda: validate_rows(args.tabla, filas, modelo))
+    medir("serialización TSV para LOAD DATA", args.filas, lambda: "".join("\t".join(map(_tsv_value, row)) + "\n" for row in rows))
+
+    if args.db:
+        medir_db(args.db, args.tabla, columns, rows)
+
+
+if __name__ == "__main__":
+    main()
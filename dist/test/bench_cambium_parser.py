@@ -0,0 +1,133 @@
+# =============================================================================
+#                   Smartlink - Benchmark del parser Cambium
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Compara el post-proceso anterior de async_task (copia del diccionario de
+#  OID, re.findall, scan de 'array_filtrado', limpieza de GPS) con el plan
+#  compilado de cambium_parser.py sobre el mismo conjunto de respuestas, y
+#  verifica que ambos generen exactamente la misma salida.
+#    python3 bench_cambium_parser.py                  (respuestas sintéticas)
+#    python3 bench_cambium_parser.py -a respuestas.json
+#  El archivo -a es una lista de {"ip", "tipo", "respuesta"} con la salida de
+#  mySNMPClient.mapping_OID_dict grabada en terreno.
+# =============================================================================
+import sys
+import os
+
+DIST_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(DIST_FOLDER, "cambium"))
+
+from smartlink.json_utils   import load_json_to_dict
+from cambium_parser         import get_parse_plan
+import argparse
+import random
+import json
+import time
+import re
+
+OID_FILE_PMPAP  = os.path.join(DIST_FOLDER, "cambium", "snmp_json", "PMPAP_v1.json")
+OID_FILE_PMPSM  = os.path.join(DIST_FOLDER, "cambium", "snmp_json", "PMPSM_v1.json")
+FECHA           = "2025-01-01 00:00:00"
+
+
+## Post-proceso de async_task antes del plan compilado (referencia)
+def legacy_parse(ip_device : str, tipo_PMP : str, data_snmp_raw : dict, oid_maps : dict):
+    oid_dict = {}
+    if "-AP" in tipo_PMP:
+        oid_dict = oid_maps["-AP"].copy()
+    elif "-SM" in tipo_PMP:
+        oid_dict = oid_maps["-SM"].copy()
+    data_snmp_raw = dict(data_snmp_raw)
+
+    data_snmp = {"ip" : ip_device, "fecha" : FECHA}
+    message_avg_power = data_snmp_raw["avg_power"]
+    if "-AP" in tipo_PMP:
+        data_snmp["avg_power"] = {"tx" : float(message_avg_power)}
+    else:
+        matches = [float(m) for m in re.findall(r"(-?\d+\.\d+)\s*dBm\s*[VH]", message_avg_power)] if message_avg_power else [0,0]
+        data_snmp["avg_power"] = {
+            "rx" : matches[0] if len(matches) > 0 else None,
+            "tx" : matches[1] if len(matches) > 1 else None
+        }
+    data_snmp["link_radio"] = {"tx" : data_snmp_raw["link_radio_tx"], "rx" : data_snmp_raw["link_radio_rx"]}
+    data_snmp["snr"] = {"V" : data_snmp_raw["snr_v"], "H" : data_snmp_raw["snr_h"]}
+    array_filtrado = [
+        key for key in data_snmp_raw
+        if "GPS" not in key.upper() and not any(key.startswith(existing_key) for existing_key in data_snmp)
+    ]
+    data_snmp["ifresults_metricas"] = {key: data_snmp_raw[key] for key in array_filtrado} or None
+
+    latitud  = float(data_snmp_raw.get("GPSLat", "0").replace('+', '').strip() or 0)
+    longitud = float(data_snmp_raw.get("GPSLon", "0").replace('+', '').strip() or 0)
+    altitud  = float(data_snmp_raw.get("GPSAlt", "0").strip() or 0)
+    dictionary_gps = {
+        "ip" : ip_device, "fecha" : FECHA, "latitud" : latitud, "longitud" : longitud, "altitud" : altitud
+    } if latitud and longitud else {}
+    return [data_snmp, dictionary_gps, None]
+
+
+## Respuestas con la forma de las de terreno (valores aleatorios, semilla fija)
+def synthetic_responses(count : int, oid_maps : dict) -> list:
+    rnd, rows = random.Random(1234), []
+    for index in range(count):
+        tipo = "PMP-AP" if index % 10 == 0 else "PMP-SM"
+        respuesta = {key: rnd.randint(0, 100) for key in oid_maps[tipo[-3:]]}
+        respuesta.update({
+            "GPSLat"    : f"{rnd.choice('+-')}{rnd.uniform(0, 30):.6f}",
+            "GPSLon"    : f"-{rnd.uniform(60, 80):.6f}",
+            "GPSAlt"    : f"{rnd.uniform(3000, 4500):.1f}",
+            "avg_power" : (f"{rnd.uniform(10, 27):.1f}" if tipo == "PMP-AP"
+                           else f"{-rnd.uniform(40, 80):.1f} dBm V {-rnd.uniform(40, 80):.1f} dBm H"),
+        })
+        rows.append({"ip" : f"10.{index // 65536}.{index // 256 % 256}.{index % 256}", "tipo" : tipo, "respuesta" : respuesta})
+    return rows
+
+
+def bench(label : str, function, rows : list, repeat : int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for row in rows:
+            function(row)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {best * 1e6 / len(rows):8.2f} µs/equipo   ({best * 1e3:.1f} ms por {len(rows)} equipos)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser de respuestas SNMP Cambium")
+    parser.add_argument('-a', '--archivo', help='JSON con respuestas grabadas [{"ip", "tipo", "respuesta"}]')
+    parser.add_argument('-n', '--equipos', type=int, default=5000, help='Respuestas sintéticas a generar (sin -a)')
+    parser.add_argument('-r', '--repeticiones', type=int, default=5, help='Repeticiones (se informa la mejor)')
+    args = parser.parse_args()
+
+    oid_maps = {"-AP" : load_json_to_dict(OID_FILE_PMPAP), "-SM" : load_json_to_dict(OID_FILE_PMPSM)}
+    if args.archivo:
+        with open(args.archivo) as file:
+            rows = json.load(file)
+    else:
+        rows = synthetic_responses(args.equipos, oid_maps)
+
+    # Misma salida en ambos caminos
+    for row in rows:
+        esperado = legacy_parse(row["ip"], row["tipo"], row["respuesta"], oid_maps)
+        plan     = get_parse_plan(row["tipo"], oid_maps)
+        obtenido = plan.transform(row["ip"], FECHA, dict(row["respuesta"]))
+        if obtenido != esperado:
+            raise SystemExit(f"Salida distinta para {row['ip']}:\n{esperado}\n{obtenido}")
+    print(f"Salidas idénticas en {len(rows)} respuestas\n")
+
+    values = [(row, get_parse_plan(row["tipo"], oid_maps)) for row in rows]
+    values = [(row, plan, [row["respuesta"].get(key) for key in plan.keys]) for row, plan in values]
+
+    antes = bench("anterior (async_task)", lambda row: legacy_parse(row["ip"], row["tipo"], row["respuesta"], oid_maps), rows, args.repeticiones)
+    dicc  = bench("plan.transform (dict)", lambda row: get_parse_plan(row["tipo"], oid_maps).transform(row["ip"], FECHA, dict(row["respuesta"])), rows, args.repeticiones)
+    vals  = bench("plan.transform_values", lambda item: item[1].transform_values(item[0]["ip"], FECHA, item[2]), values, args.repeticiones)
+    print(f"\nMejora: x{antes / dicc:.1f} con mySNMPClient, x{antes / vals:.1f} con el motor SNMP asíncrono")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# =============================================================================
+#                   Smartlink - Benchmark del parser LTE (RouterOS)
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Compara, sobre salidas capturadas del mismo equipo:
+#    - modo "comandos": las cuatro salidas legibles de SSH_COMMAND_LIST con
+#      parse_LTE_Mikrotik_dictionary (cuatro exec por consulta)
+#    - modo "script": la salida clave=valor de SSH_SCRIPT_LTE con
+#      parse_lte_script_output (un solo exec)
+#  Informa el costo de CPU del parseo, la latencia de consulta medida al
+#  capturar (si se capturó) y las claves en que ambos modos difieren.
+#    1) Capturar de terreno (ambos modos por IP):
+#         python3 bench_lte_parser.py -g 10.20.0.1 10.20.0.2 -a salidas.json
+#    2) Medir:
+#         python3 bench_lte_parser.py -a salidas.json
+#         python3 bench_lte_parser.py                  (salida de ejemplo)
+# =============================================================================
+import sys
+import os
+
+DIST_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(DIST_FOLDER, "LTE"))
+
+from LTE_module     import SSH_COMMAND_LIST, SSH_SCRIPT_LTE, parse_LTE_Mikrotik_dictionary, parse_lte_script_output
+import argparse
+import json
+import time
+import re
+
+## Salida de ejemplo (RouterOS 7, R11e-LTE6) en ambos formatos
+EJEMPLO_COMANDOS = {
+    SSH_COMMAND_LIST[0] : (
+        "         pin-status: ok\n registration-status: registered\n      functionality: full\n"
+        "       manufacturer: \"MikroTik\"\n              model: \"R11e-LTE6\"\n   current-operator: Claro\n"
+        "                lac: 1234\n     current-cellid: 1234567\n             enb-id: 4822\n"
+        "          sector-id: 7\n               imei: 861234567890123\n               imsi: 716101234567890\n"
+        "               rsrp: -95dBm\n               rsrq: -11dB\n               sinr: 9dB\n"
+        "               rssi: -67dBm\n"
+    ),
+    SSH_COMMAND_LIST[1] : (
+        "Flags: D - dynamic; X - disabled; R - running; S - slave; P - passthrough\n"
+        " 0  R  name=\"ether1\" default-name=\"ether1\" type=\"ether\" mtu=1500 link-downs=0\n"
+        " 1  R  name=\"lte1\" default-name=\"lte1\" type=\"lte\" mtu=1500 actual-mtu=1500 link-downs=3\n"
+    ),
+    SSH_COMMAND_LIST[2] : (
+        " 0    name=\"lte1\" mtu=1500 allow-roaming=no apn-profiles=default network-mode=lte,3g sms-protocol=auto\n"
+    ),
+    SSH_COMMAND_LIST[3] : "$GPSACP: 123519.000,-20.2134,-70.1345,1.2,3500.0,3,0.0,0.0,0.0,010125,08\nOK\n",
+}
+EJEMPLO_SCRIPT = (
+    "m|pin-status=ok\nm|registration-status=registered\nm|functionality=full\nm|manufacturer=MikroTik\n"
+    "m|model=R11e-LTE6\nm|current-operator=Claro\nm|lac=1234\nm|current-cellid=1234567\nm|enb-id=4822\n"
+    "m|sector-id=7\nm|imei=861234567890123\nm|imsi=716101234567890\nm|rsrp=-95\nm|rsrq=-11\nm|sinr=9\nm|rssi=-67\n"
+    "i|name=lte1\ni|default-name=lte1\ni|type=lte\ni|mtu=1500\ni|actual-mtu=1500\ni|link-downs=3\n"
+    "l|name=lte1\nl|mtu=1500\nl|allow-roaming=false\nl|apn-profiles=default\nl|network-mode=lte;3g\nl|sms-protocol=auto\n"
+    "g|output=$GPSACP: 123519.000,-20.2134,-70.1345,1.2,3500.0,3,0.0,0.0,0.0,010125,08\nOK\nfin|ok=1\n"
+)
+
+_UNIDADES = re.compile(r"(dBm|dB)$")
+
+
+## Valor comparable entre modos: sin comillas ni unidades, como texto
+def _normalizar(value) -> str:
+    return _UNIDADES.sub("", str(value).replace('"', '').strip())
+
+
+def capturar(ips : list, path : str):
+    from LTE_module import USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK
+    from ssh_pool   import SSHSessionPool
+    pool, capturas = SSHSessionPool(USER_SSH_MIKROTIK, PASS_SSH_MIKROTIK, timeout = 10), []
+    for ip in ips:
+        try:
+            pool.run_commands(ip, SSH_COMMAND_LIST)      # abre la sesión: las latencias no incluyen el handshake
+            inicio   = time.perf_counter()
+            comandos = pool.run_commands(ip, SSH_COMMAND_LIST)
+            t_comandos = time.perf_counter() - inicio
+            inicio   = time.perf_counter()
+            script   = pool.run_commands(ip, [SSH_SCRIPT_LTE])[SSH_SCRIPT_LTE]
+            t_script = time.perf_counter() - inicio
+        except Exception as e:
+            print(f"✘ {ip}: {e}")
+            continue
+        capturas.append({"ip": ip, "comandos": comandos, "script": script,
+                         "latencia": {"comandos": t_comandos, "script": t_script}})
+        print(f"♦ {ip}: comandos {t_comandos * 1e3:.0f} ms / script {t_script * 1e3:.0f} ms")
+    pool.close()
+    with open(path, "w") as file:
+        json.dump(capturas, file, indent = 1)
+
+
+def bench(label : str, function, capturas : list, repeat : int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        for captura in capturas:
+            function(captura)
+        best = min(best, time.process_time() - started)
+    print(f"{label:<42} {best * 1e6 / len(capturas):9.1f} µs CPU/equipo")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser LTE: cuatro comandos vs. script clave=valor")
+    parser.add_argument('-a', '--archivo', help='JSON con salidas capturadas [{"ip", "comandos", "script"}]')
+    parser.add_argument('-g', '--grabar', nargs='+', metavar='IP', help='Captura estas IPs en --archivo y termina')
+    parser.add_argument('-r', '--repeticiones', type=int, default=2000, help='Pasadas sobre el conjunto (se informa la mejor)')
+    args = parser.parse_args()
+
+    if args.grabar:
+        if not args.archivo:
+            raise SystemExit("Indique el archivo de salida con -a")
+        return capturar(args.grabar, args.archivo)
+
+    if args.archivo:
+        with open(args.archivo) as file:
+            capturas = json.load(file)
+    else:
+        capturas = [{"ip": "ejemplo", "comandos": EJEMPLO_COMANDOS, "script": EJEMPLO_SCRIPT}]
+
+    # Diferencias de contenido entre ambos modos
+    for captura in capturas:
+        anterior = parse_LTE_Mikrotik_dictionary(captura["comandos"])
+        actual   = parse_lte_script_output(captura["script"])
+        faltan   = sorted(set(anterior) - set(actual))
+        distintos = sorted(key for key in set(anterior) & set(actual) if _normalizar(anterior[key]) != _normalizar(actual[key]))
+        print(f"{captura['ip']}: {len(actual)} claves (comandos: {len(anterior)})"
+              + (f" | faltan {faltan}" if faltan else "") + (f" | distintas {distintos}" if distintos else ""))
+        if distintos:
+            for key in distintos:
+                print(f"    {key}: {anterior[key]!r} -> {actual[key]!r}")
+
+    latencias = [captura["latencia"] for captura in capturas if "latencia" in captura]
+    if latencias:
+        print(f"\nLatencia media por consulta: comandos {sum(l['comandos'] for l in latencias) / len(latencias) * 1e3:.0f} ms"
+              f" / script {sum(l['script'] for l in latencias) / len(latencias) * 1e3:.0f} ms")
+
+    print()
+    antes = bench("comandos (parse_LTE_Mikrotik_dictionary)", lambda c: parse_LTE_Mikrotik_dictionary(c["comandos"]), capturas, args.repeticiones)
+    ahora = bench("script (parse_lte_script_output)", lambda c: parse_lte_script_output(c["script"]), capturas, args.repeticiones)
+    print(f"\nMejora de CPU: x{antes / ahora:.1f}")
+
+
+if __name__ == "__main__":
+    main()
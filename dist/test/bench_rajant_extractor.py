@@ -0,0 +1,170 @@
+# =============================================================================
+#                   Smartlink - Benchmark del extractor Rajant
+# =============================================================================
+#  Versión       : V2025.4
+#  Autor         : HCG-GROUP, Área de Backend
+#  Contacto      : Anexo 3128
+# =============================================================================
+#  Compara el extract_rajant_model_data anterior (getattr / HasField por campo,
+#  diccionarios por cliente, búsqueda de fabricante por cada MAC, recorrido de
+#  DESCRIPTOR.fields_by_name en cada equipo) con el extractor actual de
+#  format_utils.py sobre estados State grabados, y verifica que ambos generen
+#  la misma salida.
+#    1) Grabar estados de terreno (una consulta por IP):
+#         python3 bench_rajant_extractor.py -g 10.10.1.1 10.10.1.2 -a estados.bin
+#    2) Medir:
+#         python3 bench_rajant_extractor.py -a estados.bin
+#  El archivo guarda cada State serializado precedido de su largo (4 bytes).
+# =============================================================================
+import sys
+import os
+
+DIST_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(DIST_FOLDER, "rajant"))
+
+from format_utils   import extract_rajant_model_data, convert_mac_hex_to_readable, dms_to_dd
+import argparse
+import struct
+import time
+
+
+## Extractor anterior (referencia)
+def legacy_extract(data_proto_rajant) -> list:
+    rajant_dictionary   = {}
+    wired_array_ip_cost = []
+    try:
+        if data_proto_rajant.HasField("gps") and (gps_data := data_proto_rajant.gps.gpsPos).ListFields():
+            rajant_dictionary["gps"] = {
+                "latitud"   : dms_to_dd(gps_data.gpsLat),
+                "longitud"  : dms_to_dd(gps_data.gpsLong),
+                "altitud"   : round(float(gps_data.gpsAlt), 2)
+            }
+        if data_proto_rajant.HasField("system"):
+            data_system = data_proto_rajant.system
+            rajant_dictionary["sensores"] = {
+                "info": {
+                    "sysTemperatura": data_system.temperature,
+                    "modelo": data_proto_rajant.manufacturer.model
+                },
+                "valores": {
+                    sensor_type: [data.value.current for data in getattr(data_system.sensors, sensor_type)]
+                    for sensor_type in data_system.sensors.DESCRIPTOR.fields_by_name
+                    if hasattr(data_system.sensors, sensor_type)
+                }
+            }
+        rajant_dictionary["config"] = {"uptime": data_system.uptime}
+        instamesh_fields = ["packetsDropped", "packetsMulticast", "packetsReceived", "packetsSent"]
+        rajant_dictionary["instamesh"] = {
+            field: getattr(data_proto_rajant.instamesh, field) for field in instamesh_fields
+        }
+        final_wired_dictionary = {}
+        for _wired_data in data_proto_rajant.wired:
+            if int(_wired_data.aptState) != 0:
+                continue
+            for _peer_data in _wired_data.peer:
+                if _peer_data.HasField("cost"):
+                    wired_array_ip_cost.append([_peer_data.ipv4Address, int(_peer_data.cost)])
+            final_wired_dictionary[_wired_data.name] = {field: getattr(_wired_data.stats, field) for field in ["rxBytes", "txBytes"]}
+        rajant_dictionary["wired"] = final_wired_dictionary
+
+        final_wireless_dictionary = {}
+        for _wireless_data in data_proto_rajant.wireless:
+            clientes = []
+            for _client in _wireless_data.ap:
+                for _client_data in _client.client:
+                    mac_value, manufacturer_value = convert_mac_hex_to_readable(_client_data.mac, True)
+                    clientes.append({
+                        "mac" : mac_value, "type" : manufacturer_value, "rate" : _client_data.rate,
+                        "rssi" : _client_data.rssi, "signal" : _client_data.signal, "ssid" : _client.essid
+                    })
+            wireless_dict = {
+                **{field: getattr(_wireless_data, field) for field in ["noise", "channel"]},
+                **{field: getattr(_wireless_data.stats, field) for field in ["rxBytes", "txBytes"]}
+            }
+            if clientes:
+                wireless_dict["clients"] = clientes
+            final_wireless_dictionary[_wireless_data.name] = wireless_dict
+            wireless_costs = [ int(peer.cost) for peer in _wireless_data.peer if peer.HasField("cost") ]
+        if wireless_costs:
+            final_wireless_dictionary["cost"] = min(wireless_costs)
+        if hasattr(data_proto_rajant.system, 'rptPeer'):
+            rpt_data = data_proto_rajant.system.rptPeer
+            rpt_dict = {}
+            for field in ["mac", "action", "cost", "ipv4Address", "encapId"]:
+                if hasattr(rpt_data, field):
+                    rpt_dict[field] = (
+                        convert_mac_hex_to_readable(getattr(rpt_data, field)) if field == "mac" else getattr(rpt_data, field)
+                    )
+            final_wireless_dictionary["rpt"] = rpt_dict
+        rajant_dictionary["wireless"] = final_wireless_dictionary
+    except Exception as e:
+        print(f"Error al encontrar el valor en el data Rajant:\n{e}")
+    return [rajant_dictionary, wired_array_ip_cost]
+
+
+def record_states(ips : list, path : str):
+    from bcapi_utils import getRajantData, _PASSWORDS, _ROLES
+    with open(path, "wb") as file:
+        for ip in ips:
+            state = getRajantData(ipv4 = ip, user = _ROLES["view"], passw = _PASSWORDS["view"], timeout = 5)
+            if state is None:
+                print(f"✘ {ip}: sin respuesta")
+                continue
+            raw = state.SerializeToString()
+            file.write(struct.pack("!I", len(raw)) + raw)
+            print(f"♦ {ip}: {len(raw)} bytes")
+
+
+def load_states(path : str) -> list:
+    import bcapihcg
+    states = []
+    with open(path, "rb") as file:
+        data = file.read()
+    offset = 0
+    while offset < len(data):
+        (length,) = struct.unpack_from("!I", data, offset)
+        state = bcapihcg.State_pb2.State()
+        state.ParseFromString(data[offset + 4:offset + 4 + length])
+        states.append(state)
+        offset += 4 + length
+    return states
+
+
+def bench(label : str, function, states : list, repeat : int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        for state in states:
+            function(state)
+        best = min(best, time.process_time() - started)
+    print(f"{label:<30} {best * 1e6 / len(states):9.1f} µs CPU/equipo")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del extractor de estados Rajant")
+    parser.add_argument('-a', '--archivo', required=True, help='Archivo de estados State grabados')
+    parser.add_argument('-g', '--grabar', nargs='+', metavar='IP', help='Graba el estado de estas IPs en --archivo y termina')
+    parser.add_argument('-r', '--repeticiones', type=int, default=20, help='Pasadas sobre el conjunto (se informa la mejor)')
+    args = parser.parse_args()
+
+    if args.grabar:
+        return record_states(args.grabar, args.archivo)
+
+    states = load_states(args.archivo)
+    if not states:
+        raise SystemExit("El archivo no contiene estados")
+
+    for index, state in enumerate(states):
+        if extract_rajant_model_data(state) != legacy_extract(state):
+            raise SystemExit(f"Salida distinta en el estado N° {index}")
+    print(f"Salidas idénticas en {len(states)} estados\n")
+
+    antes   = bench("anterior", legacy_extract, states, args.repeticiones)
+    ahora   = bench("actual", extract_rajant_model_data, states, args.repeticiones)
+    compact = bench("actual (clientes compactos)", lambda s: extract_rajant_model_data(s, clientes_compactos = True), states, args.repeticiones)
+    print(f"\nMejora: x{antes / ahora:.1f} (x{antes / compact:.1f} con clientes compactos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import os
+import yaml
+import json
+import time
+import signal
+import bisect
+import argparse
+import pandas as pd
+from datetime import datetime, timedelta
+from collections import defaultdict
+from urllib.parse import urljoin
+
+import zmq
+
+from functions_eventos import api_request, get_recurrencia_agrupada, DB_API_URL
+from reglas_eventos import cargar_reglas, evaluar_fuentes, candidatos_a_eventos
+
+# Detector de eventos residente: en vez de releer latencia / cambium_data por HTTP cada ciclo de cron,
+# se suscribe a los PUB de ZeroMQ de los colectores (collector_daemon.py --zmq y spam_LTE_status.py),
+# evalúa las reglas de umbrales_urgencia sobre lo recibido cada pocos segundos y calcula la recurrencia
+# con ventanas en memoria por (ip, problema, tipo_interferencia). Los eventos se envían por lotes a
+# /eventos/add_list. Solo lee la base de datos una vez, al arrancar, para precargar las ventanas.
+
+MAX_PENDIENTES = 20000      # eventos retenidos si la API no responde (se descartan los más antiguos)
+
+_DEBUG_MODE = False
+
+
+# Eventos emitidos por (ip, problema en minúsculas, tipo_interferencia), ordenados por fecha.
+# Misma regla que calcular_recurrencia: max(recurrencia previa, eventos previos) + 1 en la ventana
+# [fecha - intervalo_recurrencia - 5 s, fecha].
+class VentanaRecurrencia(object):
+
+    def __init__(self, intervalo_recurrencia):
+        self.ventana = pd.Timedelta(minutes=intervalo_recurrencia, seconds=5)
+        self._eventos = defaultdict(list)   # clave -> [(fecha, eventos, max_recurrencia)]
+
+    # Filas de get_recurrencia_agrupada (eventos ya guardados antes de arrancar)
+    def precargar(self, previos):
+        for fila in previos.to_dict(orient="records"):
+            tipo = "" if pd.isna(fila["tipo_interferencia"]) else fila["tipo_interferencia"]
+            clave = (fila["ip"], str(fila["problema"]).lower(), tipo)
+            max_recurrencia = 0 if pd.isna(fila["max_recurrencia"]) else int(fila["max_recurrencia"])
+            bisect.insort(self._eventos[clave], (pd.Timestamp(fila["fecha"]), int(fila["eventos"]), max_recurrencia))
+
+    def registrar(self, clave, fecha):
+        previos = [e for e in self._eventos.get(clave, ()) if fecha - self.ventana <= e[0] <= fecha]
+        recurrencia = max(max(e[2] for e in previos), sum(e[1] for e in previos)) + 1 if previos else 1
+        bisect.insort(self._eventos[clave], (fecha, 1, recurrencia))
+        return recurrencia
+
+    def purgar(self, limite):
+        for clave in list(self._eventos):
+            eventos = self._eventos[clave]
+            del eventos[:bisect.bisect_left(eventos, (limite,))]
+            if not eventos:
+                del self._eventos[clave]
+
+    def __len__(self):
+        return len(self._eventos)
+
+
+class DetectorEventos(object):
+
+    def __init__(self, config, intervalo_recurrencia):
+        detector = config.get("detector", {})
+        self.fuentes = detector.get("fuentes", {})
+        self.intervalo_evaluacion = detector.get("intervalo_evaluacion", 2)
+        self.intervalo_envio = detector.get("intervalo_envio", 5)
+        self.max_lote = detector.get("max_lote", 500)
+        self.silencio = detector.get("silencio", 60)
+
+        self.reglas = defaultdict(list)     # topico -> reglas
+        for regla in cargar_reglas(config):
+            if regla["topico"]:
+                self.reglas[regla["topico"]].append(regla)
+
+        self.ventana = VentanaRecurrencia(intervalo_recurrencia)
+        self.url_add_list = urljoin(DB_API_URL, config["api"]["eventos"]["add_list"])
+        self.url_recurrencia = urljoin(DB_API_URL, config["api"]["eventos"]["get_recurrencia_agrupada"])
+        self.url_eventos = urljoin(DB_API_URL, config["api"]["eventos"]["get"])
+
+        self.recibidas = defaultdict(list)  # topico -> filas sin evaluar
+        self.por_enviar = []
+        self.primer_pendiente = None
+        self.ultimo_emitido = {}            # (clave, estado) -> time.monotonic() del último evento emitido
+        self.stop = False
+
+    def precargar(self):
+        fin = datetime.now()
+        inicio = fin - self.ventana.ventana
+        previos = get_recurrencia_agrupada(self.url_recurrencia, self.url_eventos,
+                                           inicio.strftime('%Y-%m-%dT%H:%M:%S'), fin.strftime('%Y-%m-%dT%H:%M:%S'))
+        self.ventana.precargar(previos)
+        print(f"Ventanas de recurrencia precargadas: {len(self.ventana)} claves")
+
+    # Mensaje de dos partes [tópico, JSON] (colector) o de una sola (spam_LTE_status.py: tópico = nombre de la fuente)
+    def recibir(self, nombre, partes):
+        topico, cuerpo = (partes[0].decode(), partes[1]) if len(partes) > 1 else (nombre, partes[0])
+        if topico not in self.reglas:
+            return
+        try:
+            filas = json.loads(cuerpo)
+        except ValueError as e:
+            print(f"Mensaje inválido de {nombre} ({topico}): {e}")
+            return
+        self.recibidas[topico].extend(filas if isinstance(filas, list) else [filas])
+
+    def evaluar(self):
+        if not self.recibidas:
+            return
+        ahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        fuentes = []
+        for topico, filas in self.recibidas.items():
+            df = pd.DataFrame(filas)
+            if "ip" not in df:
+                continue
+            # Los mensajes LTE no traen fecha: se usa la de recepción
+            df["fecha"] = df["fecha"].fillna(ahora) if "fecha" in df else ahora
+            fuentes.extend((regla, df) for regla in self.reglas[topico])
+        self.recibidas = defaultdict(list)
+
+        candidatos = evaluar_fuentes(fuentes, verbose=_DEBUG_MODE)
+        if candidatos.empty:
+            return
+
+        # Recurrencia en memoria y silencio por (clave, estado): fila a fila, son pocas por evaluación
+        reloj = time.monotonic()
+        emitir, recurrencias = [], []
+        for ip, problema, tipo, estado, fecha in zip(candidatos["ip"], candidatos["problema"], candidatos["tipo_interferencia"],
+                                                     candidatos["estado"], candidatos["fecha"]):
+            clave = (ip, problema.lower(), tipo)
+            if reloj - self.ultimo_emitido.get((clave, estado), -self.silencio) < self.silencio:
+                emitir.append(False)
+                recurrencias.append(0)
+                continue
+            self.ultimo_emitido[(clave, estado)] = reloj
+            emitir.append(True)
+            recurrencias.append(self.ventana.registrar(clave, pd.Timestamp(fecha)))
+        candidatos["recurrencia"] = recurrencias
+        eventos = candidatos_a_eventos(candidatos[emitir])
+        if eventos:
+            print(f"{len(eventos)} eventos nuevos ({sum(e['urgente'] for e in eventos)} urgentes)")
+            if not self.por_enviar:
+                self.primer_pendiente = reloj
+            self.por_enviar.extend(eventos)
+
+    def enviar(self, forzar=False):
+        if not self.por_enviar:
+            return
+        if not forzar and len(self.por_enviar) < self.max_lote and time.monotonic() - self.primer_pendiente < self.intervalo_envio:
+            return
+        while self.por_enviar:
+            lote = self.por_enviar[:self.max_lote]
+            if api_request(self.url_add_list, method="POST", data=lote) is None:
+                # Se reintenta en el próximo intervalo de envío
+                if len(self.por_enviar) > MAX_PENDIENTES:
+                    descartados = len(self.por_enviar) - MAX_PENDIENTES
+                    del self.por_enviar[:descartados]
+                    print(f"Se descartan {descartados} eventos sin enviar (API no disponible)")
+                self.primer_pendiente = time.monotonic()
+                return
+            del self.por_enviar[:len(lote)]
+            if _DEBUG_MODE:
+                print(f"Enviados {len(lote)} eventos a {self.url_add_list}")
+
+    def purgar(self):
+        limite = pd.Timestamp(datetime.now()) - self.ventana.ventana - timedelta(minutes=15)
+        self.ventana.purgar(limite)
+        reloj = time.monotonic()
+        self.ultimo_emitido = {clave: t for clave, t in self.ultimo_emitido.items() if reloj - t < self.silencio}
+
+    def run(self):
+        context = zmq.Context.instance()
+        poller = zmq.Poller()
+        sockets = {}
+        for nombre, endpoint in self.fuentes.items():
+            socket = context.socket(zmq.SUB)
+            socket.connect(endpoint)
+            socket.setsockopt_string(zmq.SUBSCRIBE, "")
+            poller.register(socket, zmq.POLLIN)
+            sockets[socket] = nombre
+            print(f"Suscrito a {nombre}: {endpoint}")
+        print(f"Reglas en vivo: {', '.join(regla['nombre'] for reglas in self.reglas.values() for regla in reglas)}")
+
+        proxima_evaluacion = proxima_purga = time.monotonic()
+        try:
+            while not self.stop:
+                espera = max(0, proxima_evaluacion - time.monotonic())
+                for socket, _ in poller.poll(timeout=espera * 1000):
+                    while True:
+                        try:
+                            self.recibir(sockets[socket], socket.recv_multipart(zmq.NOBLOCK))
+                        except zmq.Again:
+                            break
+                reloj = time.monotonic()
+                if reloj >= proxima_evaluacion:
+                    proxima_evaluacion = reloj + self.intervalo_evaluacion
+                    self.evaluar()
+                    self.enviar()
+                if reloj >= proxima_purga:
+                    proxima_purga = reloj + 60
+                    self.purgar()
+        finally:
+            self.evaluar()
+            self.enviar(forzar=True)
+            for socket in sockets:
+                socket.close(linger=0)
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    with open(f"{script_dir}/configEventos.yml", "r") as ymlfile:
+        config = yaml.safe_load(ymlfile)
+
+    parser = argparse.ArgumentParser(description="Detector de eventos en vivo sobre los PUB de ZeroMQ de los colectores.")
+    parser.add_argument('--intervalo_recurrencia', type=int, default=15, help="Intervalo en minutos para evaluar recurrencia. Por defecto: 15 minutos.")
+    parser.add_argument('--sin_precarga', action='store_true', help="No leer los eventos recientes de la API al arrancar (la recurrencia parte en 1)")
+    parser.add_argument('-d', '--debug', action='store_true', help="Muestra el detalle de cada evaluación y envío")
+    args = parser.parse_args()
+    _DEBUG_MODE = args.debug
+
+    detector = DetectorEventos(config, args.intervalo_recurrencia)
+    signal.signal(signal.SIGTERM, lambda *_: setattr(detector, "stop", True))
+    signal.signal(signal.SIGINT, lambda *_: setattr(detector, "stop", True))
+    if not args.sin_precarga:
+        detector.precargar()
+    detector.run()
@@ -7,6 +7,11 @@ import subprocess
 import shlex
 import os
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
 DB_API_URL = "http://localhost:8000/"
 
 # Función para hacer una solicitud a la API
@@ -37,6 +42,62 @@ def api_request(url, method="GET", dataframe=False, headers=None, data=None):
         print("Request failed:", e)
         return None
 
+# Recorre todas las páginas de un endpoint de lista siguiendo el cursor keyset.
+# La API devuelve el cursor de la siguiente página en la cabecera X-Next-Cursor;
+# si no viene, la página actual fue la última.
+def api_request_paginado(url, headers=None, max_paginas=None):
+    datos = []
+    cursor = None
+    paginas = 0
+    try:
+        while True:
+            url_pagina = url if cursor is None else f"{url}{'&' if '?' in url else '?'}cursor={cursor}"
+            response = requests.get(url_pagina, headers=headers)
+            if response.status_code != 200:
+                print("Error al obtener datos:", response.status_code, response.text)
+                return datos or None
+            datos.extend(response.json())
+            paginas += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor or (max_paginas is not None and paginas >= max_paginas):
+                return datos
+    except Exception as e:
+        print("Request failed:", e)
+        return datos or None
+
+# Igual que api_request_paginado para endpoints sin cursor: avanza 'offset' de a 'limit' registros
+# hasta recibir una página incompleta.
+def api_request_offset(url, headers=None, limit=1000):
+    datos = []
+    offset = 0
+    while True:
+        pagina = api_request(f"{url}{'&' if '?' in url else '?'}limit={limit}&offset={offset}", headers=headers)
+        if pagina is None:
+            return datos or None
+        datos.extend(pagina)
+        if len(pagina) < limit:
+            return datos
+        offset += limit
+
+# Descarga un endpoint /export directamente a un DataFrame sin pasar por una lista de dicts.
+# Con pyarrow se pide Arrow IPC y se leen los record batches del stream; si no, NDJSON por bloques.
+def api_export_dataframe(url, headers=None, chunksize=50000):
+    formato = "arrow" if pa is not None else "ndjson"
+    url = f"{url}{'&' if '?' in url else '?'}formato={formato}"
+    try:
+        with requests.get(url, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                print("Error al obtener datos:", response.status_code, response.text)
+                return None
+            response.raw.decode_content = True
+            if formato == "arrow":
+                return pa.ipc.open_stream(response.raw).read_pandas()
+            bloques = list(pd.read_json(response.raw, lines=True, chunksize=chunksize))
+            return pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame()
+    except Exception as e:
+        print("Request failed:", e)
+        return None
+
 # Función para redondear la fecha a los 15 minutos más cercanos
 def round_to_nearest_quarter_hour(dt, return_as_string=False, iso_format_string=False):
     # Si dt es un string, lo convertimos a datetime usando pandas
@@ -105,6 +166,66 @@ def calcular_recurrencia(url_eventos_previos, ip, fecha_evento, tipo_evento, int
 
     return int(recurrencia)
 
+# Eventos previos agrupados por (ip, problema, tipo_interferencia, fecha) entre start_date y end_date,
+# con columnas eventos y max_recurrencia. Un solo request a /eventos/get_recurrencia_agrupada; si la API
+# aún no lo tiene, se leen los eventos del rango con /eventos/get y se agrupan aquí.
+def get_recurrencia_agrupada(url_recurrencia, url_eventos, start_date, end_date, limit=1000):
+    columnas = ["ip", "problema", "tipo_interferencia", "fecha", "eventos", "max_recurrencia"]
+    data = api_request(f"{url_recurrencia}?start_date={start_date}&end_date={end_date}", dataframe=True)
+    if data is None:
+        print("Recurrencia agrupada no disponible, se agrupan los eventos de /eventos/get")
+        data = pd.DataFrame(api_request_offset(f"{url_eventos}?start_date={start_date}&end_date={end_date}", limit=limit) or [])
+        if data.empty:
+            return pd.DataFrame(columns=columnas)
+        detalle = data["detalle"].map(lambda d: json.loads(d) if isinstance(d, str) else d)
+        data["tipo_interferencia"] = detalle.map(lambda d: d.get("tipo_interferencia") if isinstance(d, dict) else None).fillna("")
+        data = (data.groupby(["ip", "problema", "tipo_interferencia", "fecha"])
+                    .agg(eventos=("recurrencia", "size"), max_recurrencia=("recurrencia", "max"))
+                    .reset_index())
+    if data.empty:
+        return pd.DataFrame(columns=columnas)
+    return data[columnas]
+
+# Recurrencia de todos los eventos candidatos de una pasada con un solo request.
+# 'candidatos' trae ip, problema, tipo_interferencia ("" si no aplica) y fecha (ya redondeada);
+# se devuelve con la columna 'recurrencia', calculada igual que calcular_recurrencia pero por
+# (ip, problema, tipo_interferencia): max(recurrencia previa, eventos previos) + 1 en la ventana
+# [fecha - intervalo_recurrencia - 5 s, fecha].
+def calcular_recurrencia_bulk(url_recurrencia, url_eventos, candidatos, intervalo_recurrencia):
+    candidatos = candidatos.copy()
+    candidatos["recurrencia"] = 1
+    if candidatos.empty:
+        return candidatos
+    candidatos["fecha"] = pd.to_datetime(candidatos["fecha"])
+    ventana = pd.Timedelta(minutes=intervalo_recurrencia, seconds=5)
+    previos = get_recurrencia_agrupada(
+        url_recurrencia, url_eventos,
+        start_date=(candidatos["fecha"].min() - ventana).strftime('%Y-%m-%dT%H:%M:%S'),
+        end_date=candidatos["fecha"].max().strftime('%Y-%m-%dT%H:%M:%S')
+    )
+    if previos.empty:
+        return candidatos
+
+    # 'problema' se compara sin mayúsculas ("Señal Deficiente" / "Señal deficiente")
+    claves = ["ip", "clave_problema", "tipo_interferencia"]
+    previos = previos.assign(
+        clave_problema=previos["problema"].str.lower(),
+        tipo_interferencia=previos["tipo_interferencia"].fillna(""),
+        fecha_previa=pd.to_datetime(previos["fecha"]),
+    )[claves + ["fecha_previa", "eventos", "max_recurrencia"]]
+    candidatos["clave_problema"] = candidatos["problema"].str.lower()
+
+    cruce = candidatos[claves + ["fecha"]].drop_duplicates().merge(previos, on=claves)
+    cruce = cruce[(cruce["fecha_previa"] >= cruce["fecha"] - ventana) & (cruce["fecha_previa"] <= cruce["fecha"])]
+    resumen = (cruce.groupby(claves + ["fecha"])
+                    .agg(eventos=("eventos", "sum"), max_recurrencia=("max_recurrencia", "max"))
+                    .reset_index())
+    resumen["recurrencia_previa"] = resumen[["eventos", "max_recurrencia"]].max(axis=1) + 1
+
+    candidatos = candidatos.merge(resumen[claves + ["fecha", "recurrencia_previa"]], on=claves + ["fecha"], how="left")
+    candidatos["recurrencia"] = candidatos["recurrencia_previa"].fillna(1).astype(int)
+    return candidatos.drop(columns=["clave_problema", "recurrencia_previa"])
+
 def mensaje_chat_gpt(client, mensaje, is_windows=False):
     response = client.chat.completions.create(
     model="gpt-4o-mini",
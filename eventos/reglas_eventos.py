@@ -0,0 +1,154 @@
+import json
+import numpy as np
+import pandas as pd
+from urllib.parse import urljoin, urlencode
+
+from functions_eventos import api_request_paginado, api_request_offset, calcular_recurrencia_bulk, DB_API_URL
+
+# Columnas de cada evento enviado a /eventos/add_list
+COLUMNAS_EVENTO = ["ip", "fecha", "nodo", "estado", "problema", "recurrencia", "urgente", "detalle"]
+_UMBRALES = ("alerta", "alarma", "recurrencia_alerta", "recurrencia_alarma")
+
+
+# Arma una regla desde un bloque de umbrales_urgencia (ver configEventos.yml)
+def _crear_regla(nombre, bloque, config, subtipo=None):
+    faltantes = [clave for clave in ("problema", "columna") + _UMBRALES if clave not in bloque]
+    if "fuente" not in bloque and "topico" not in bloque:
+        faltantes.append("fuente o topico")
+    if faltantes:
+        raise ValueError(f"Regla '{nombre}' sin {', '.join(faltantes)} en umbrales_urgencia")
+    url = None
+    if "fuente" in bloque:
+        grupo, endpoint = bloque["fuente"].split(".", 1)
+        url = urljoin(DB_API_URL, config["api"][grupo][endpoint])
+    return {
+        "nombre": nombre,
+        "problema": bloque["problema"],
+        "url": url,
+        "topico": bloque.get("topico"),
+        "parametros": bloque.get("parametros", {}),
+        "paginacion": bloque.get("paginacion", "cursor"),
+        "columna": bloque["columna"],
+        "detalle": bloque.get("detalle", bloque["columna"]),
+        "nodo": bloque.get("nodo", "ap"),
+        "subtipo": subtipo,
+        "mayor_es_peor": bloque["alarma"] > bloque["alerta"],
+        **{clave: bloque[clave] for clave in _UMBRALES},
+    }
+
+# Reglas del bloque umbrales_urgencia. Los sub-bloques con umbrales (snr_h, snr_v) son una regla cada uno:
+# heredan problema / fuente / parámetros del bloque padre y usan su nombre como columna y tipo_interferencia.
+def cargar_reglas(config):
+    reglas = []
+    for nombre, bloque in config.get("umbrales_urgencia", {}).items():
+        subreglas = {clave: valor for clave, valor in bloque.items() if isinstance(valor, dict) and "alerta" in valor}
+        comunes = {clave: valor for clave, valor in bloque.items() if clave not in subreglas}
+        if not subreglas:
+            reglas.append(_crear_regla(nombre, comunes, config))
+        for subtipo, subbloque in subreglas.items():
+            reglas.append(_crear_regla(f"{nombre}.{subtipo}", {"columna": subtipo, **comunes, **subbloque}, config, subtipo))
+    return reglas
+
+# Descarga los datos de cada regla en un DataFrame. Las reglas con la misma fuente y parámetros
+# (snr_h / snr_v) comparten una sola descarga; las que solo tienen 'topico' (solo en vivo) se omiten.
+# Devuelve [(regla, DataFrame)].
+def obtener_fuentes(reglas, start_date, end_date, limit=1000, offset=0):
+    descargas = {}
+    fuentes = []
+    for regla in reglas:
+        if regla["url"] is None:
+            continue
+        url = f"{regla['url']}?{urlencode({'start_date': start_date, 'end_date': end_date, **regla['parametros']})}"
+        if url not in descargas:
+            print(url)
+            if regla["paginacion"] == "offset":
+                datos = api_request_offset(url, limit=limit)
+            else:
+                datos = api_request_paginado(f"{url}&limit={limit}&offset={offset}")
+            if not datos:
+                print(f"No se pudo obtener datos para {regla['nombre']}.")
+            descargas[url] = pd.DataFrame(datos or [])
+        fuentes.append((regla, descargas[url]))
+    return fuentes
+
+# Valores numéricos de 'columna'; "info.sysTemperatura" lee la clave sysTemperatura del JSON de 'info'.
+# Los textos con unidad ("-95dBm", salida de RouterOS) se leen por su número inicial.
+def _valores(df, columna):
+    base, *ruta = columna.split(".")
+    if base not in df:
+        return pd.Series(np.nan, index=df.index)
+    valores = df[base]
+    for clave in ruta:
+        valores = valores.map(lambda d: json.loads(d) if isinstance(d, str) else d)
+        valores = valores.map(lambda d: d.get(clave) if isinstance(d, dict) else None)
+    if pd.api.types.is_numeric_dtype(valores):
+        return valores
+    texto = valores.astype(str).str.extract(r"^\s*([-+]?\d+(?:\.\d+)?)", expand=False)
+    return pd.to_numeric(valores, errors="coerce").fillna(pd.to_numeric(texto, errors="coerce"))
+
+# Evalúa una regla sobre todo el DataFrame: estado Alarma / Alerta con np.select y fecha al cuarto de hora
+def evaluar_regla(regla, df):
+    if df.empty:
+        return pd.DataFrame()
+    valores = _valores(df, regla["columna"]).to_numpy(dtype=float)
+    if regla["mayor_es_peor"]:
+        alarma, alerta = valores >= regla["alarma"], valores >= regla["alerta"]
+    else:
+        alarma, alerta = valores <= regla["alarma"], valores <= regla["alerta"]
+    estado = np.select([alarma, alerta], ["Alarma", "Alerta"], default="")
+    filas = estado != ""
+    if not filas.any():
+        return pd.DataFrame()
+
+    seleccion = df.loc[filas]
+    eventos = pd.DataFrame({
+        "ip": seleccion["ip"].to_numpy(),
+        "fecha": pd.to_datetime(seleccion["fecha"]).dt.round("15min").to_numpy(),
+        "nodo": regla["nodo"],
+        "estado": estado[filas],
+        "problema": regla["problema"],
+        "tipo_interferencia": regla["subtipo"] or "",
+        "recurrencia_urgente": np.where(estado[filas] == "Alarma", regla["recurrencia_alarma"], regla["recurrencia_alerta"]),
+    })
+    # Columna numérica directa: se conserva el valor tal como vino de la API
+    if regla["columna"] in df and pd.api.types.is_numeric_dtype(df[regla["columna"]]):
+        crudos = seleccion[regla["columna"]].tolist()
+    else:
+        crudos = valores[filas].tolist()
+    if regla["subtipo"]:
+        eventos["detalle"] = [{regla["detalle"]: valor, "tipo_interferencia": regla["subtipo"]} for valor in crudos]
+    else:
+        eventos["detalle"] = [{regla["detalle"]: valor} for valor in crudos]
+    return eventos
+
+# Candidatos a evento de todas las reglas en un DataFrame (vacío si no hay ninguno)
+def evaluar_fuentes(fuentes, verbose=True):
+    frames = []
+    for regla, df in fuentes:
+        eventos = evaluar_regla(regla, df)
+        if verbose:
+            alarmas = int((eventos["estado"] == "Alarma").sum()) if not eventos.empty else 0
+            print(f"{regla['nombre']}: {len(eventos)} eventos ({alarmas} alarmas) de {len(df)} registros")
+        if not eventos.empty:
+            frames.append(eventos)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+# Candidatos con 'recurrencia' -> lista de eventos para /eventos/add_list
+def candidatos_a_eventos(candidatos):
+    if candidatos.empty:
+        return []
+    candidatos = candidatos.copy()
+    # Las fechas ya están al cuarto de hora: se formatea cada valor distinto una sola vez
+    codigos, fechas = pd.factorize(candidatos["fecha"])
+    candidatos["fecha"] = np.asarray(pd.DatetimeIndex(fechas).strftime('%Y-%m-%dT%H:%M:%S'), dtype=object)[codigos]
+    candidatos["urgente"] = candidatos["recurrencia"] >= candidatos["recurrencia_urgente"]
+    # tolist() entrega tipos nativos para json.dumps (numpy.int64 / numpy.bool_ no son serializables)
+    columnas = [candidatos[columna].tolist() for columna in COLUMNAS_EVENTO]
+    return [dict(zip(COLUMNAS_EVENTO, fila)) for fila in zip(*columnas)]
+
+# Lista de eventos de todas las reglas, con la recurrencia calculada en bloque (un solo request)
+def generar_eventos(fuentes, url_recurrencia, url_eventos, intervalo_recurrencia):
+    candidatos = evaluar_fuentes(fuentes)
+    if candidatos.empty:
+        return []
+    return candidatos_a_eventos(calcular_recurrencia_bulk(url_recurrencia, url_eventos, candidatos, intervalo_recurrencia))
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+from datetime import datetime
+from db_pool import get_db
+from typing import Optional
+
+
+router = APIRouter()
+
+
+# --------------------- Recurrencia agrupada ---------------------
+@router.get("/get_recurrencia_agrupada", summary="Eventos previos agrupados por IP, problema, tipo de interferencia y fecha")
+def get_recurrencia_agrupada(
+    start_date: datetime = Query(..., description="Fecha de inicio de la consulta"),
+    end_date: datetime = Query(..., description="Fecha de fin de la consulta"),
+    problema: Optional[str] = Query(None, description="Filtrar por problema (opcional)"),
+    conn = Depends(get_db)
+):
+    """
+    Reemplaza una llamada a /eventos/get_ip/{ip} por cada evento candidato:
+    una sola consulta GROUP BY devuelve, para cada (ip, problema,
+    tipo_interferencia, fecha) del rango, la cantidad de eventos y la
+    recurrencia máxima. eventos.py suma las ventanas de recurrencia de cada
+    evento sobre estas filas (los eventos se guardan al cuarto de hora, así que
+    son pocas filas por IP).
+    """
+    where = "WHERE fecha >= %s AND fecha <= %s"
+    params = [start_date, end_date]
+    if problema:
+        where += " AND problema = %s"
+        params.append(problema)
+    try:
+        db_cursor = conn.cursor()
+        db_cursor.execute(f"""
+            SELECT ip, problema,
+                   JSON_VALUE(detalle, '$.tipo_interferencia') AS tipo_interferencia,
+                   fecha, COUNT(*) AS eventos, MAX(recurrencia) AS max_recurrencia
+            FROM eventos
+            {where}
+            GROUP BY ip, problema, tipo_interferencia, fecha
+        """, params)
+        column_names = [desc[0] for desc in db_cursor.description]
+        return [dict(zip(column_names, row)) for row in db_cursor.fetchall()]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener la recurrencia agrupada de eventos: {str(e)}")
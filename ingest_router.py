@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Query, Body, Depends
+from typing import Any, Dict, List
+from db_pool import get_db, get_pool
+
+from models.rajant_data_models import RajantData
+from models.sensores_models import Sensor
+from models.ubicacion_gps_models import UbicacionGPS
+from ingest_utils import validate_rows, bulk_write
+
+
+router = APIRouter()
+
+# Tablas cuyo add_list sigue en el paquete de la API; latencia y cambium_data
+# tienen su propio /add_bulk en sus routers (latencia además mantiene los rollups)
+BULK_MODELS = {
+    "rajant_data": RajantData,
+    "sensores": Sensor,
+    "ubicacion_gps": UbicacionGPS,
+}
+
+
+# --------------------- Ingesta masiva ---------------------
+# Rutas explícitas por tabla: un "/{table}/add_bulk" en la raíz taparía, según el
+# orden de montaje, los /add_bulk de latencia y cambium_data
+def _add_bulk(table: str, rows: List[Dict[str, Any]], on_duplicate: str, conn):
+    """
+    Mismo cuerpo que /{table}/add_list, pero validado una vez por columna en vez
+    de un modelo pydantic por fila y con las columnas JSON serializadas una sola
+    vez. Estas tablas no tienen clave única (ip, fecha) (ver migración 007), así
+    que on_duplicate no descarta filas repetidas.
+    """
+    columns, values = validate_rows(table, rows, BULK_MODELS[table])
+    return bulk_write(conn, table, columns, values, on_duplicate, load_data=get_pool().local_infile)
+
+@router.post("/rajant_data/add_bulk", summary="Ingesta masiva de rajant_data: validación por columnas e INSERT IGNORE / LOAD DATA")
+def add_rajant_data_bulk(
+    rows: List[Dict[str, Any]] = Body(..., description="Filas con los campos de RajantData"),
+    on_duplicate: str = Query("ignore", description="ignore | update | error ante un (ip, fecha) ya existente"),
+    conn = Depends(get_db)
+):
+    return _add_bulk("rajant_data", rows, on_duplicate, conn)
+
+@router.post("/sensores/add_bulk", summary="Ingesta masiva de sensores: validación por columnas e INSERT IGNORE / LOAD DATA")
+def add_sensores_bulk(
+    rows: List[Dict[str, Any]] = Body(..., description="Filas con los campos de Sensor"),
+    on_duplicate: str = Query("ignore", description="ignore | update | error ante un (ip, fecha) ya existente"),
+    conn = Depends(get_db)
+):
+    return _add_bulk("sensores", rows, on_duplicate, conn)
+
+@router.post("/ubicacion_gps/add_bulk", summary="Ingesta masiva de ubicacion_gps: validación por columnas e INSERT IGNORE / LOAD DATA")
+def add_ubicacion_gps_bulk(
+    rows: List[Dict[str, Any]] = Body(..., description="Filas con los campos de UbicacionGPS"),
+    on_duplicate: str = Query("ignore", description="ignore | update | error ante un (ip, fecha) ya existente"),
+    conn = Depends(get_db)
+):
+    return _add_bulk("ubicacion_gps", rows, on_duplicate, conn)
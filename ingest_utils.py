@@ -0,0 +1,216 @@
+from fastapi import HTTPException
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union, get_args, get_origin
+from mariadb import IntegrityError
+from pydantic import BaseModel
+import tempfile
+import json
+import os
+
+# Modos de /add_bulk ante filas que repiten la clave única (ip, fecha) de latencia y cambium_data (migración 007)
+ON_DUPLICATE_MODES = ("ignore", "update", "error")
+
+# Filas por executemany (el conector envía cada bloque con el protocolo bulk de MariaDB)
+CHUNK_ROWS = 10000
+
+# Desde este tamaño de lote se usa LOAD DATA LOCAL INFILE (requiere local_infile en el pool)
+LOAD_DATA_MIN_ROWS = 20000
+
+# LOAD DATA LOCAL necesita una ruta: se escribe en tmpfs para no tocar disco
+_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# ER_DUP_ENTRY: único warning aceptado tras un INSERT IGNORE / LOAD DATA ... IGNORE
+_DUPLICATE_KEY = 1062
+
+_MISSING = object()
+
+
+def _column_kind(annotation) -> Tuple[str, bool]:
+    """(tipo de validación, admite NULL) para la anotación de un campo pydantic."""
+    nullable = False
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        nullable = len(args) < len(get_args(annotation))
+        annotation = args[0] if len(args) == 1 else Any
+    origin = get_origin(annotation) or annotation
+    if origin in (dict, Dict, list, List):
+        return "json", nullable
+    if annotation in (int, float, bool, str, datetime, date):
+        return annotation.__name__, nullable
+    return "any", nullable
+
+
+# Tipos de Python aceptados por cada tipo de columna (sin coerción, como el JSON de los colectores)
+_ACCEPTED = {
+    "str": (str,),
+    "float": (float, int),
+    "int": (int,),
+    "bool": (bool,),
+    "datetime": (str, datetime),
+    "date": (str, date),
+    "json": (dict, list),
+}
+
+
+@lru_cache(maxsize=None)
+def table_schema(model) -> Tuple[Tuple[str, str, bool, Any], ...]:
+    """(columna, tipo, admite NULL, valor por defecto) de cada campo del modelo, calculado una vez."""
+    schema = []
+    for name, field in model.model_fields.items():
+        kind, nullable = _column_kind(field.annotation)
+        default = _MISSING if field.is_required() else field.get_default(call_default_factory=True)
+        schema.append((name, kind, nullable or default is None, default))
+    return tuple(schema)
+
+
+def validate_rows(table: str, rows: List[Dict[str, Any]], model) -> Tuple[List[str], List[tuple]]:
+    """
+    Valida un lote de filas JSON contra el esquema del modelo columna por columna
+    (un recorrido por columna en vez de instanciar un modelo pydantic por fila)
+    y serializa una sola vez las columnas JSON.
+
+    Devuelve (columnas, filas como tuplas) listas para bulk_write; si hay valores
+    faltantes o de otro tipo responde 422 con las primeras filas inválidas.
+    """
+    if not rows:
+        raise HTTPException(status_code=400, detail="La lista de datos está vacía.")
+    columns, values, errors = [], [], []
+    for name, kind, nullable, default in table_schema(model):
+        column = [row.get(name, default) for row in rows]
+        accepted = _ACCEPTED.get(kind)
+        if accepted:
+            allowed = {*accepted, type(None)} if nullable else set(accepted)
+            invalid = [i for i, value in enumerate(column) if type(value) not in allowed]
+            for i in invalid[:10]:
+                errors.append(f"fila {i}: '{name}' " + ("faltante" if column[i] is _MISSING else f"no es {kind} ({column[i]!r})"))
+        elif default is _MISSING:
+            errors.extend(f"fila {i}: '{name}' faltante" for i, value in enumerate(column) if value is _MISSING)
+        if kind == "json":
+            column = [None if value is None else json.dumps(value) for value in column]
+        columns.append(name)
+        values.append(column)
+    if errors:
+        raise HTTPException(status_code=422, detail=f"Datos inválidos para {table}: {'; '.join(errors[:20])}")
+    return columns, list(zip(*values))
+
+
+def rows_from_models(list_model: List[BaseModel], columns) -> List[tuple]:
+    """Filas de modelos ya validados por FastAPI, con las columnas dict/list serializadas una vez."""
+    if not list_model:
+        raise HTTPException(status_code=400, detail="La lista de datos está vacía.")
+    kinds = {name: kind for name, kind, _, _ in table_schema(type(list_model[0]))}
+    values = []
+    for name in columns:
+        column = [getattr(model, name) for model in list_model]
+        if kinds.get(name) in ("json", "any"):
+            column = [json.dumps(value) if isinstance(value, (dict, list)) else value for value in column]
+        values.append(column)
+    return list(zip(*values))
+
+
+def _tsv_value(value) -> str:
+    """Campo en el formato por defecto de LOAD DATA (tab, escape '\\', NULL como \\N)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if not isinstance(value, str):
+        return str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r").replace("\0", "\\0")
+
+
+def _load_data(cursor, table: str, columns: List[str], rows: List[tuple]) -> None:
+    with tempfile.NamedTemporaryFile("w", dir=_TMP_DIR, suffix=".tsv", encoding="utf-8") as buffer:
+        buffer.writelines("\t".join(map(_tsv_value, row)) + "\n" for row in rows)
+        buffer.flush()
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE '{buffer.name}' IGNORE INTO TABLE {table} "
+            f"CHARACTER SET utf8mb4 ({', '.join(columns)})"
+        )
+
+
+def _check_warnings(cursor, table: str) -> int:
+    """
+    IGNORE no solo salta las claves duplicadas: también convierte en warnings
+    los errores de conversión, truncamiento y NOT NULL (p.ej. una fecha mal
+    formada se guardaría como 0000-00-00). Devuelve cuántas filas se saltaron
+    por clave duplicada y responde 422 si hubo cualquier otro warning.
+    """
+    cursor.execute("SHOW WARNINGS")
+    warnings = cursor.fetchall()
+    invalid = [f"{message} ({code})" for _, code, message in warnings if code != _DUPLICATE_KEY]
+    if invalid:
+        raise HTTPException(status_code=422, detail=f"Datos inválidos para {table}: {'; '.join(invalid[:10])}")
+    return len(warnings)
+
+
+def bulk_write(
+    conn,
+    table: str,
+    columns,
+    rows: List[tuple],
+    on_duplicate: str = "ignore",
+    load_data: bool = False,
+    commit: bool = True,
+) -> Dict[str, Any]:
+    """
+    Inserta un lote ya serializado.
+
+    - on_duplicate="ignore": INSERT IGNORE, las filas con (ip, fecha) ya
+      existentes se cuentan como duplicadas en vez de hacer fallar el lote.
+    - on_duplicate="update": INSERT ... ON DUPLICATE KEY UPDATE con los valores nuevos.
+    - on_duplicate="error": INSERT simple, un duplicado responde 422 (comportamiento anterior).
+
+    Con load_data=True (conexión con local_infile) y lotes de LOAD_DATA_MIN_ROWS
+    filas o más en modo "ignore", se usa LOAD DATA LOCAL INFILE.
+    Con commit=False la transacción queda abierta para que el llamador agregue
+    sus propias escrituras (p.ej. los rollups de latencia) antes de confirmar.
+    Si MariaDB deja warnings que no son de clave duplicada, el lote completo se
+    descarta y se responde 422.
+    """
+    if on_duplicate not in ON_DUPLICATE_MODES:
+        raise HTTPException(status_code=400, detail=f"on_duplicate no soportado: {on_duplicate}. Use {', '.join(ON_DUPLICATE_MODES)}")
+    columns = list(columns)
+    cursor = conn.cursor()
+    duplicates, affected = 0, 0
+    try:
+        # SHOW WARNINGS lista hasta max_error_count (64 por defecto): se amplía para
+        # contar todos los duplicados de un bloque (la sesión se resetea al volver al pool)
+        cursor.execute("SET SESSION max_error_count = 65535")
+        if load_data and on_duplicate == "ignore" and len(rows) >= LOAD_DATA_MIN_ROWS:
+            method = "load_data"
+            _load_data(cursor, table, columns, rows)
+            duplicates = _check_warnings(cursor, table)
+        else:
+            query = f"INSERT {'IGNORE ' if on_duplicate == 'ignore' else ''}INTO {table} ({', '.join(columns)}) " \
+                    f"VALUES ({', '.join(['%s'] * len(columns))})"
+            if on_duplicate == "update":
+                query += " ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = VALUES({c})" for c in columns if c not in ("ip", "fecha"))
+            method = "executemany"
+            for start in range(0, len(rows), CHUNK_ROWS):
+                cursor.executemany(query, rows[start:start + CHUNK_ROWS])
+                # -1: el conector no informa las filas afectadas
+                affected = None if affected is None or cursor.rowcount < 0 else affected + cursor.rowcount
+                duplicates += _check_warnings(cursor, table)
+        if commit:
+            conn.commit()
+    except HTTPException:
+        conn.rollback()
+        raise
+    except IntegrityError as e:
+        conn.rollback()
+        raise HTTPException(status_code=422, detail=f"Error de integridad: {str(e)}")
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al insertar datos en {table}: {str(e)}")
+
+    result = {"message": f"Datos insertados en {table} exitosamente", "total_registros": len(rows), "metodo": method}
+    if on_duplicate == "update":
+        # MariaDB cuenta 2 filas afectadas por cada fila actualizada (None si no se informa)
+        result["filas_afectadas"] = affected
+    else:
+        # Los duplicados salen de los warnings 1062, no de rowcount
+        result["insertados"] = len(rows) - duplicates
+        result["duplicados"] = duplicates
+    return result
@@ -1,131 +1,388 @@
-from fastapi import APIRouter, Request, HTTPException, Query, Path
+from fastapi import APIRouter, Request, HTTPException, Query, Path, Response, Depends
 from datetime import datetime, timedelta
 from typing import List
-from connection import get_db_connection
-from typing import Optional
+from db_pool import get_db, get_pool
+from typing import Optional, Dict, Any
+from types import SimpleNamespace
 from mariadb import IntegrityError
 from fastapi import Body
 
 from models.latencia_models import Latencia
-from routes.__utils__ import insert_data, insert_bulk_data, fetch_data_with_dates, fetch_data_with_filter_and_pagination
+from ingest_utils import validate_rows, rows_from_models, bulk_write
+from query_utils import fetch_page, set_next_cursor, round_to_quarter_hour, stream_export
 
 router = APIRouter()
 
+
+class LatenciaMuestras(Latencia):
+    """
+    Latencia con las estadísticas de una ráfaga de N echos (update_general.py -n N).
+    'latencia' es el promedio de la ráfaga (-1 si se perdieron todos los echos).
+    Con una sola muestra los campos adicionales quedan en NULL.
+    """
+    latencia_min    : Optional[float] = None
+    latencia_max    : Optional[float] = None
+    jitter          : Optional[float] = None    # mdev de la ráfaga (ms)
+    perdida         : Optional[float] = None    # % de echos sin respuesta
+    muestras        : Optional[int]   = None    # echos enviados
+
+# --------------------- Rollups ---------------------
+# (tabla, tamaño del bucket en segundos), de mayor a menor granularidad
+_ROLLUPS = [
+    ("latencia_rollup_1h", 3600),
+    ("latencia_rollup_15m", 900),
+    ("latencia_rollup_1m", 60),
+]
+
+_ROLLUP_COLUMNS = [
+    "total_mediciones", "suma_latencia", "mediciones_validas", "suma_validas",
+    "min_latencia", "max_latencia", "latencia_100_200", "latencia_mayor_200",
+    "latencia_mayor_100", "desconexiones",
+    "mediciones_multimuestra", "suma_jitter", "paquetes_enviados", "paquetes_perdidos",
+    "min_muestra", "max_muestra",
+]
+
+# Columnas de rollup que no se suman: se combinan con LEAST / GREATEST
+_MIN_COLUMNS = ("min_latencia", "min_muestra")
+_MAX_COLUMNS = ("max_latencia", "max_muestra")
+
+# Mismas columnas que los rollups, calculadas sobre la tabla cruda
+_RAW_AGGREGATES = """
+    COUNT(latencia) AS total_mediciones,
+    COALESCE(SUM(latencia), 0) AS suma_latencia,
+    COUNT(CASE WHEN latencia > 0 THEN 1 END) AS mediciones_validas,
+    COALESCE(SUM(CASE WHEN latencia > 0 THEN latencia END), 0) AS suma_validas,
+    MIN(CASE WHEN latencia > 0 THEN latencia END) AS min_latencia,
+    MAX(latencia) AS max_latencia,
+    COUNT(CASE WHEN latencia BETWEEN 100 AND 200 THEN 1 END) AS latencia_100_200,
+    COUNT(CASE WHEN latencia > 200 THEN 1 END) AS latencia_mayor_200,
+    COUNT(CASE WHEN latencia > 100 THEN 1 END) AS latencia_mayor_100,
+    COUNT(CASE WHEN latencia <= 0 THEN 1 END) AS desconexiones,
+    COUNT(jitter) AS mediciones_multimuestra,
+    COALESCE(SUM(jitter), 0) AS suma_jitter,
+    COALESCE(SUM(muestras), 0) AS paquetes_enviados,
+    COALESCE(SUM(ROUND(muestras * perdida / 100)), 0) AS paquetes_perdidos,
+    MIN(latencia_min) AS min_muestra,
+    MAX(latencia_max) AS max_muestra
+"""
+
+def _bucket_sql(column: str, size: int) -> str:
+    return f"TIMESTAMP(DATE({column}), SEC_TO_TIME(TIME_TO_SEC(TIME({column})) DIV {size} * {size}))"
+
+def _floor_bucket(dt: datetime, size: int) -> datetime:
+    """Inicio del bucket de 'size' segundos que contiene dt (igual que _bucket_sql)."""
+    dt = dt.replace(second=0, microsecond=0)
+    return dt - timedelta(minutes=(dt.hour * 60 + dt.minute) % (size // 60))
+
+def _ceil_bucket(dt: datetime, size: int) -> datetime:
+    floor = _floor_bucket(dt, size)
+    return floor if floor == dt else floor + timedelta(seconds=size)
+
+def _to_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+def _aggregate_models(list_model: List[Latencia], size: int) -> List[tuple]:
+    """Agrega los modelos recién insertados por (bucket, ip) con la semántica de _RAW_AGGREGATES."""
+    buckets = {}
+    for model in list_model:
+        lat = float(model.latencia)
+        key = (_floor_bucket(_to_datetime(model.fecha), size), model.ip)
+        b = buckets.setdefault(key, [0, 0.0, 0, 0.0, None, None, 0, 0, 0, 0, 0, 0.0, 0, 0, None, None])
+        b[0] += 1
+        b[1] += lat
+        if lat > 0:
+            b[2] += 1
+            b[3] += lat
+            b[4] = lat if b[4] is None else min(b[4], lat)
+        b[5] = lat if b[5] is None else max(b[5], lat)
+        if 100 <= lat <= 200:
+            b[6] += 1
+        if lat > 200:
+            b[7] += 1
+        if lat > 100:
+            b[8] += 1
+        if lat <= 0:
+            b[9] += 1
+        # Campos multi-muestra (solo LatenciaMuestras con ráfagas)
+        jitter, muestras, perdida = getattr(model, "jitter", None), getattr(model, "muestras", None), getattr(model, "perdida", None)
+        lat_min, lat_max = getattr(model, "latencia_min", None), getattr(model, "latencia_max", None)
+        if jitter is not None:
+            b[10] += 1
+            b[11] += jitter
+        if muestras is not None:
+            b[12] += muestras
+            if perdida is not None:
+                b[13] += round(muestras * perdida / 100)
+        if lat_min is not None:
+            b[14] = lat_min if b[14] is None else min(b[14], lat_min)
+        if lat_max is not None:
+            b[15] = lat_max if b[15] is None else max(b[15], lat_max)
+    return [(bucket, ip, *values) for (bucket, ip), values in buckets.items()]
+
+def _update_rollups(cursor, list_model: List[Latencia]):
+    """Suma incrementalmente las filas nuevas a los tres niveles de rollup (sin commit)."""
+    placeholders = ", ".join(["%s"] * (len(_ROLLUP_COLUMNS) + 2))
+    additive = [c for c in _ROLLUP_COLUMNS if c not in _MIN_COLUMNS + _MAX_COLUMNS]
+    updates = ", ".join(f"{c} = {c} + VALUES({c})" for c in additive)
+    for func, columns in (("LEAST", _MIN_COLUMNS), ("GREATEST", _MAX_COLUMNS)):
+        updates += "".join(f", {c} = {func}(COALESCE({c}, VALUES({c})), COALESCE(VALUES({c}), {c}))" for c in columns)
+    for table, size in _ROLLUPS:
+        cursor.executemany(
+            f"INSERT INTO {table} (bucket, ip, {', '.join(_ROLLUP_COLUMNS)}) VALUES ({placeholders}) "
+            f"ON DUPLICATE KEY UPDATE {updates}",
+            _aggregate_models(list_model, size)
+        )
+
+def _refresh_rollups(conn, list_model, result: dict):
+    """
+    Si entraron todas las filas del lote se suman a los rollups; si hubo
+    duplicados ignorados o actualizados no se sabe cuáles cambiaron, así que
+    se recalcula el rango de fechas del lote.
+    Usa la conexión del request: las filas crudas (insertadas por bulk_write
+    con commit=False) y los rollups se confirman en la misma transacción.
+    """
+    try:
+        cursor = conn.cursor()
+        if result.get("insertados") == result["total_registros"]:
+            _update_rollups(cursor, list_model)
+        else:
+            fechas = [_to_datetime(model.fecha) for model in list_model]
+            _rebuild_rollups(cursor, min(fechas), max(fechas))
+        conn.commit()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al actualizar los rollups de latencia: {str(e)}")
+
+def _rebuild_rollups(cursor, start_date: datetime, end_date: Optional[datetime] = None):
+    """
+    Recalcula desde la tabla cruda los buckets que tocan [start_date, end_date]
+    (sin end_date, hasta el final). Se usa tras delete/update y para compactar.
+    """
+    for table, size in _ROLLUPS:
+        desde = _floor_bucket(start_date, size)
+        where, params = "WHERE fecha >= %s", [desde]
+        where_rollup = "WHERE bucket >= %s"
+        if end_date:
+            hasta = _floor_bucket(end_date, size) + timedelta(seconds=size)
+            where += " AND fecha < %s"
+            where_rollup += " AND bucket < %s"
+            params.append(hasta)
+        cursor.execute(f"DELETE FROM {table} {where_rollup}", params)
+        cursor.execute(f"""
+            INSERT INTO {table} (bucket, ip, {', '.join(_ROLLUP_COLUMNS)})
+            SELECT {_bucket_sql('fecha', size)} AS bucket, ip, {_RAW_AGGREGATES}
+            FROM latencia {where}
+            GROUP BY bucket, ip
+        """, params)
+
+def _split_range(lo: datetime, hi: datetime, levels) -> tuple:
+    """Divide [lo, hi) en tramos alineados a los rollups más gruesos y bordes crudos."""
+    if lo >= hi:
+        return [], []
+    if not levels:
+        return [], [(lo, hi)]
+    table, size = levels[0]
+    a, b = _ceil_bucket(lo, size), _floor_bucket(hi, size)
+    if a >= b:
+        return _split_range(lo, hi, levels[1:])
+    left_rollups, left_raw = _split_range(lo, a, levels[1:])
+    right_rollups, right_raw = _split_range(b, hi, levels[1:])
+    return left_rollups + [(table, a, b)] + right_rollups, left_raw + right_raw
+
+def _latencia_sources(start_date: Optional[datetime], end_date: Optional[datetime]) -> tuple:
+    """
+    SQL (UNION ALL) con columnas (ip, _ROLLUP_COLUMNS) que cubre exactamente el rango:
+    rollups para los tramos alineados y la tabla 'latencia' solo para los bordes.
+    Sin ambos extremos del rango se consulta solo la tabla cruda.
+    """
+    if not (start_date and end_date):
+        where, params = "WHERE 1=1", []
+        if start_date:
+            where += " AND fecha >= %s"; params.append(start_date)
+        if end_date:
+            where += " AND fecha <= %s"; params.append(end_date)
+        return f"SELECT ip, {_RAW_AGGREGATES} FROM latencia {where} GROUP BY ip", params
+
+    # fecha <= end_date  ->  intervalo semiabierto [start_date, end_date + 1µs)
+    rollups, raw = _split_range(start_date, end_date + timedelta(microseconds=1), _ROLLUPS)
+    parts, params = [], []
+    for table, desde, hasta in rollups:
+        parts.append(f"SELECT ip, {', '.join(_ROLLUP_COLUMNS)} FROM {table} WHERE bucket >= %s AND bucket < %s")
+        params.extend([desde, hasta])
+    for desde, hasta in raw:
+        parts.append(f"SELECT ip, {_RAW_AGGREGATES} FROM latencia WHERE fecha >= %s AND fecha < %s GROUP BY ip")
+        params.extend([desde, hasta])
+    if not parts:
+        parts.append(f"SELECT ip, {_RAW_AGGREGATES} FROM latencia WHERE 1=0 GROUP BY ip")
+    return "\nUNION ALL\n".join(parts), params
+
+
+# --------------------- Endpoints ---------------------
 @router.post("/add")
-def add_latencia(latencia: Latencia):
-    return insert_data("latencia", latencia)
+def add_latencia(latencia: LatenciaMuestras, conn = Depends(get_db)):
+    columns = list(LatenciaMuestras.model_fields.keys())
+    result = bulk_write(conn, "latencia", columns, rows_from_models([latencia], columns), on_duplicate="error", commit=False)
+    _refresh_rollups(conn, [latencia], result)
+    return result
 
 @router.post("/add_list")
-def add_latencia_list(list_model: List[Latencia]):
-    return insert_bulk_data("latencia", list_model, Latencia.model_fields.keys())
+def add_latencia_list(list_model: List[LatenciaMuestras], conn = Depends(get_db)):
+    columns = list(LatenciaMuestras.model_fields.keys())
+    result = bulk_write(conn, "latencia", columns, rows_from_models(list_model, columns),
+                        load_data=get_pool().local_infile, commit=False)
+    _refresh_rollups(conn, list_model, result)
+    return result
+
+@router.post("/add_bulk", summary="Ingesta masiva de latencia: validación por columnas e INSERT IGNORE / LOAD DATA")
+def add_latencia_bulk(
+    rows: List[Dict[str, Any]] = Body(..., description="Filas con los campos de LatenciaMuestras"),
+    on_duplicate: str = Query("ignore", description="ignore | update | error ante un (ip, fecha) ya existente"),
+    conn = Depends(get_db)
+):
+    columns, values = validate_rows("latencia", rows, LatenciaMuestras)
+    result = bulk_write(conn, "latencia", columns, values, on_duplicate, load_data=get_pool().local_infile, commit=False)
+    _refresh_rollups(conn, [SimpleNamespace(**dict(zip(columns, row))) for row in values], result)
+    return result
+
+@router.post("/rebuild_rollups", summary="Recalcular los rollups de latencia (1 min / 15 min / 1 h) para un rango de fechas")
+def rebuild_latencia_rollups(
+    start_date: datetime = Query(..., description="Fecha de inicio a recalcular"),
+    end_date: Optional[datetime] = Query(None, description="Fecha de fin a recalcular (por defecto, hasta el final)"),
+    conn = Depends(get_db)
+):
+    try:
+        cursor = conn.cursor()
+        _rebuild_rollups(cursor, start_date, end_date)
+        conn.commit()
+        return {"message": f"Rollups de latencia recalculados desde {start_date}" + (f" hasta {end_date}" if end_date else "")}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al recalcular los rollups: {str(e)}")
 
 
 
 @router.get("/get", summary="Obtener datos de latencia de la base de datos por rangos de tiempo y con paginación")
 def get_latencia(
+    response: Response,
     start_date: Optional[datetime] = Query(None, description="Fecha de inicio de la consulta"),
     end_date: Optional[datetime] = Query(None, description="Fecha de fin de la consulta"),
-    offset: int = Query(0, description="Número de registros a omitir"),
+    offset: int = Query(0, description="Número de registros a omitir (se ignora si se envía cursor)"),
     limit: int = Query(1000, description="Número de registros a mostrar"),
-    round_dates: Optional[bool] = Query(False, description="Redondear la fecha a la hora más cercana")
+    round_dates: Optional[bool] = Query(False, description="Redondear la fecha a la hora más cercana"),
+    cursor: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    conn = Depends(get_db)
 ):
-    return fetch_data_with_dates("latencia", start_date, end_date, limit, offset, round_dates)
+    try:
+        db_cursor = conn.cursor()
+        rows, next_cursor = fetch_page(db_cursor, "latencia", start_date=start_date, end_date=end_date,
+                                       limit=limit, offset=offset, cursor=cursor)
+        if round_dates:
+            for row in rows:
+                row["fecha"] = round_to_quarter_hour(row["fecha"])
+        set_next_cursor(response, next_cursor)
+        return rows
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener los datos: {str(e)}")
         
 
 @router.get("/get_ip/{ip}", summary="Obtener datos de latencia de la base de datos por IP, por rangos de tiempo y con paginación")
 def get_latencia_by_ip(
+    response: Response,
     ip: str = Path(..., description="Dirección IP de la latencia"),
     start_date: Optional[datetime] = Query(None, description="Fecha de inicio de la consulta"),
     end_date: Optional[datetime] = Query(None, description="Fecha de fin de la consulta"),
-    offset: int = Query(0, description="Número de registros a omitir"),
+    offset: int = Query(0, description="Número de registros a omitir (se ignora si se envía cursor)"),
     limit: int = Query(1000, description="Número de registros a mostrar"),
+    cursor: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    conn = Depends(get_db)
 ):
-    return fetch_data_with_filter_and_pagination("latencia", "ip", ip, start_date, end_date, limit, offset)
+    try:
+        db_cursor = conn.cursor()
+        rows, next_cursor = fetch_page(db_cursor, "latencia", where=["ip = %s"], params=[ip],
+                                       start_date=start_date, end_date=end_date,
+                                       limit=limit, offset=offset, cursor=cursor)
+        set_next_cursor(response, next_cursor)
+        return rows
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener los datos: {str(e)}")
 
 @router.get("/get_poor_latency", summary="Obtener datos de latencia mayores a 100 ms, con rango de fechas, paginación y opción de aproximar la fecha al cuarto de hora")
 def get_poor_latency(
+    response: Response,
     start_date: Optional[datetime] = Query(None, description="Fecha de inicio de la consulta"),
     end_date: Optional[datetime] = Query(None, description="Fecha de fin de la consulta"),
-    offset: int = Query(0, description="Número de registros a omitir"),
+    offset: int = Query(0, description="Número de registros a omitir (se ignora si se envía cursor)"),
     limit: int = Query(1000, description="Número de registros a mostrar"),
-    aprox_date: bool = Query(False, description="Si es True, redondea la columna fecha al cuarto de hora más cercano")
+    aprox_date: bool = Query(False, description="Si es True, redondea la columna fecha al cuarto de hora más cercano"),
+    cursor: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    conn = Depends(get_db)
 ):
     """
     Recupera registros de latencia mayores a 100ms.
     Si aprox_date es True, la columna 'fecha' se redondea al cuarto de hora.
+    El cursor siempre se arma con la fecha original, no con la redondeada.
     """
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        params = []
+        db_cursor = conn.cursor()
 
         # ✅ Selección de columnas con o sin redondeo
         if aprox_date:
-            select = "SELECT id, ip, latencia, FROM_UNIXTIME(ROUND(UNIX_TIMESTAMP(fecha) / 900) * 900) AS fecha, fecha_DB"
+            select = "id, ip, latencia, FROM_UNIXTIME(ROUND(UNIX_TIMESTAMP(fecha) / 900) * 900) AS fecha, fecha_DB"
         else:
-            select = "SELECT *"
-
-        base_query = f"{select} FROM latencia WHERE latencia > 100"
-
-        if start_date:
-            base_query += " AND fecha >= %s"
-            params.append(start_date)
-        if end_date:
-            base_query += " AND fecha <= %s"
-            params.append(end_date)
-
-        base_query += " ORDER BY fecha DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
+            select = "*"
 
-        cursor.execute(base_query, params)
-        column_names = [desc[0] for desc in cursor.description]
-        rows = cursor.fetchall()
-
-        return [dict(zip(column_names, row)) for row in rows]
+        rows, next_cursor = fetch_page(db_cursor, "latencia", select=select, where=["latencia > 100"],
+                                       start_date=start_date, end_date=end_date,
+                                       limit=limit, offset=offset, cursor=cursor)
+        set_next_cursor(response, next_cursor)
+        return rows
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener los datos: {str(e)}")
-    finally:
-        conn.close()
 
 
 
 
 @router.get("/get_fechadb", summary="Obtener datos de latencia de la base de datos por rangos de tiempo y con paginación")
 def get_latencia(
+    response: Response,
     start_date: datetime = Query(..., description="Fecha de inicio de la consulta (obligatoria, formato: YYYY-MM-DD)"),
     end_date: datetime = Query(..., description="Fecha de fin de la consulta (obligatoria, formato: YYYY-MM-DD)"),
-    offset: int = Query(0, description="Número de registros a omitir"),
-    limit: int = Query(1000, description="Número de registros a mostrar")
+    offset: int = Query(0, description="Número de registros a omitir (se ignora si se envía cursor)"),
+    limit: int = Query(1000, description="Número de registros a mostrar"),
+    cursor: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    conn = Depends(get_db)
 ):
-    """Función genérica para recuperar datos con paginación."""
+    """Función genérica para recuperar datos con paginación (ordenados por fecha_DB)."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        query = f"SELECT * FROM latencia WHERE 1=1"
-        params = []
-
-        if start_date:
-            query += " AND fecha_DB >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND fecha_DB <= %s"
-            params.append(end_date)
-
-        query += " ORDER BY fecha_DB DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        column_names = [desc[0] for desc in cursor.description]
-        rows = cursor.fetchall()
-
-        return [dict(zip(column_names, row)) for row in rows]
+        db_cursor = conn.cursor()
+        rows, next_cursor = fetch_page(db_cursor, "latencia", start_date=start_date, end_date=end_date,
+                                       limit=limit, offset=offset, cursor=cursor, order_column="fecha_DB")
+        set_next_cursor(response, next_cursor)
+        return rows
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener los datos: {str(e)}")
-    finally:
-        conn.close()
         
+
+@router.get("/export", summary="Exportar el histórico de latencia en streaming (NDJSON o Arrow IPC), con rango de fechas y filtro por IP opcional")
+def export_latencia(
+    start_date: Optional[datetime] = Query(None, description="Fecha de inicio de la consulta"),
+    end_date: Optional[datetime] = Query(None, description="Fecha de fin de la consulta"),
+    ip: Optional[str] = Query(None, description="Filtrar por dirección IP"),
+    formato: str = Query("ndjson", description="Formato de salida: ndjson o arrow"),
+    batch_size: int = Query(5000, ge=1, le=100000, description="Filas por bloque leído de la base de datos")
+):
+    where, params = ([], []) if ip is None else (["ip = %s"], [ip])
+    return stream_export("latencia", where, params, start_date, end_date, formato, batch_size)
+
+
 from fastapi import Body
 
 @router.delete("/delete", summary="Eliminar datos de latencia desde una fecha específica (por defecto, hace 7 días)")
@@ -133,33 +390,32 @@ def delete_latencia_from_date(
     from_date: Optional[datetime] = Query(
         default_factory=lambda: datetime.now() - timedelta(days=7),
         description="Fecha desde la cual eliminar registros (por defecto, hace 7 días)"
-    )
+    ),
+    conn = Depends(get_db)
 ):
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         delete_query = "DELETE FROM latencia WHERE fecha >= %s"
         cursor.execute(delete_query, (from_date,))
         deleted_count = cursor.rowcount
+        _rebuild_rollups(cursor, from_date)
         
         conn.commit()
         return {"message": f"{deleted_count} registros eliminados desde {from_date}"}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al eliminar los datos: {str(e)}")
-    finally:
-        conn.close()
 
 
 @router.put("/update", summary="Actualizar un registro de latencia por IP y fecha")
 def update_latencia_by_ip_and_date(
     ip: str = Query(..., description="Dirección IP del registro a actualizar"),
     fecha: datetime = Query(..., description="Fecha exacta del registro a actualizar"),
-    latencia: Latencia = Body(..., description="Nuevos datos del registro")
+    latencia: Latencia = Body(..., description="Nuevos datos del registro"),
+    conn = Depends(get_db)
 ):
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
 
         update_query = """
@@ -171,17 +427,18 @@ def update_latencia_by_ip_and_date(
             latencia.ip, latencia.latencia, latencia.fecha, latencia.fecha_DB, ip, fecha
         )
         cursor.execute(update_query, values)
-        conn.commit()
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Registro no encontrado con esa IP y fecha")
 
+        _rebuild_rollups(cursor, fecha, fecha)
+        _rebuild_rollups(cursor, _to_datetime(latencia.fecha), _to_datetime(latencia.fecha))
+        conn.commit()
+
         return {"message": f"Registro con IP {ip} y fecha {fecha} actualizado correctamente"}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al actualizar el registro: {str(e)}")
-    finally:
-        conn.close()
 
 
 @router.get(
@@ -193,121 +450,7 @@ def get_latencia_stats(
     end_date: Optional[datetime] = Query(None, description="Fecha de fin"),
     offset: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(1000, gt=0, description="Número de registros a mostrar"),
-):
-    """
-    Devuelve UNA fila por IP en el rango dado.
-    Incluye:
-      - max_latencia, promedio_latencia, min_latencia (>0)
-      - total_mediciones, latencia_100_200, latencia_mayor_200
-      - desconexiones (latencia <= 0)   # si quieres solo -1, reemplaza por (l.latencia = -1)
-      - y datos de inventario (marca, rol, tipo, snmp_conf, anotacion, gps, tag)
-    """
-
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        params = []
-
-        select_columns = """
-            l.ip,
-            MAX(l.latencia) AS max_latencia,
-            AVG(l.latencia) AS promedio_latencia,
-            COUNT(l.latencia) AS total_mediciones,
-            /* mínimo de latencia considerando solo valores positivos */
-            MIN(CASE WHEN l.latencia > 0 THEN l.latencia END) AS min_latencia,
-            COUNT(CASE WHEN l.latencia BETWEEN 100 AND 200 THEN 1 END) AS latencia_100_200,
-            COUNT(CASE WHEN l.latencia > 200 THEN 1 END) AS latencia_mayor_200,
-            /* conteo de desconexiones: latencia <= 0 (o usa = -1 si lo prefieres) */
-            COUNT(CASE WHEN l.latencia <= 0 THEN 1 END) AS desconexiones,
-            MAX(i.marca) AS marca,
-            MAX(i.rol) AS rol,
-            MAX(i.tipo) AS tipo,
-            MAX(i.snmp_conf) AS snmp_conf,
-            MAX(i.anotacion) AS anotacion,
-            MAX(i.gps) AS gps,
-            MAX(i.tag) AS tag
-        """
-
-        base_query = f"""
-            SELECT {select_columns}
-            FROM latencia l
-            LEFT JOIN inventario i ON l.ip = i.ip
-            WHERE 1=1
-        """
-
-        if start_date:
-            base_query += " AND l.fecha >= %s"
-            params.append(start_date)
-        if end_date:
-            base_query += " AND l.fecha <= %s"
-            params.append(end_date)
-
-        base_query += " GROUP BY l.ip"
-
-        base_query += """
-            ORDER BY latencia_mayor_200 DESC, promedio_latencia DESC, max_latencia DESC
-            LIMIT %s OFFSET %s
-        """
-        params.extend([limit, offset])
-
-        cursor.execute(base_query, params)
-        column_names = [desc[0] for desc in cursor.description]
-        rows = cursor.fetchall()
-
-        results = []
-        for row in rows:
-            r = dict(zip(column_names, row))
-            # Redondeos de presentación
-            if r.get("max_latencia") is not None:
-                r["max_latencia"] = round(float(r["max_latencia"]), 3)
-            if r.get("promedio_latencia") is not None:
-                r["promedio_latencia"] = round(float(r["promedio_latencia"]), 3)
-            if r.get("min_latencia") is not None:
-                r["min_latencia"] = round(float(r["min_latencia"]), 3)
-            results.append(r)
-
-        # Total de IPs distintas en el rango
-        count_query = """
-            SELECT COUNT(DISTINCT l.ip)
-            FROM latencia l
-            WHERE 1=1
-        """
-        count_params = []
-        if start_date:
-            count_query += " AND l.fecha >= %s"
-            count_params.append(start_date)
-        if end_date:
-            count_query += " AND l.fecha <= %s"
-            count_params.append(end_date)
-
-        cursor.execute(count_query, count_params)
-        total_records = cursor.fetchone()[0] or 0
-
-        return {
-            "data": results,
-            "total_records": int(total_records),
-            "returned_records": len(results),
-            "offset": offset,
-            "limit": limit,
-        }
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener los datos: {str(e)}")
-    finally:
-        try:
-            conn.close()
-        except:
-            pass
-
-@router.get(
-    "/get_latencia_stats",
-    summary="Obtener estadísticas de latencia (una fila por IP) con datos de inventario"
-)
-def get_latencia_stats(
-    start_date: Optional[datetime] = Query(None, description="Fecha de inicio"),
-    end_date: Optional[datetime] = Query(None, description="Fecha de fin"),
-    offset: int = Query(0, ge=0, description="Número de registros a omitir"),
-    limit: int = Query(1000, gt=0, description="Número de registros a mostrar"),
+    conn = Depends(get_db)
 ):
     """
     Devuelve UNA fila por IP en el rango dado.
@@ -319,55 +462,46 @@ def get_latencia_stats(
       - latencia_100_200
       - latencia_mayor_200
       - desconexiones (latencia <=0)
+      - jitter_promedio, perdida_porcentaje, min_muestra, max_muestra
+        (solo mediciones multi-muestra; NULL si no hay)
       - y datos de inventario (marca, rol, tipo, snmp_conf, anotacion, gps, tag)
+    Con start_date y end_date se responde desde los rollups y solo los bordes
+    no alineados se leen de la tabla cruda.
     """
 
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
-        params = []
-
-        select_columns = """
-            l.ip,
-            MAX(l.latencia) AS max_latencia,
-            AVG(CASE WHEN l.latencia > 0 THEN l.latencia END) AS promedio_latencia,
-            COUNT(l.latencia) AS total_mediciones,
-            MIN(CASE WHEN l.latencia > 0 THEN l.latencia END) AS min_latencia,
-            COUNT(CASE WHEN l.latencia BETWEEN 100 AND 200 THEN 1 END) AS latencia_100_200,
-            COUNT(CASE WHEN l.latencia > 200 THEN 1 END) AS latencia_mayor_200,
-            COUNT(CASE WHEN l.latencia <= 0 THEN 1 END) AS desconexiones,
-            MAX(i.marca) AS marca,
-            MAX(i.rol) AS rol,
-            MAX(i.tipo) AS tipo,
-            MAX(i.snmp_conf) AS snmp_conf,
-            MAX(i.anotacion) AS anotacion,
-            MAX(i.gps) AS gps,
-            MAX(i.tag) AS tag
-        """
+        sources, params = _latencia_sources(start_date, end_date)
 
         base_query = f"""
-            SELECT {select_columns}
-            FROM latencia l
-            LEFT JOIN inventario i ON l.ip = i.ip
-            WHERE 1=1
-        """
-
-        if start_date:
-            base_query += " AND l.fecha >= %s"
-            params.append(start_date)
-        if end_date:
-            base_query += " AND l.fecha <= %s"
-            params.append(end_date)
-
-        base_query += " GROUP BY l.ip"
-
-        base_query += """
+            SELECT
+                t.ip,
+                MAX(t.max_latencia) AS max_latencia,
+                SUM(t.suma_validas) / NULLIF(SUM(t.mediciones_validas), 0) AS promedio_latencia,
+                SUM(t.total_mediciones) AS total_mediciones,
+                MIN(t.min_latencia) AS min_latencia,
+                SUM(t.latencia_100_200) AS latencia_100_200,
+                SUM(t.latencia_mayor_200) AS latencia_mayor_200,
+                SUM(t.desconexiones) AS desconexiones,
+                SUM(t.suma_jitter) / NULLIF(SUM(t.mediciones_multimuestra), 0) AS jitter_promedio,
+                SUM(t.paquetes_perdidos) * 100.0 / NULLIF(SUM(t.paquetes_enviados), 0) AS perdida_porcentaje,
+                MIN(t.min_muestra) AS min_muestra,
+                MAX(t.max_muestra) AS max_muestra,
+                MAX(i.marca) AS marca,
+                MAX(i.rol) AS rol,
+                MAX(i.tipo) AS tipo,
+                MAX(i.snmp_conf) AS snmp_conf,
+                MAX(i.anotacion) AS anotacion,
+                MAX(i.gps) AS gps,
+                MAX(i.tag) AS tag
+            FROM ({sources}) t
+            LEFT JOIN inventario i ON t.ip = i.ip
+            GROUP BY t.ip
             ORDER BY latencia_mayor_200 DESC, promedio_latencia DESC, max_latencia DESC
             LIMIT %s OFFSET %s
         """
-        params.extend([limit, offset])
 
-        cursor.execute(base_query, params)
+        cursor.execute(base_query, params + [limit, offset])
         column_names = [desc[0] for desc in cursor.description]
         rows = cursor.fetchall()
 
@@ -381,23 +515,15 @@ def get_latencia_stats(
                 r["promedio_latencia"] = round(float(r["promedio_latencia"]), 3)
             if r.get("min_latencia") is not None:
                 r["min_latencia"] = round(float(r["min_latencia"]), 3)
+            for key in ("jitter_promedio", "perdida_porcentaje", "min_muestra", "max_muestra"):
+                if r.get(key) is not None:
+                    r[key] = round(float(r[key]), 3)
+            for key in ("total_mediciones", "latencia_100_200", "latencia_mayor_200", "desconexiones"):
+                r[key] = int(r[key] or 0)
             results.append(r)
 
         # Total de IPs distintas
-        count_query = """
-            SELECT COUNT(DISTINCT l.ip)
-            FROM latencia l
-            WHERE 1=1
-        """
-        count_params = []
-        if start_date:
-            count_query += " AND l.fecha >= %s"
-            count_params.append(start_date)
-        if end_date:
-            count_query += " AND l.fecha <= %s"
-            count_params.append(end_date)
-
-        cursor.execute(count_query, count_params)
+        cursor.execute(f"SELECT COUNT(DISTINCT t.ip) FROM ({sources}) t", params)
         total_records = cursor.fetchone()[0] or 0
 
         return {
@@ -410,17 +536,13 @@ def get_latencia_stats(
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener los datos: {str(e)}")
-    finally:
-        try:
-            conn.close()
-        except:
-            pass
 
 
 @router.get("/get_latencia_stats_summary", summary="Resumen general de estadísticas de latencia")
 def get_latencia_stats_summary(
     start_date: Optional[datetime] = Query(None, description="Fecha de inicio de la consulta"),
-    end_date: Optional[datetime] = Query(None, description="Fecha de fin de la consulta")
+    end_date: Optional[datetime] = Query(None, description="Fecha de fin de la consulta"),
+    conn = Depends(get_db)
 ):
     """
     Resumen global en el período:
@@ -433,37 +555,33 @@ def get_latencia_stats_summary(
       - desconexiones             : conteo de latencias <= 0  (cambiar a '= -1' si solo quieres -1)
       - mediciones_altas          : latencias > 100 ms (sobre todas)
       - porcentaje_latencia_alta  : (mediciones >100) / (muestras >0) * 100
+      - jitter_promedio           : promedio del jitter (mdev) de las mediciones multi-muestra
+      - perdida_porcentaje        : echos perdidos / echos enviados * 100 (multi-muestra)
+    Igual que get_latencia_stats, se apoya en los rollups cuando el rango está acotado.
     """
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
-        params = []
+        sources, params = _latencia_sources(start_date, end_date)
 
-        summary_query = """
+        summary_query = f"""
             SELECT 
-                COUNT(DISTINCT l.ip) AS total_ips,
-                COUNT(l.latencia) AS total_mediciones,
-                COUNT(CASE WHEN l.latencia > 0 THEN 1 END) AS total_mediciones_validas,
-                AVG(CASE WHEN l.latencia > 0 THEN l.latencia END) AS promedio_general,
-                MAX(l.latencia) AS max_global,
-                MIN(CASE WHEN l.latencia > 0 THEN l.latencia END) AS min_global,
-                COUNT(CASE WHEN l.latencia <= 0 THEN 1 END) AS desconexiones,  -- si quieres solo -1: (l.latencia = -1)
-                COUNT(CASE WHEN l.latencia > 100 THEN 1 END) AS mediciones_altas,
+                COUNT(DISTINCT t.ip) AS total_ips,
+                SUM(t.total_mediciones) AS total_mediciones,
+                SUM(t.mediciones_validas) AS total_mediciones_validas,
+                SUM(t.suma_validas) / NULLIF(SUM(t.mediciones_validas), 0) AS promedio_general,
+                MAX(t.max_latencia) AS max_global,
+                MIN(t.min_latencia) AS min_global,
+                SUM(t.desconexiones) AS desconexiones,
+                SUM(t.latencia_mayor_100) AS mediciones_altas,
                 ROUND(
-                    (COUNT(CASE WHEN l.latencia > 100 THEN 1 END) * 100.0) 
-                    / NULLIF(COUNT(CASE WHEN l.latencia > 0 THEN 1 END), 0)
-                , 2) AS porcentaje_latencia_alta
-            FROM latencia l
-            WHERE 1=1
+                    (SUM(t.latencia_mayor_100) * 100.0) 
+                    / NULLIF(SUM(t.mediciones_validas), 0)
+                , 2) AS porcentaje_latencia_alta,
+                SUM(t.suma_jitter) / NULLIF(SUM(t.mediciones_multimuestra), 0) AS jitter_promedio,
+                SUM(t.paquetes_perdidos) * 100.0 / NULLIF(SUM(t.paquetes_enviados), 0) AS perdida_porcentaje
+            FROM ({sources}) t
         """
 
-        if start_date:
-            summary_query += " AND l.fecha >= %s"
-            params.append(start_date)
-        if end_date:
-            summary_query += " AND l.fecha <= %s"
-            params.append(end_date)
-
         cursor.execute(summary_query, params)
         column_names = [desc[0] for desc in cursor.description]
         row = cursor.fetchone()
@@ -476,17 +594,19 @@ def get_latencia_stats_summary(
             result["max_global"] = round(float(result["max_global"]), 3)
         if result.get("min_global") is not None:
             result["min_global"] = round(float(result["min_global"]), 3)
+        for key in ("jitter_promedio", "perdida_porcentaje"):
+            if result.get(key) is not None:
+                result[key] = round(float(result[key]), 3)
+        for key in ("total_mediciones", "total_mediciones_validas", "desconexiones", "mediciones_altas"):
+            result[key] = int(result[key] or 0)
 
         # Si no hubo muestras válidas, porcentaje quedará NULL → opcional: poner 0.0
         if result.get("porcentaje_latencia_alta") is None:
             result["porcentaje_latencia_alta"] = 0.0
+        else:
+            result["porcentaje_latencia_alta"] = float(result["porcentaje_latencia_alta"])
 
         return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener el resumen: {str(e)}")
-    finally:
-        try:
-            conn.close()
-        except:
-            pass
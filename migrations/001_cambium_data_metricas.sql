@@ -0,0 +1,126 @@
+-- =============================================================================
+--          Smartlink - cambium_data: métricas numéricas materializadas
+-- =============================================================================
+--  snr, link_radio y avg_power se almacenan como JSON. Las columnas generadas
+--  STORED exponen sus valores escalares como DOUBLE, de modo que las
+--  estadísticas (get_metric_stats_*) y los eventos (get_low_snr) filtran y
+--  agregan sobre números indexados sin decodificar JSON en la lectura.
+--  Las escrituras no cambian: add / add_list siguen enviando los JSON y
+--  MariaDB calcula las columnas al insertar; al agregarlas se calculan para
+--  todas las filas existentes.
+--
+--  Mismas reglas que _extract_metric_fixed (y _json_metric_sql):
+--    - la llave exacta y luego cualquier capitalización ('Rx', 'RX', 'rX')
+--    - un JSON escalar en lugar de un objeto (snr = 25 o "25"): se usa '$'
+--    - números como texto con espacios alrededor (" 25 ")
+--  Listas (PMP-AP), valores no numéricos o JSON malformado quedan en NULL.
+--
+--  Formas que Python lee y estas columnas no (quedan en NULL):
+--    - llave exacta presente con NULL / no numérico y otra capitalización
+--      numérica: Python devuelve NULL, SQL toma la otra capitalización
+--    - texto con tabs / saltos de línea alrededor, '1_000' u otros formatos
+--      que solo float() de Python acepta
+--    - un string JSON que a su vez contiene un número entre comillas
+--  get_metric_stats_* las cubre con el respaldo en Python (_fallback_sql);
+--  /get_low_snr no.
+--
+--  Chequeo (no forma parte de la migración, correr a mano después): filas con
+--  JSON válido en que la métrica quedó en NULL, por tipo de JSON. Solo deben
+--  quedar OBJECT sin la llave y ARRAY (PMP-AP).
+--   SELECT 'snr_h' AS columna, JSON_TYPE(snr) AS tipo_json, COUNT(*) AS filas
+--   FROM cambium_data
+--   WHERE snr_h IS NULL AND snr IS NOT NULL AND JSON_VALID(snr)
+--   GROUP BY JSON_TYPE(snr)
+--   UNION ALL
+--   SELECT 'snr_v' AS columna, JSON_TYPE(snr) AS tipo_json, COUNT(*) AS filas
+--   FROM cambium_data
+--   WHERE snr_v IS NULL AND snr IS NOT NULL AND JSON_VALID(snr)
+--   GROUP BY JSON_TYPE(snr)
+--   UNION ALL
+--   SELECT 'rx' AS columna, JSON_TYPE(link_radio) AS tipo_json, COUNT(*) AS filas
+--   FROM cambium_data
+--   WHERE rx IS NULL AND link_radio IS NOT NULL AND JSON_VALID(link_radio)
+--   GROUP BY JSON_TYPE(link_radio)
+--   UNION ALL
+--   SELECT 'tx' AS columna, JSON_TYPE(link_radio) AS tipo_json, COUNT(*) AS filas
+--   FROM cambium_data
+--   WHERE tx IS NULL AND link_radio IS NOT NULL AND JSON_VALID(link_radio)
+--   GROUP BY JSON_TYPE(link_radio)
+--   UNION ALL
+--   SELECT 'avg_power_rx' AS columna, JSON_TYPE(avg_power) AS tipo_json, COUNT(*) AS filas
+--   FROM cambium_data
+--   WHERE avg_power_rx IS NULL AND avg_power IS NOT NULL AND JSON_VALID(avg_power)
+--   GROUP BY JSON_TYPE(avg_power);
+-- =============================================================================
+
+ALTER TABLE cambium_data
+    ADD COLUMN IF NOT EXISTS snr_h DOUBLE AS (
+        CASE WHEN TRIM(COALESCE(JSON_VALUE(snr, '$.H'),
+                      JSON_VALUE(snr, '$.h'),
+                      JSON_VALUE(snr, '$')))
+                  REGEXP '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$'
+             THEN CAST(TRIM(COALESCE(JSON_VALUE(snr, '$.H'),
+                      JSON_VALUE(snr, '$.h'),
+                      JSON_VALUE(snr, '$'))) AS DOUBLE)
+        END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS snr_v DOUBLE AS (
+        CASE WHEN TRIM(COALESCE(JSON_VALUE(snr, '$.V'),
+                      JSON_VALUE(snr, '$.v'),
+                      JSON_VALUE(snr, '$')))
+                  REGEXP '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$'
+             THEN CAST(TRIM(COALESCE(JSON_VALUE(snr, '$.V'),
+                      JSON_VALUE(snr, '$.v'),
+                      JSON_VALUE(snr, '$'))) AS DOUBLE)
+        END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS rx DOUBLE AS (
+        CASE WHEN TRIM(COALESCE(JSON_VALUE(link_radio, '$.rx'),
+                      JSON_VALUE(link_radio, '$.rX'),
+                      JSON_VALUE(link_radio, '$.Rx'),
+                      JSON_VALUE(link_radio, '$.RX'),
+                      JSON_VALUE(link_radio, '$')))
+                  REGEXP '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$'
+             THEN CAST(TRIM(COALESCE(JSON_VALUE(link_radio, '$.rx'),
+                      JSON_VALUE(link_radio, '$.rX'),
+                      JSON_VALUE(link_radio, '$.Rx'),
+                      JSON_VALUE(link_radio, '$.RX'),
+                      JSON_VALUE(link_radio, '$'))) AS DOUBLE)
+        END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS tx DOUBLE AS (
+        CASE WHEN TRIM(COALESCE(JSON_VALUE(link_radio, '$.tx'),
+                      JSON_VALUE(link_radio, '$.tX'),
+                      JSON_VALUE(link_radio, '$.Tx'),
+                      JSON_VALUE(link_radio, '$.TX'),
+                      JSON_VALUE(link_radio, '$')))
+                  REGEXP '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$'
+             THEN CAST(TRIM(COALESCE(JSON_VALUE(link_radio, '$.tx'),
+                      JSON_VALUE(link_radio, '$.tX'),
+                      JSON_VALUE(link_radio, '$.Tx'),
+                      JSON_VALUE(link_radio, '$.TX'),
+                      JSON_VALUE(link_radio, '$'))) AS DOUBLE)
+        END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS avg_power_rx DOUBLE AS (
+        CASE WHEN TRIM(COALESCE(JSON_VALUE(avg_power, '$.rx'),
+                      JSON_VALUE(avg_power, '$.rX'),
+                      JSON_VALUE(avg_power, '$.Rx'),
+                      JSON_VALUE(avg_power, '$.RX'),
+                      JSON_VALUE(avg_power, '$')))
+                  REGEXP '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$'
+             THEN CAST(TRIM(COALESCE(JSON_VALUE(avg_power, '$.rx'),
+                      JSON_VALUE(avg_power, '$.rX'),
+                      JSON_VALUE(avg_power, '$.Rx'),
+                      JSON_VALUE(avg_power, '$.RX'),
+                      JSON_VALUE(avg_power, '$'))) AS DOUBLE)
+        END
+    ) STORED;
+
+-- Estadísticas por IP en un rango de fechas
+CREATE INDEX IF NOT EXISTS idx_cambium_data_ip_fecha
+    ON cambium_data (ip, fecha, snr_h, snr_v, rx);
+
+-- Búsqueda de SNR bajo por rango de fechas (eventos)
+CREATE INDEX IF NOT EXISTS idx_cambium_data_fecha_snr
+    ON cambium_data (fecha, snr_h, snr_v);
@@ -0,0 +1,63 @@
+-- =============================================================================
+--          Smartlink - latencia: tablas de rollup (1 min / 15 min / 1 h)
+-- =============================================================================
+--  Agregados por IP y bucket que mantiene latencia_router.py:
+--    - add / add_list suman incrementalmente las filas nuevas (ON DUPLICATE KEY)
+--    - delete / update / rebuild_rollups recalculan los buckets afectados
+--  get_latencia_stats y get_latencia_stats_summary leen los rollups en los
+--  tramos alineados del rango y solo consultan 'latencia' en los bordes.
+--
+--  Bucket = inicio del intervalo, calculado sobre la hora local de 'fecha':
+--    TIMESTAMP(DATE(fecha), SEC_TO_TIME(TIME_TO_SEC(TIME(fecha)) DIV N * N))
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS latencia_rollup_1m (
+    bucket              DATETIME        NOT NULL,
+    ip                  VARCHAR(45)     NOT NULL,
+    total_mediciones    INT UNSIGNED    NOT NULL DEFAULT 0,
+    suma_latencia       DOUBLE          NOT NULL DEFAULT 0,
+    mediciones_validas  INT UNSIGNED    NOT NULL DEFAULT 0,     -- latencia > 0
+    suma_validas        DOUBLE          NOT NULL DEFAULT 0,
+    min_latencia        DOUBLE          NULL,                   -- mínimo de latencias > 0
+    max_latencia        DOUBLE          NULL,
+    latencia_100_200    INT UNSIGNED    NOT NULL DEFAULT 0,
+    latencia_mayor_200  INT UNSIGNED    NOT NULL DEFAULT 0,
+    latencia_mayor_100  INT UNSIGNED    NOT NULL DEFAULT 0,
+    desconexiones       INT UNSIGNED    NOT NULL DEFAULT 0,     -- latencia <= 0
+    PRIMARY KEY (bucket, ip)
+);
+
+CREATE TABLE IF NOT EXISTS latencia_rollup_15m LIKE latencia_rollup_1m;
+CREATE TABLE IF NOT EXISTS latencia_rollup_1h  LIKE latencia_rollup_1m;
+
+-- Carga inicial desde la tabla cruda
+INSERT INTO latencia_rollup_1m
+SELECT TIMESTAMP(DATE(fecha), SEC_TO_TIME(TIME_TO_SEC(TIME(fecha)) DIV 60 * 60)) AS bucket, ip,
+       COUNT(latencia), COALESCE(SUM(latencia), 0),
+       COUNT(CASE WHEN latencia > 0 THEN 1 END), COALESCE(SUM(CASE WHEN latencia > 0 THEN latencia END), 0),
+       MIN(CASE WHEN latencia > 0 THEN latencia END), MAX(latencia),
+       COUNT(CASE WHEN latencia BETWEEN 100 AND 200 THEN 1 END),
+       COUNT(CASE WHEN latencia > 200 THEN 1 END),
+       COUNT(CASE WHEN latencia > 100 THEN 1 END),
+       COUNT(CASE WHEN latencia <= 0 THEN 1 END)
+FROM latencia
+GROUP BY bucket, ip
+ON DUPLICATE KEY UPDATE total_mediciones = total_mediciones;
+
+INSERT INTO latencia_rollup_15m
+SELECT TIMESTAMP(DATE(bucket), SEC_TO_TIME(TIME_TO_SEC(TIME(bucket)) DIV 900 * 900)) AS b15, ip,
+       SUM(total_mediciones), SUM(suma_latencia), SUM(mediciones_validas), SUM(suma_validas),
+       MIN(min_latencia), MAX(max_latencia), SUM(latencia_100_200), SUM(latencia_mayor_200),
+       SUM(latencia_mayor_100), SUM(desconexiones)
+FROM latencia_rollup_1m
+GROUP BY b15, ip
+ON DUPLICATE KEY UPDATE total_mediciones = total_mediciones;
+
+INSERT INTO latencia_rollup_1h
+SELECT TIMESTAMP(DATE(bucket), SEC_TO_TIME(TIME_TO_SEC(TIME(bucket)) DIV 3600 * 3600)) AS b1h, ip,
+       SUM(total_mediciones), SUM(suma_latencia), SUM(mediciones_validas), SUM(suma_validas),
+       MIN(min_latencia), MAX(max_latencia), SUM(latencia_100_200), SUM(latencia_mayor_200),
+       SUM(latencia_mayor_100), SUM(desconexiones)
+FROM latencia_rollup_15m
+GROUP BY b1h, ip
+ON DUPLICATE KEY UPDATE total_mediciones = total_mediciones;
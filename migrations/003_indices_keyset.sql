@@ -0,0 +1,22 @@
+-- =============================================================================
+--          Smartlink - índices para paginación keyset (cursor)
+-- =============================================================================
+--  Los endpoints de lista de latencia y cambium_data ordenan por
+--  (fecha DESC, id DESC) y, con 'cursor', filtran con
+--    fecha < ? OR (fecha = ? AND id < ?)
+--  Con estos índices cada página es un rango del índice de tamaño 'limit',
+--  sin recorrer las filas saltadas como ocurre con OFFSET.
+--  idx_cambium_data_ip_fecha (migración 001) ya cubre /cambium_data/get_ip.
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_latencia_fecha_id
+    ON latencia (fecha, id);
+
+CREATE INDEX IF NOT EXISTS idx_latencia_ip_fecha_id
+    ON latencia (ip, fecha, id);
+
+CREATE INDEX IF NOT EXISTS idx_latencia_fecha_db_id
+    ON latencia (fecha_DB, id);
+
+CREATE INDEX IF NOT EXISTS idx_cambium_data_fecha_id
+    ON cambium_data (fecha, id);
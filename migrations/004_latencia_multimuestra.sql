@@ -0,0 +1,41 @@
+-- =============================================================================
+--          Smartlink - latencia: mediciones multi-muestra
+-- =============================================================================
+--  update_general.py -n N envía una ráfaga de N echos por IP y por pasada.
+--  'latencia' guarda el promedio de la ráfaga (-1 si se perdieron todos) y
+--  las columnas nuevas el resto del resumen. Con una sola muestra quedan NULL.
+--  Los rollups acumulan jitter y echos enviados / perdidos para que
+--  get_latencia_stats y get_latencia_stats_summary los agreguen.
+-- =============================================================================
+
+ALTER TABLE latencia
+    ADD COLUMN IF NOT EXISTS latencia_min   DOUBLE              NULL,   -- mínimo de la ráfaga (ms)
+    ADD COLUMN IF NOT EXISTS latencia_max   DOUBLE              NULL,   -- máximo de la ráfaga (ms)
+    ADD COLUMN IF NOT EXISTS jitter         DOUBLE              NULL,   -- mdev de la ráfaga (ms)
+    ADD COLUMN IF NOT EXISTS perdida        DOUBLE              NULL,   -- % de echos sin respuesta
+    ADD COLUMN IF NOT EXISTS muestras       SMALLINT UNSIGNED   NULL;   -- echos enviados
+
+-- Las tablas de 002 se crearon con LIKE: cada una se altera por separado
+ALTER TABLE latencia_rollup_1m
+    ADD COLUMN IF NOT EXISTS mediciones_multimuestra INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS suma_jitter             DOUBLE       NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS paquetes_enviados       INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS paquetes_perdidos       INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS min_muestra             DOUBLE       NULL,
+    ADD COLUMN IF NOT EXISTS max_muestra             DOUBLE       NULL;
+
+ALTER TABLE latencia_rollup_15m
+    ADD COLUMN IF NOT EXISTS mediciones_multimuestra INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS suma_jitter             DOUBLE       NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS paquetes_enviados       INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS paquetes_perdidos       INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS min_muestra             DOUBLE       NULL,
+    ADD COLUMN IF NOT EXISTS max_muestra             DOUBLE       NULL;
+
+ALTER TABLE latencia_rollup_1h
+    ADD COLUMN IF NOT EXISTS mediciones_multimuestra INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS suma_jitter             DOUBLE       NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS paquetes_enviados       INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS paquetes_perdidos       INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS min_muestra             DOUBLE       NULL,
+    ADD COLUMN IF NOT EXISTS max_muestra             DOUBLE       NULL;
@@ -0,0 +1,19 @@
+-- =============================================================================
+--          Smartlink - rajant_snapshot: almacenamiento por cambios
+-- =============================================================================
+--  update_rajant_data.py -D envía un registro por IP y por pasada: un snapshot
+--  "completo" cada N pasadas (o tras un reinicio del equipo) y, entre medio,
+--  un "delta" con solo los campos que cambiaron. rajant_snapshot_router.py
+--  reconstruye el snapshot de cualquier instante a partir del último completo.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS rajant_snapshot (
+    id      BIGINT UNSIGNED             NOT NULL AUTO_INCREMENT,
+    ip      VARCHAR(45)                 NOT NULL,
+    fecha   DATETIME                    NOT NULL,
+    tipo    ENUM('completo', 'delta')   NOT NULL,
+    datos   JSON                        NOT NULL,
+    PRIMARY KEY (id),
+    KEY idx_rajant_snapshot_ip_fecha (ip, fecha, id),     -- deltas posteriores al completo
+    KEY idx_rajant_snapshot_tipo (tipo, fecha, ip)        -- último completo por IP
+);
@@ -0,0 +1,12 @@
+-- =============================================================================
+--          Smartlink - índice para la recurrencia agrupada de eventos
+-- =============================================================================
+--  eventos.py calcula la recurrencia de todos los eventos de una pasada con
+--  /eventos/get_recurrencia_agrupada, que agrupa por (ip, problema,
+--  tipo_interferencia, fecha) los eventos de un rango de fechas:
+--    WHERE fecha >= ? AND fecha <= ? GROUP BY ...
+--  Con este índice la consulta lee solo el rango, sin recorrer la tabla.
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_eventos_fecha_ip
+    ON eventos (fecha, ip);
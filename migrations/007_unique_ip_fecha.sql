@@ -0,0 +1,44 @@
+-- =============================================================================
+--          Smartlink - clave única (ip, fecha) para la ingesta masiva
+-- =============================================================================
+--  add_list y add_bulk de latencia y cambium_data (ingest_utils.py) insertan
+--  sin duplicar: un lote reenviado por un colector (reintento tras un
+--  timeout) ya no duplica filas ni hace fallar el lote, las filas repetidas
+--  se informan como 'duplicados'.
+--  rajant_data, sensores y ubicacion_gps NO llevan la clave: los colectores
+--  siguen enviando a su add_list del paquete de la API (INSERT simple), que
+--  con la clave haría fallar el lote completo ante un (ip, fecha) repetido.
+--
+--  PÉRDIDA DE DATOS: ALTER IGNORE conserva una sola fila de cada (ip, fecha)
+--  ya duplicado y borra el resto sin informarlo. Por eso, antes de aplicarla:
+--    1) se cuentan los duplicados (consulta de abajo; revisar el resultado)
+--    2) se copian todas las filas de los grupos duplicados a
+--       <tabla>_duplicados_007 para poder revisarlas o restaurarlas.
+--  Después de aplicarla conviene recalcular los rollups de latencia del
+--  período afectado (POST /latencia/rebuild_rollups).
+-- =============================================================================
+
+-- 1) Pre-chequeo: grupos (ip, fecha) duplicados y filas que se borrarán
+SELECT 'latencia' AS tabla, COUNT(*) AS grupos_duplicados, COALESCE(SUM(filas - 1), 0) AS filas_a_borrar
+FROM (SELECT COUNT(*) AS filas FROM latencia GROUP BY ip, fecha HAVING COUNT(*) > 1) d
+UNION ALL
+SELECT 'cambium_data', COUNT(*), COALESCE(SUM(filas - 1), 0)
+FROM (SELECT COUNT(*) AS filas FROM cambium_data GROUP BY ip, fecha HAVING COUNT(*) > 1) d;
+
+-- 2) Respaldo de las filas de los grupos duplicados
+CREATE TABLE IF NOT EXISTS latencia_duplicados_007 AS
+SELECT l.* FROM latencia l
+JOIN (SELECT ip, fecha FROM latencia GROUP BY ip, fecha HAVING COUNT(*) > 1) d
+  ON d.ip = l.ip AND d.fecha = l.fecha;
+
+CREATE TABLE IF NOT EXISTS cambium_data_duplicados_007 AS
+SELECT c.* FROM cambium_data c
+JOIN (SELECT ip, fecha FROM cambium_data GROUP BY ip, fecha HAVING COUNT(*) > 1) d
+  ON d.ip = c.ip AND d.fecha = c.fecha;
+
+-- 3) Clave única
+ALTER IGNORE TABLE latencia
+    ADD UNIQUE INDEX IF NOT EXISTS uq_latencia_ip_fecha (ip, fecha);
+
+ALTER IGNORE TABLE cambium_data
+    ADD UNIQUE INDEX IF NOT EXISTS uq_cambium_data_ip_fecha (ip, fecha);
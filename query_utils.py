@@ -0,0 +1,238 @@
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from mariadb.constants import FIELD_TYPE
+from db_pool import get_pool
+import base64
+import json
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow es opcional: sin pyarrow solo se exporta NDJSON
+    pa = None
+
+# Cabecera con el cursor de la siguiente página (se envía en todas las respuestas de listas)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(fecha: datetime, row_id: int) -> str:
+    """Cursor opaco a partir del último (fecha, id) entregado."""
+    raw = json.dumps([fecha.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fecha, row_id = json.loads(raw)
+        return datetime.fromisoformat(fecha), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def round_to_quarter_hour(dt: datetime) -> datetime:
+    """Redondea un datetime al múltiplo de 15 minutos más cercano."""
+    base = dt.replace(minute=0, second=0, microsecond=0)
+    return base + timedelta(minutes=round((dt - base).total_seconds() / 900) * 15)
+
+
+def fetch_page(
+    db_cursor,
+    table: str,
+    select: str = "*",
+    where: Optional[List[str]] = None,
+    params: Optional[List[Any]] = None,
+    start_date: Optional[Any] = None,
+    end_date: Optional[Any] = None,
+    limit: int = 1000,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    order_column: str = "fecha",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Consulta paginada ordenada por (order_column DESC, id DESC).
+
+    Con 'cursor' se usa paginación keyset: la página empieza justo después del
+    último (fecha, id) entregado y 'offset' se ignora, por lo que cada página
+    cuesta lo mismo sin importar su profundidad. Sin cursor se mantiene
+    LIMIT/OFFSET por compatibilidad.
+
+    Returns:
+        (filas, next_cursor): next_cursor es None cuando la página no vino completa.
+    """
+    conditions = list(where or [])
+    query_params = list(params or [])
+
+    if start_date:
+        conditions.append(f"{order_column} >= %s")
+        query_params.append(start_date)
+    if end_date:
+        conditions.append(f"{order_column} <= %s")
+        query_params.append(end_date)
+    if cursor:
+        last_fecha, last_id = decode_cursor(cursor)
+        conditions.append(f"({order_column} < %s OR ({order_column} = %s AND id < %s))")
+        query_params.extend([last_fecha, last_fecha, last_id])
+
+    query = f"SELECT {select}, {order_column} AS _cursor_fecha, id AS _cursor_id FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    # Columnas calificadas: ORDER BY resuelve primero los alias del SELECT (p. ej. una fecha redondeada)
+    query += f" ORDER BY {table}.{order_column} DESC, {table}.id DESC LIMIT %s"
+    query_params.append(limit)
+    if not cursor:
+        query += " OFFSET %s"
+        query_params.append(offset)
+
+    db_cursor.execute(query, query_params)
+    column_names = [desc[0] for desc in db_cursor.description]
+    rows = [dict(zip(column_names, row)) for row in db_cursor.fetchall()]
+
+    next_cursor = None
+    if rows and len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1]["_cursor_fecha"], rows[-1]["_cursor_id"])
+    for row in rows:
+        row.pop("_cursor_fecha", None)
+        row.pop("_cursor_id", None)
+
+    return rows, next_cursor
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Publica el cursor de la siguiente página en la cabecera X-Next-Cursor."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+# --------------------- Exportación en streaming ---------------------
+EXPORT_FORMATS = ("ndjson", "arrow")
+
+_ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+_INT_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24,
+              FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR}
+_FLOAT_TYPES = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL}
+_DATETIME_TYPES = {FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP}
+
+
+def _arrow_type(type_code):
+    """Tipo Arrow para una columna según el FIELD_TYPE de MariaDB (texto por defecto)."""
+    if type_code in _INT_TYPES:
+        return pa.int64()
+    if type_code in _FLOAT_TYPES:
+        return pa.float64()
+    if type_code in _DATETIME_TYPES:
+        return pa.timestamp("us")
+    if type_code == FIELD_TYPE.DATE:
+        return pa.date32()
+    return pa.string()
+
+
+def _as_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
+def _ndjson_chunks(db_cursor, column_names, batch_size):
+    while True:
+        rows = db_cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield "".join(
+            json.dumps(dict(zip(column_names, row)), default=_json_default) + "\n" for row in rows
+        ).encode()
+
+
+def _arrow_chunks(db_cursor, column_names, type_codes, batch_size):
+    schema = pa.schema([(name, _arrow_type(code)) for name, code in zip(column_names, type_codes)])
+    text_columns = [i for i, field in enumerate(schema) if pa.types.is_string(field.type)]
+    float_columns = [i for i, field in enumerate(schema) if pa.types.is_floating(field.type)]
+    yield schema.serialize().to_pybytes()
+    while True:
+        rows = db_cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        columns = [list(col) for col in zip(*rows)]
+        for i in text_columns:
+            columns[i] = [_as_text(v) for v in columns[i]]
+        for i in float_columns:
+            columns[i] = [None if v is None else float(v) for v in columns[i]]
+        batch = pa.RecordBatch.from_arrays([pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema)
+        yield batch.serialize().to_pybytes()
+    yield _ARROW_EOS
+
+
+def stream_export(
+    table: str,
+    where: Optional[List[str]] = None,
+    params: Optional[List[Any]] = None,
+    start_date: Optional[Any] = None,
+    end_date: Optional[Any] = None,
+    formato: str = "ndjson",
+    batch_size: int = 5000,
+) -> StreamingResponse:
+    """
+    Exporta las filas de 'table' ordenadas por (fecha, id) sin armarlas en memoria.
+
+    Usa un cursor no bufferizado (server-side) y envía cada bloque de
+    fetchmany(batch_size) apenas llega, como NDJSON (una fila JSON por línea) o
+    como stream Arrow IPC (un record batch por bloque, legible con
+    pyarrow.ipc.open_stream). La conexión se toma del pool y se devuelve al
+    terminar el stream (no al terminar el request).
+    """
+    if formato not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}. Use {', '.join(EXPORT_FORMATS)}")
+    if formato == "arrow" and pa is None:
+        raise HTTPException(status_code=501, detail="Exportación Arrow no disponible: pyarrow no está instalado")
+
+    conditions = list(where or [])
+    query_params = list(params or [])
+    if start_date:
+        conditions.append("fecha >= %s")
+        query_params.append(start_date)
+    if end_date:
+        conditions.append("fecha <= %s")
+        query_params.append(end_date)
+
+    query = f"SELECT * FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY fecha, id"
+
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        db_cursor = conn.cursor(buffered=False)
+        db_cursor.execute(query, query_params)
+        column_names = [desc[0] for desc in db_cursor.description]
+        type_codes = [desc[1] for desc in db_cursor.description]
+    except Exception as e:
+        pool.release(conn)
+        raise HTTPException(status_code=500, detail=f"Error al exportar los datos de {table}: {str(e)}")
+
+    def generate():
+        try:
+            if formato == "arrow":
+                yield from _arrow_chunks(db_cursor, column_names, type_codes, batch_size)
+            else:
+                yield from _ndjson_chunks(db_cursor, column_names, batch_size)
+        finally:
+            pool.release(conn)
+
+    media_type = "application/vnd.apache.arrow.stream" if formato == "arrow" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
@@ -0,0 +1,134 @@
+from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from datetime import datetime
+from db_pool import get_db
+from pydantic import BaseModel
+from typing import Optional, List, Dict
+import copy
+import json
+
+from routes.__utils__ import insert_bulk_data
+
+
+router = APIRouter()
+
+TIPO_COMPLETO = "completo"
+TIPO_DELTA = "delta"
+
+
+class RajantSnapshot(BaseModel):
+    """
+    Registro de update_rajant_data.py -D. 'tipo' = "completo" trae el snapshot
+    entero (config, instamesh, wired, wireless, sensores); "delta" trae
+    {"cambios": {...}, "eliminados": [[ruta], ...]} respecto del registro anterior de la IP.
+    """
+    ip: str
+    fecha: datetime
+    tipo: str
+    datos: Dict
+
+
+# --------------------- Helpers ---------------------
+def _as_dict(value) -> dict:
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode()
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or {}
+
+def _apply_delta(snapshot: dict, delta: dict) -> dict:
+    """Mismo algoritmo que dist/rajant/delta_utils.apply_delta."""
+    for ruta in delta.get("eliminados", []):
+        target = snapshot
+        for key in ruta[:-1]:
+            target = target.get(key, {})
+        if isinstance(target, dict):
+            target.pop(ruta[-1], None)
+
+    def _merge(target: dict, cambios: dict):
+        for key, value in cambios.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                _merge(target[key], value)
+            else:
+                target[key] = copy.deepcopy(value)
+
+    _merge(snapshot, delta.get("cambios", {}))
+    return snapshot
+
+def _rebuild(db_cursor, ip: str, keyframe_id: int, keyframe_fecha, keyframe_datos, fecha: datetime) -> dict:
+    """Snapshot de 'ip' en 'fecha': el completo 'keyframe_id' más los deltas posteriores hasta 'fecha'."""
+    snapshot = _as_dict(keyframe_datos)
+    ultima_fecha = keyframe_fecha
+    db_cursor.execute(
+        """
+        SELECT id, fecha, datos FROM rajant_snapshot
+        WHERE ip = %s AND tipo = %s AND id > %s AND fecha <= %s
+        ORDER BY fecha, id
+        """,
+        (ip, TIPO_DELTA, keyframe_id, fecha)
+    )
+    for _, fecha_delta, datos in db_cursor.fetchall():
+        _apply_delta(snapshot, _as_dict(datos))
+        ultima_fecha = fecha_delta
+    return {"ip": ip, "fecha": ultima_fecha, "fecha_keyframe": keyframe_fecha, **snapshot}
+
+
+# --------------------- Endpoints ---------------------
+@router.post("/add_list")
+def add_rajant_snapshot_list(list_model: List[RajantSnapshot]):
+    invalidos = [model.ip for model in list_model if model.tipo not in (TIPO_COMPLETO, TIPO_DELTA)]
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Tipo de snapshot desconocido para: {', '.join(invalidos)}")
+    return insert_bulk_data("rajant_snapshot", list_model, RajantSnapshot.model_fields.keys())
+
+
+@router.get("/get_snapshot/{ip}", summary="Reconstruir el snapshot completo de un equipo Rajant en una fecha")
+def get_rajant_snapshot(
+    ip: str = Path(..., description="IP del equipo Rajant"),
+    fecha: Optional[datetime] = Query(None, description="Instante a reconstruir (por defecto, el último registro)"),
+    conn = Depends(get_db)
+):
+    fecha = fecha or datetime.now()
+    try:
+        db_cursor = conn.cursor()
+        db_cursor.execute(
+            """
+            SELECT id, fecha, datos FROM rajant_snapshot
+            WHERE ip = %s AND tipo = %s AND fecha <= %s
+            ORDER BY fecha DESC, id DESC LIMIT 1
+            """,
+            (ip, TIPO_COMPLETO, fecha)
+        )
+        keyframe = db_cursor.fetchone()
+        if keyframe is None:
+            raise HTTPException(status_code=404, detail=f"No hay snapshot completo de {ip} anterior a {fecha}")
+        return _rebuild(db_cursor, ip, *keyframe, fecha)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al reconstruir el snapshot: {str(e)}")
+
+
+@router.get("/get_snapshot", summary="Reconstruir el snapshot completo de todos los equipos Rajant en una fecha")
+def get_rajant_snapshot_all(
+    fecha: Optional[datetime] = Query(None, description="Instante a reconstruir (por defecto, el último registro)"),
+    conn = Depends(get_db)
+):
+    fecha = fecha or datetime.now()
+    try:
+        db_cursor = conn.cursor()
+        # Último completo de cada IP anterior a 'fecha'
+        db_cursor.execute(
+            """
+            SELECT s.ip, s.id, s.fecha, s.datos FROM rajant_snapshot s
+            JOIN (
+                SELECT ip, MAX(id) AS id FROM rajant_snapshot
+                WHERE tipo = %s AND fecha <= %s
+                GROUP BY ip
+            ) k ON k.id = s.id
+            """,
+            (TIPO_COMPLETO, fecha)
+        )
+        keyframes = db_cursor.fetchall()
+        return [_rebuild(db_cursor, ip, *keyframe, fecha) for ip, *keyframe in keyframes]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al reconstruir los snapshots: {str(e)}")